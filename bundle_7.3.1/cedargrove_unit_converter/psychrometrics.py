@@ -0,0 +1,204 @@
+# The MIT License (MIT)
+
+# Copyright (c) 2020, 2021, 2022 Cedar Grove Studios
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`psychrometrics` - Moist Air Calculators
+================================================================================
+A CircuitPython module for moist air properties: saturation vapor pressure,
+vapor pressure, dew point, absolute humidity, mixing ratio, and the
+condensation margin of a surface at a separately measured temperature.
+
+Saturation vapor pressure over water uses one of two approximations:
+  "magnus"  Magnus formula with Alduchov & Eskridge (1996) coefficients;
+            relative error within about 0.4% from -40 to 50 degrees Celsius.
+  "buck"    Arden Buck (1996) equation; relative error within about 0.05%
+            from -40 to 50 degrees Celsius.
+Dew point is the exact inverse of the Magnus formula. With the "buck" method
+the dew point differs from a Buck-consistent inverse by less than about
+0.2 degree Celsius over the same range. Absolute humidity and mixing ratio
+use the ideal gas law; their error follows the vapor pressure error.
+
+psychrometrics() calculates every quantity from one exp() and one log()
+evaluation. psychrometrics_array() does the same for lists or arrays of
+readings (NumPy on a host computer; ulab on a device when available).
+
+Air with no water vapor (0% relative humidity) has no dew point: the dew
+point and condensation margin are None, or NaN within an array.
+
+* Author(s): Cedar Grove Studios
+"""
+
+import math
+from collections import namedtuple
+
+try:
+    from ulab import numpy as np  # CircuitPython with ulab
+except ImportError:
+    try:
+        import numpy as np  # Host computer
+    except ImportError:
+        np = None
+
+# fmt: off
+# Magnus coefficients (Alduchov & Eskridge, 1996)
+MAGNUS_A = 6.1094   # hPa
+MAGNUS_B = 17.625
+MAGNUS_C = 243.04   # degrees Celsius
+
+# Arden Buck (1996) coefficients
+BUCK_A = 6.1121     # hPa
+BUCK_B = 18.678
+BUCK_C = 257.14     # degrees Celsius
+BUCK_D = 234.5      # degrees Celsius
+
+STANDARD_PRESSURE = 1013.25  # hPa
+# fmt: on
+
+Psychrometrics = namedtuple(
+    "Psychrometrics",
+    (
+        "saturation_pressure",  # hPa
+        "vapor_pressure",  # hPa
+        "dew_point",  # degrees Celsius
+        "absolute_humidity",  # grams per cubic meter
+        "mixing_ratio",  # grams per kilogram of dry air
+        "condensation_margin",  # degrees Celsius; None without a surface
+    ),
+)
+
+
+def _exponent(deg_c, method):
+    # The exponent of the saturation vapor pressure approximation
+    if method == "buck":
+        return (BUCK_B - (deg_c / BUCK_D)) * (deg_c / (BUCK_C + deg_c))
+    return (MAGNUS_B * deg_c) / (MAGNUS_C + deg_c)
+
+
+# Saturation vapor pressure over water (hPa)
+def saturation_vapor_pressure(deg_c, method="magnus"):
+    if method == "buck":
+        return BUCK_A * math.exp(_exponent(deg_c, method))
+    return MAGNUS_A * math.exp(_exponent(deg_c, method))
+
+
+# Vapor pressure (hPa)
+def vapor_pressure(deg_c, humidity, method="magnus"):
+    return (humidity / 100) * saturation_vapor_pressure(deg_c, method)
+
+
+# Dew point from vapor pressure (degrees Celsius); inverse Magnus formula.
+#   None without water vapor.
+def dew_point_from_vapor_pressure(vapor_hpa):
+    if vapor_hpa <= 0:
+        return None
+    gamma = math.log(vapor_hpa / MAGNUS_A)
+    return (MAGNUS_C * gamma) / (MAGNUS_B - gamma)
+
+
+# Absolute humidity (grams per cubic meter)
+def absolute_humidity(deg_c, humidity, method="magnus"):
+    return 216.679 * vapor_pressure(deg_c, humidity, method) / (deg_c + 273.15)
+
+
+# Mixing ratio (grams of water vapor per kilogram of dry air)
+def mixing_ratio(deg_c, humidity, pressure=STANDARD_PRESSURE, method="magnus"):
+    vapor = vapor_pressure(deg_c, humidity, method)
+    return 621.97 * vapor / (pressure - vapor)
+
+
+# Surface condensation margin (degrees Celsius)
+def condensation_margin(deg_c, humidity, surface_c, method="magnus"):
+    """The surface temperature less the air's dew point. Condensation forms
+    on the surface when the margin reaches zero. None without water vapor."""
+    dew_c = dew_point_from_vapor_pressure(vapor_pressure(deg_c, humidity, method))
+    if dew_c == None:
+        return None
+    return surface_c - dew_c
+
+
+def psychrometrics(
+    deg_c, humidity, surface_c=None, pressure=STANDARD_PRESSURE, method="magnus"
+):
+    """Calculate all moist air quantities for one reading, sharing the
+    intermediate terms. The dew point and condensation margin are None when
+    the humidity is zero. Returns a Psychrometrics named tuple."""
+    saturation = saturation_vapor_pressure(deg_c, method)
+    vapor = (humidity / 100) * saturation
+    dew_c = dew_point_from_vapor_pressure(vapor)
+    margin = None
+    if surface_c != None and dew_c != None:
+        margin = surface_c - dew_c
+    return Psychrometrics(
+        saturation,
+        vapor,
+        dew_c,
+        216.679 * vapor / (deg_c + 273.15),
+        621.97 * vapor / (pressure - vapor),
+        margin,
+    )
+
+
+def psychrometrics_array(
+    deg_c, humidity, surface_c=None, pressure=STANDARD_PRESSURE, method="magnus"
+):
+    """Calculate all moist air quantities for lists or arrays of readings.
+    Returns a Psychrometrics named tuple of arrays (NumPy or ulab), or of
+    lists when no array module is available. Readings without water vapor
+    have a dew point and margin of NaN in an array or None in a list."""
+    if np == None:
+        readings = [
+            psychrometrics(
+                t,
+                h,
+                None if surface_c is None else surface_c[i],
+                pressure,
+                method,
+            )
+            for i, (t, h) in enumerate(zip(deg_c, humidity))
+        ]
+        return Psychrometrics(*[list(column) for column in zip(*readings)])
+
+    deg_c = np.array(deg_c)
+    humidity = np.array(humidity)
+    if method == "buck":
+        saturation = BUCK_A * np.exp(
+            (BUCK_B - (deg_c / BUCK_D)) * (deg_c / (BUCK_C + deg_c))
+        )
+    else:
+        saturation = MAGNUS_A * np.exp((MAGNUS_B * deg_c) / (MAGNUS_C + deg_c))
+    vapor = (humidity / 100) * saturation
+    dry = vapor <= 0  # No water vapor; no dew point
+    safe = np.array(vapor)
+    safe[dry] = MAGNUS_A  # Avoids log(0); replaced by NaN below
+    gamma = np.log(safe / MAGNUS_A)
+    dew_c = (MAGNUS_C * gamma) / (MAGNUS_B - gamma)
+    dew_c[dry] = float("nan")
+    margin = None
+    if surface_c is not None:  # Not != None; surface_c may be an array
+        margin = np.array(surface_c) - dew_c
+    return Psychrometrics(
+        saturation,
+        vapor,
+        dew_c,
+        216.679 * vapor / (deg_c + 273.15),
+        621.97 * vapor / (pressure - vapor),
+        margin,
+    )
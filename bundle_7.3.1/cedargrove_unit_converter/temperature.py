@@ -47,24 +47,26 @@ def kelvin_to_celsius(kelvins):
     return kelvins - 273.15
 
 
+# Dew point comfort range messages (degrees Celsius)
+_DEW_POINT_MESSAGES = (
+    (-9999, 10, "Safe", ": A bit dry for some."),
+    (10, 12, "Safe", ": Very comfortable."),
+    (13, 16, "Safe", ": Comfortable."),
+    (16, 18, "Safe", ": Okay for most."),
+    (18, 21, "Caution", ": Somewhat uncomfortable for most people."),
+    (21, 24, "Caution", ": Very humid, quite uncomfortable."),
+    (24, 26, "Extreme Caution", ": Extremely uncomfortable, fairly oppresive."),
+    (
+        26,
+        9999,
+        "DANGER",
+        ": Severely high, potentially deadly for asthma sufferers.",
+    ),
+)
+
+
 # Dew Point converter (degrees Celsius)
 def dew_point(deg_c, humidity, verbose=False):
-    message_list = (
-        (-9999, 10, "Safe", ": A bit dry for some."),
-        (10, 12, "Safe", ": Very comfortable."),
-        (13, 16, "Safe", ": Comfortable."),
-        (16, 18, "Safe", ": Okay for most."),
-        (18, 21, "Caution", ": Somewhat uncomfortable for most people."),
-        (21, 24, "Caution", ": Very humid, quite uncomfortable."),
-        (24, 26, "Extreme Caution", ": Extremely uncomfortable, fairly oppresive."),
-        (
-            26,
-            9999,
-            "DANGER",
-            ": Severely high, potentially deadly for asthma sufferers.",
-        ),
-    )
-
     dew_point_c = round(
         (
             pow(humidity / 100.0, 0.125) * (112.0 + (0.9 * deg_c))
@@ -76,40 +78,42 @@ def dew_point(deg_c, humidity, verbose=False):
 
     if verbose:
         for i in range(0, 8):  # Select range message from list
-            if message_list[i][0] <= dew_point_c < message_list[i][1]:
-                return dew_point_c, message_list[i][2] + message_list[i][3]
+            if _DEW_POINT_MESSAGES[i][0] <= dew_point_c < _DEW_POINT_MESSAGES[i][1]:
+                return dew_point_c, _DEW_POINT_MESSAGES[i][2] + _DEW_POINT_MESSAGES[i][3]
     return dew_point_c
 
 
+# Heat index range messages (degrees Celsius)
+# (source: https://en.wikipedia.org/wiki/Heat_index)
+_HEAT_INDEX_MESSAGES = (
+    (-99, 26, "Safe", ": Heat index is not a factor.", ""),
+    (
+        26,
+        32,
+        "Caution",
+        ": Fatigue is possible with prolonged exposure and activity. ",
+        "Continuing activity could result in heat cramps.",
+    ),
+    (
+        32,
+        41,
+        "Extreme Caution",
+        ": Heat cramps and heat exhaustion are possible. ",
+        "Continuing activity could result in heat stroke.",
+    ),
+    (
+        41,
+        54,
+        "DANGER",
+        ": Heat cramps and heat exhaustion are likely. ",
+        "Heat stroke is probable with continued activity.",
+    ),
+    (54, 99, "EXTREME DANGER", ": Heat stroke is imminent. ", ""),
+)
+
+
 # Heat/Comfort index (degrees Celsius)
 def heat_index(deg_c, humidity, verbose=False):
-    # (source: https://en.wikipedia.org/wiki/Heat_index)
-    message_list = (
-        (-99, 26, "Safe", ": Heat index is not a factor.", ""),
-        (
-            26,
-            32,
-            "Caution",
-            ": Fatigue is possible with prolonged exposure and activity. ",
-            "Continuing activity could result in heat cramps.",
-        ),
-        (
-            32,
-            41,
-            "Extreme Caution",
-            ": Heat cramps and heat exhaustion are possible. ",
-            "Continuing activity could result in heat stroke.",
-        ),
-        (
-            41,
-            54,
-            "DANGER",
-            ": Heat cramps and heat exhaustion are likely. ",
-            "Heat stroke is probable with continued activity.",
-        ),
-        (54, 99, "EXTREME DANGER", ": Heat stroke is imminent. ", ""),
-    )
-
     t = ((9 / 5) * deg_c) + 32  # Dry-bulb temperature in degrees Fahrenheit
     r = humidity  # Percentage value between 0 and 100
 
@@ -144,9 +148,11 @@ def heat_index(deg_c, humidity, verbose=False):
 
     if verbose:
         for i in range(0, 5):  # Select range message from list
-            if message_list[i][0] <= h_index_c < message_list[i][1]:
+            if _HEAT_INDEX_MESSAGES[i][0] <= h_index_c < _HEAT_INDEX_MESSAGES[i][1]:
                 return h_index_c, (
-                    message_list[i][2] + message_list[i][3] + message_list[i][4]
+                    _HEAT_INDEX_MESSAGES[i][2]
+                    + _HEAT_INDEX_MESSAGES[i][3]
+                    + _HEAT_INDEX_MESSAGES[i][4]
                 )
     return h_index_c
 
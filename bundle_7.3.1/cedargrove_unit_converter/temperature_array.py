@@ -0,0 +1,113 @@
+# The MIT License (MIT)
+
+# Copyright (c) 2020, 2021, 2022 Cedar Grove Studios
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+"""
+`temperature_array` - Array Temperature Converters
+================================================================================
+Array versions of the `temperature` converters for reprocessing many readings
+at once. Accepts NumPy arrays on a host computer or ulab arrays on
+CircuitPython devices that include ulab. After rounding, results match the
+scalar `temperature` functions value for value; values that fall on a
+rounding halfway point are rounded with the scalar round() on both NumPy
+and ulab. tools/temperature_array_benchmark.py checks the match with NumPy.
+
+* Author(s): Cedar Grove Studios
+"""
+
+try:
+    from ulab import numpy as np  # CircuitPython
+
+    _FLOAT = np.float
+except ImportError:
+    import numpy as np  # Host computer
+
+    _FLOAT = np.float64
+
+
+def _as_array(values):
+    # Convert a list, tuple, or array to a floating point array
+    return np.array(values, dtype=_FLOAT)
+
+
+def _round(values, digits):
+    # Round like the scalar round(). np.around() rounds a scaled copy, which
+    #   can differ from round() for values within a rounding error of a
+    #   halfway point. Those few values are rounded individually with round().
+    #   ulab lacks nonzero(), so its halfway values are found by index.
+    #   Scalar (0-d) and multi-dimensional input is rounded as a flat copy
+    #   and restored to its shape.
+    shape = values.shape
+    values = values.flatten()
+    rounded = np.around(values, decimals=digits)
+    scaled = values * (10 ** digits)
+    halfway = abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if hasattr(np, "nonzero"):
+        indices = np.nonzero(halfway)[0]
+    elif np.any(halfway):
+        indices = [i for i in range(len(halfway)) if halfway[i]]
+    else:
+        indices = ()
+    for i in indices:
+        rounded[i] = round(float(values[i]), digits)
+    return rounded.reshape(shape)
+
+
+# Celsius to Fahrenheit converter
+def celsius_to_fahrenheit(deg_c):
+    return ((9 / 5) * _as_array(deg_c)) + 32
+
+
+# Dew Point converter (degrees Celsius)
+def dew_point(deg_c, humidity):
+    deg_c = _as_array(deg_c)
+    humidity = _as_array(humidity)
+    return _round(
+        (
+            ((humidity / 100.0) ** 0.125) * (112.0 + (0.9 * deg_c))
+            + (0.1 * deg_c)
+            - 112.0
+        ),
+        2,
+    )
+
+
+# Heat/Comfort index (degrees Celsius)
+def heat_index(deg_c, humidity):
+    # (source: https://en.wikipedia.org/wiki/Heat_index)
+    t = ((9 / 5) * _as_array(deg_c)) + 32  # Dry-bulb temperature in degrees Fahrenheit
+    r = _as_array(humidity)  # Percentage value between 0 and 100
+    t2 = t * t
+    r2 = r * r
+
+    # Formula (Fahrenheit method, +/-1.3F: Rothfusz NWS-SR90-23, 1990, https://www.weather.gov/media/ffc/ta_htindx.PDF)
+    h_index_f = _round(
+        -42.379
+        + (2.04901523 * t)
+        + (10.14333127 * r)
+        + (-0.22475541 * t * r)
+        + (-0.00683783 * t2)
+        + (-0.05481717 * r2)
+        + (0.00122874 * t2 * r)
+        + (0.00085282 * t * r2)
+        + (-0.00000199 * t2 * r2),
+        1,
+    )
+    return _round((h_index_f - 32) * (5 / 9), 1)  # convert to degrees Celsius
@@ -3,15 +3,43 @@
 #
 # corrosion_code.py 2022-07-17 v4.0717
 
+# Start the boot phase profiler before any other imports
+from corrosion_profiler import BootProfiler, HeapWatch
+
+profiler = BootProfiler()
+
+# Intervals are timed with the integer time.monotonic_ns() throughout; the
+#   float time.monotonic() loses resolution after days of uptime.
 import time
+import asyncio
 import board
 import supervisor
-from digitalio import DigitalInOut, Direction
 from simpleio import map_range
-from corrosion_display import CorrosionDisplay
+from cedargrove_unit_converter.temperature import (
+    celsius_to_fahrenheit,
+    fahrenheit_to_celsius,
+)
+
+profiler.mark("import system modules")
+from corrosion_display import CorrosionDisplay, ALERT_NOTICE, ALERT_ERROR
+
+profiler.mark("import corrosion_display")
 from corrosion_sensors import CorrosionTempHumid, CorrosionTemp
+
+profiler.mark("import corrosion_sensors")
+from corrosion_aio import CorrosionAIO
+from corrosion_outbox import CorrosionOutbox
+from corrosion_logger import CorrosionLogger
+from corrosion_ringlog import CorrosionRingLog
+from corrosion_wetness import TimeOfWetness
+from corrosion_stats import RollingStats
+from corrosion_forecast import CondensationForecast
+from corrosion_fan import CorrosionFan
+from corrosion_scheduler import MinuteScheduler
 from cedargrove_shadow_detector import ShadowDetector
 
+profiler.mark("import other modules")
+
 print("running corrosion_code.py")
 
 # Reduce status neopixel brightness to help keep things cool on error exit
@@ -23,89 +51,320 @@ supervisor.set_rgb_status_brightness(16)
 supervisor.set_next_code_file(filename="code.py", reload_on_error=True)
 
 # fmt: off
-# Adafruit IO Feed Names
-SHOP_TEMP     = "shop.int-temperature"      # workshop temperature   (F)
-SHOP_HUMID    = "shop.int-humidity"         # workshop humidity      (%)
-SHOP_DP       = "shop.int-dewpoint"         # workshop dew point     (F)
-SHOP_CORR     = "shop.int-corrosion-index"  # workshop corrosion indicator (0, 1, 2)
-SHOP_PCB_TEMP = "shop.int-pcb-temperature"  # workshop device PCB temperature (F)
+# Adafruit IO Group and Feed Names
+SHOP_GROUP     = "shop"                           # workshop feed group
+SHOP_TEMP      = "shop.int-temperature"           # workshop temperature   (F)
+SHOP_HUMID     = "shop.int-humidity"              # workshop humidity      (%)
+SHOP_DP        = "shop.int-dewpoint"              # workshop dew point     (F)
+SHOP_CORR      = "shop.int-corrosion-index"       # workshop corrosion indicator (0, 1, 2)
+SHOP_PCB_TEMP  = "shop.int-pcb-temperature"       # workshop device PCB temperature (F)
+SHOP_TEMP_MIN  = "shop.int-temperature-min-24h"   # 24-hour minimum temperature (F)
+SHOP_TEMP_MAX  = "shop.int-temperature-max-24h"   # 24-hour maximum temperature (F)
+SHOP_HUMID_AVG = "shop.int-humidity-mean-24h"     # 24-hour mean humidity   (%)
+SHOP_FORECAST  = "shop.int-condensation-minutes"  # forecast minutes to corrosion ALERT
 
 # Sensor and cluster sending delays
 AIO_CLUSTER_DELAY  = 10  # minutes
 AIO_CLUSTER_OFFSET =  5  # minutes
-AIO_SENSOR_DELAY   =  2  # seconds
 DUAL_SENSOR_DELAY  =  3  # seconds
 
+# Store-and-forward queue controls
+OUTBOX_BATCH_SIZE     =  4  # Queued records replayed per batch
+OUTBOX_BATCH_INTERVAL = 50  # Minimum seconds between replay batches;
+                            #   below the once-a-minute replay cadence
+LOCAL_UTC_OFFSET      = -8  # Hours; converts queued record time to UTC
+
+# SD card log controls
+LOG_FLUSH_COUNT =    6  # Write the log buffer after this many records
+LOG_FLUSH_AGE   = 3600  # Write the log buffer when the oldest record is this old (sec)
+LOG_ROTATE      = "day"  # Start a new log file each "day" or "month"
+LOG_RETENTION   =    0  # Days of log files to keep; 0 keeps all files
+RING_CAPACITY   = 52560  # Binary ring log records; one year of 10-minute records
+WETNESS_STATE   = "/sd/wetness.bin"  # Time-of-wetness state; saved hourly
+
+# Rolling statistics controls; windows are in samples of STATS_INTERVAL minutes
+STATS_INTERVAL = 5          # Minutes between statistics samples
+STATS_WINDOWS  = (12, 288)  # 1-hour and 24-hour windows
+STATS_CHANNELS = ("temperature", "humidity", "dew_point", "pcb_temperature", "light")
+
+# Condensation forecast controls
+FORECAST_WINDOW  =  30  # Trend fit window (one-minute samples)
+FORECAST_HORIZON = 240  # Longest forecast (minutes); sent when no ALERT is forecast
+
 # Cooling fan controls
-FAN_ON_DISP_BRIGHTNESS =  0  # Display brightness when fan is running
-FAN_ON_TRESHOLD_F      = 80  # Degrees Farenheit
+FAN_ON_DISP_BRIGHTNESS =     0  # Display brightness limit at full cooling demand
+FAN_ON_TRESHOLD_F      =    80  # Fan start temperature; degrees Farenheit
+FAN_OFF_TRESHOLD_F     =    78  # Fan stop temperature; degrees Farenheit
+FAN_FULL_TRESHOLD_F    =    90  # Full cooling demand temperature; degrees Farenheit
+FAN_MIN_RUN            =   300  # Minimum fan run time (seconds)
+FAN_PWM                = False  # Drive the fan with PWM duty proportional to demand
+FAN_POWER_W            =   0.5  # Fan power at full duty (watts)
 
 # Gesture controls
 GESTURE_DURATION = 10            # Backlight "on" duration after gesture (seconds)
 GESTURE_DETECT_THRESHOLD = 0.90  # Detection threshold compared to ambient light
 
+# Boot profile and heap controls
+BOOT_PROFILE_TO_SD = True   # Append the boot phase table to /sd/boot_profile.txt
+HEAP_COLLECT_BELOW = 16384  # Collect garbage once a minute below this free heap (bytes)
+
 # Instantiate Corrosion Monitor classes
-sensor  = CorrosionTempHumid(sensor="SHT31D")
-pcb     = CorrosionTemp()
-disp    = CorrosionDisplay(brightness=0.75)
+sensor  = CorrosionTempHumid(sensor="SHT31D", periodic=True)
+profiler.mark("CorrosionTempHumid()")
+pcb     = CorrosionTemp(temp_delay=0)  # Latest continuous conversion
+profiler.mark("CorrosionTemp()")
+disp    = CorrosionDisplay(brightness=0.75, profiler=profiler)
+aio     = CorrosionAIO(disp.pyportal, group=SHOP_GROUP)
 gesture = ShadowDetector(pin=board.LIGHT, threshold=GESTURE_DETECT_THRESHOLD)
-
-fan           = DigitalInOut(board.D4)  # D4 Stemma 3-pin connector
-fan.direction = Direction.OUTPUT
-fan.value     = False  # Initialize with fan off
+profiler.mark("ShadowDetector()")
+
+fan     = CorrosionFan(
+    pin=board.D4,  # D4 Stemma 3-pin connector
+    on_c=fahrenheit_to_celsius(FAN_ON_TRESHOLD_F),
+    off_c=fahrenheit_to_celsius(FAN_OFF_TRESHOLD_F),
+    full_c=fahrenheit_to_celsius(FAN_FULL_TRESHOLD_F),
+    min_run=FAN_MIN_RUN,
+    pwm=FAN_PWM,
+    min_brightness=FAN_ON_DISP_BRIGHTNESS,
+    fan_power=FAN_POWER_W,
+)
 # fmt: on
 
-if disp.sd_card:
+# Preallocate the rolling statistics rings; the footprint stays fixed
+stats = {}
+for channel in STATS_CHANNELS:
+    stats[channel] = RollingStats(windows=STATS_WINDOWS)
+print(
+    "Rolling statistics: %d bytes"
+    % sum(stats[channel].footprint for channel in STATS_CHANNELS)
+)
+profiler.mark("RollingStats()")
+forecast = CondensationForecast(
+    size=FORECAST_WINDOW, interval=60, horizon=FORECAST_HORIZON
+)
+
+
+def time_string(now=None):
+    """Format a structured time as "YYYY-MM-DD, HH:MM:SS"."""
+    if now is None:
+        now = time.localtime()
+    return "%04d-%02d-%02d, %02d:%02d:%02d" % (
+        now[0], now[1], now[2], now[3], now[4], now[5]
+    )
+
+
+sd_present = disp.sd_card
+profiler.mark("SD card check")
+if sd_present:
     print("SD card present")
+    outbox = CorrosionOutbox(
+        path="/sd", batch_size=OUTBOX_BATCH_SIZE, batch_interval=OUTBOX_BATCH_INTERVAL
+    )
+    if outbox.pending:
+        print("Outbox: %d queued records" % outbox.pending)
+    logger = CorrosionLogger(
+        "/sd/logs",
+        flush_count=LOG_FLUSH_COUNT,
+        flush_age=LOG_FLUSH_AGE,
+        rotate=LOG_ROTATE,
+        retention=LOG_RETENTION,
+    )
+    try:
+        ringlog = CorrosionRingLog("/sd/ringlog.bin", capacity=RING_CAPACITY)
+    except OSError as e:
+        print("Ring log open error -", e)
+        ringlog = None  # The ring file is left untouched
+    fan_log = CorrosionLogger(
+        "/sd/fan.csv", flush_count=LOG_FLUSH_COUNT, flush_age=LOG_FLUSH_AGE
+    )
+    wetness = TimeOfWetness()
+    if wetness.load(WETNESS_STATE):
+        print("Time of wetness: %.1f hours recorded" % wetness.total_hours)
+    profiler.mark("SD logs and outbox")
 else:
     print("NO SD card")
+    outbox = None
+    logger = None
+    ringlog = None
+    fan_log = None
+    wetness = TimeOfWetness()  # Accumulates without persistence
+
+profiler.print_summary()
+if sd_present and BOOT_PROFILE_TO_SD:
+    try:
+        profiler.save("/sd/boot_profile.txt", stamp=time_string())
+    except OSError as e:
+        print("Boot profile save error -", e)
+
+aio_results = {}  # Feed delivery results of the most recent AIO request
+
+
+def send_record(record):
+    """Send a cluster record to AIO. Returns True when every feed of the
+    record was delivered. Records older than the current minute are sent
+    with their original UTC timestamp."""
+    global aio_results
+    epoch, temp, hum, dew, pcb_temp, corr = record[:6]
+    minutes = record[6] if len(record) > 6 else None  # Not in older records
+    created_at = None
+    if time.time() - epoch > 60:
+        utc = time.localtime(epoch - (LOCAL_UTC_OFFSET * 3600))
+        created_at = "%04d-%02d-%02dT%02d:%02d:%02dZ" % (
+            utc[0], utc[1], utc[2], utc[3], utc[4], utc[5]
+        )
+    aio_results = aio.push_cluster(
+        [
+            (SHOP_TEMP, temp),
+            (SHOP_HUMID, hum),
+            (SHOP_DP, dew),
+            (SHOP_PCB_TEMP, pcb_temp),
+            (SHOP_CORR, corr),
+            (SHOP_FORECAST, minutes),
+        ],
+        created_at=created_at,
+    )
+    return all(aio_results.values())
+
+
+def send_statistics():
+    """Send the 24-hour temperature range and mean humidity to AIO. Not
+    queued; a missed update is replaced by the next hour's."""
+    temp_mean, temp_dev, temp_min, temp_max = stats["temperature"].summary(1)
+    humid_mean, humid_dev, humid_min, humid_max = stats["humidity"].summary(1)
+    if None in (temp_min, humid_mean):
+        return
+    aio.push_cluster(
+        [
+            (SHOP_TEMP_MIN, round(celsius_to_fahrenheit(temp_min), 1)),
+            (SHOP_TEMP_MAX, round(celsius_to_fahrenheit(temp_max), 1)),
+            (SHOP_HUMID_AVG, round(humid_mean, 1)),
+        ]
+    )
+
 
 # fmt: off
-while_loop_startup_init   = True   # Forces first pass through loop sections
-previous_sensor_heater_on = False  # The historical sensor heater state
-backlight_timer           = None   # Used for timing the backlight
-backlight_on              = False  # The backlight state
-clock_tick                = False  # The clock tick indicator state
+# Task cadences
+CLOCK_TICK_INTERVAL = 1.0  # Clock tick indicator (seconds)
+GESTURE_INTERVAL    = 0.2  # Gesture, backlight, and alert animation (seconds)
+FAN_INTERVAL        = 10   # PCB temperature and cooling fan control (seconds)
 
 aio_feed_write = True  # Enable feeds to AIO
 sd_card_write  = True  # Enable sd card logging
+
+# Events set by the sensor task once fresh readings are available
+sd_log_due = asyncio.Event()  # Cluster record is ready for the SD card
+aio_due    = asyncio.Event()  # Minute readings are ready for AIO
+cluster_due = None            # Epoch minute (epoch // 60) of a pending cluster
 # fmt: on
 
-while True:
-    now = time.localtime()
-    format_str = "%04d-%02d-%02d, %02d:%02d:%02d"
-    time_str = format_str % (now[0], now[1], now[2], now[3], now[4], now[5])
-
-    disp.clock_tick = not disp.clock_tick  # Change the on-screen tick indicator
-
-    if not backlight_on:
-        # Check for gesture
-        if gesture.detect():
-            print(f"GESTURE DETECTED {time_str:16s}")
-            backlight_timer = time.monotonic()
-            backlight_on = True
-
-    if backlight_on:
-        # Set display brightness to maximum regardless of cooling fan state
-        disp.brightness = 1.0
-        # After GESTURE_DURATION seconds, dim the backlight
-        if (time.monotonic() - backlight_timer) > GESTURE_DURATION:
-            print(f"GESTURE TIMEOUT  {time_str:16s}")
-            backlight_on = False
-            print("Recalibrate light sensor background level")
-            gesture.refresh_background()  # Update light sensor ambient level value
-    else:
-        # Set the idle backlight level when not responding to a gesture
-        if fan.value:
-            # Drop the brightness level dramatically until things cool down
-            disp.brightness = FAN_ON_DISP_BRIGHTNESS
+# Minute tick deadlines; each epoch minute fires once
+schedule = MinuteScheduler(period=60)
+
+# Clock tick heap allocation; the steady-state tick allocates nothing
+heap = HeapWatch(collect_below=HEAP_COLLECT_BELOW)
+
+
+def cluster_minute(now):
+    """True during the minute that starts an AIO_CLUSTER_DELAY cluster,
+    AIO_CLUSTER_OFFSET minutes past the hour."""
+    return now.tm_min % AIO_CLUSTER_DELAY == AIO_CLUSTER_OFFSET
+
+
+async def clock_task():
+    """Blink the on-screen tick indicator and update the clock display when
+    the minute tick fires. Other ticks reuse existing objects; the heap
+    allocated by each tick is recorded by the heap watch."""
+    prev_tick = schedule.tick
+    while True:
+        heap.start()
+        disp.clock_tick = not disp.clock_tick  # Change the on-screen tick indicator
+        if schedule.tick != prev_tick:
+            prev_tick = schedule.tick
+            disp.show()  # Update clock display
+            heap.collect()  # Collect garbage only when the heap runs low
+        if disp.refresh_pending:
+            disp.refresh()  # Complete a refresh deferred by the frame budget
+        heap.stop()
+        await asyncio.sleep(CLOCK_TICK_INTERVAL)
+
+
+async def gesture_task():
+    """Watch for a gesture, control the display backlight level, and step
+    the display's alert blink animation."""
+    backlight_timer = None  # Used for timing the backlight
+    backlight_on = False  # The backlight state
+    while True:
+        if not backlight_on:
+            # Check for gesture
+            if gesture.detect():
+                print(f"GESTURE DETECTED {time_string():16s}")
+                backlight_timer = time.monotonic_ns()
+                backlight_on = True
+
+        if backlight_on:
+            # Set display brightness to maximum regardless of cooling fan state
+            disp.brightness = 1.0
+            # After GESTURE_DURATION seconds, dim the backlight
+            if (time.monotonic_ns() - backlight_timer) > GESTURE_DURATION * 1000000000:
+                print(f"GESTURE TIMEOUT  {time_string():16s}")
+                backlight_on = False
+                print("Recalibrate light sensor background level")
+                gesture.refresh_background()  # Update light sensor ambient level value
         else:
-            # Set the display to a slightly dimmed level based on ambient level
-            disp.brightness = map_range(gesture.background / 65535, 0.010, 0.750, 0.010, 0.5)
+            # Set the idle backlight level when not responding to a gesture;
+            #   a slightly dimmed level based on ambient level, reduced in
+            #   step with the fan's cooling demand until things cool down
+            disp.brightness = min(
+                map_range(gesture.background / 65535, 0.010, 0.750, 0.010, 0.5),
+                fan.brightness_limit,
+            )
+        disp.animate()  # Advance the alert blink by one frame
+        await asyncio.sleep(GESTURE_INTERVAL)
+
+
+async def fan_task():
+    """Read the PCB temperature, control the cooling fan, and log the fan's
+    hourly run time and energy to the SD card."""
+    prev_hour = time.localtime().tm_hour
+    prev_stats = fan.stats
+    prev_energy = fan.energy
+    while True:
+        pcb.read()  # Refresh the PCB temperature sensor
+        pcb_c, pcb_f = pcb.temperature
+        fan.update(pcb_c, disp.brightness)
+        disp.pcb_temperature = pcb_c
 
-    # Do something every minute or when first starting the while loop
-    if now.tm_sec == 0 or while_loop_startup_init:
-        disp.show()  # Update clock display
+        now = time.localtime()
+        if now.tm_hour != prev_hour:
+            run, duty, starts = fan.stats
+            fan_record = "%16s, %d, %d, %d, %.3f, %.1f" % (
+                time_string(now),
+                run - prev_stats[0],  # Run seconds this hour
+                duty - prev_stats[1],  # Duty-weighted run seconds this hour
+                starts - prev_stats[2],  # Starts this hour
+                fan.energy - prev_energy,  # Energy this hour (Wh)
+                fan.backlight_rise,  # Estimated backlight PCB rise (C)
+            )
+            print("FAN: " + fan_record)
+            if fan_log:
+                fan_log.log(fan_record)
+            prev_hour = now.tm_hour
+            prev_stats = fan.stats
+            prev_energy = fan.energy
+        await asyncio.sleep(FAN_INTERVAL)
+
+
+async def sensor_task():
+    """Acquire the temperature and humidity readings at the start of every
+    minute, update the display, and signal the SD and AIO tasks."""
+    global cluster_due
+    startup_init = True  # Forces the display refresh on the first pass
+    previous_sensor_heater_on = False  # The historical sensor heater state
+    schedule.sync()
+    minute = schedule.tick - 1  # The start-up reading takes the current minute
+    while True:
+        now = time.localtime(minute * 60)  # The scheduled minute
+        time_str = time_string(now)
 
         # Acquire and condition sensor data
         disp.sensor_icon = True
@@ -116,136 +375,272 @@ while True:
         dew_pt_c, dew_pt_f = sensor.dew_point  # Get dew point values
         corrosion_index = sensor.corrosion_index  # Get corrosion index value
 
-        pcb.read()  # Refresh the PCB temperature sensor
-        pcb_c, pcb_f = pcb.temperature
-
-        if pcb_f > FAN_ON_TRESHOLD_F:  # turn on cooling fan if needed
-            fan.value = True
-        else:
-            fan.value = False
+        # Forecast the minutes until the corrosion ALERT margin; samples are
+        #   timed by their scheduled minute so that caught-up ticks keep
+        #   their spacing
+        forecast.update(minute * 60, temp_c, dew_pt_c)
+        disp.condensation_forecast = forecast.minutes_to_alert
+
+        # Sample the rolling statistics; show the 24-hour temperature range
+        if now.tm_min % STATS_INTERVAL == 0:
+            stats["temperature"].add(temp_c)
+            stats["humidity"].add(humid)
+            stats["dew_point"].add(dew_pt_c)
+            stats["pcb_temperature"].add(pcb.temperature[0])
+            stats["light"].add(gesture.background)
+            mean, deviation, low, high = stats["temperature"].summary(1)
+            disp.temperature_range = (low, high)
+
+        # Accumulate time of wetness; save the state hourly and at each new day
+        new_day = wetness.update(minute * 60, temp_c, humid)
+        if sd_present and (new_day or now.tm_min == 0):
+            try:
+                wetness.save(WETNESS_STATE)
+            except OSError as e:
+                print("Time of wetness save error -", e)
+            print(
+                "Time of wetness (h/yr): 30d %.0f %s, 90d %.0f %s, 365d %.0f %s"
+                % (
+                    wetness.annual_hours(30),
+                    wetness.corrosivity(30),
+                    wetness.annual_hours(90),
+                    wetness.corrosivity(90),
+                    wetness.annual_hours(365),
+                    wetness.corrosivity(365),
+                )
+            )
 
-        # Send sensor values to the display
-        disp.temperature = temp_c
-        disp.humidity = humid
+        # Send sensor values to the display with a single refresh
+        with disp.batch():
+            disp.temperature = temp_c
+            disp.humidity = humid
         disp.corrosion_status = corrosion_index
-        disp.pcb_temperature = pcb_c
 
         # Display changed sensor heater status once
         if sensor.heater_on != previous_sensor_heater_on:
             if sensor.heater_on:
-                disp.alert("Sensor heater: ON")
+                disp.alert("Sensor heater: ON", ALERT_NOTICE)
             else:
-                disp.alert("Sensor heater: OFF")
+                disp.alert("Sensor heater: OFF", ALERT_NOTICE)
         previous_sensor_heater_on = sensor.heater_on
 
         # Print temperature values to REPL
-        print(
-            "Fahrenheit: %16s, %3.1f, %3.1f, %3.1f"
-            % (time_str, temp_f, humid, dew_pt_f)
-        )
-        print(
-            "Celsius:    %16s, %3.1f, %3.1f, %3.1f"
-            % (time_str, temp_c, humid, dew_pt_c)
-        )
+        if not None in (temp_c, humid, dew_pt_c):
+            print(
+                "Fahrenheit: %16s, %3.1f, %3.1f, %3.1f"
+                % (time_str, temp_f, humid, dew_pt_f)
+            )
+            print(
+                "Celsius:    %16s, %3.1f, %3.1f, %3.1f"
+                % (time_str, temp_c, humid, dew_pt_c)
+            )
 
-        disp.show(refresh=while_loop_startup_init)  # Enable the display
-        while_loop_startup_init = False  # Reset the while loop startup flag
-
-    # Do something every AIO_CLUSTER_DELAY starting at AIO_CLUSTER_OFFSET
-    #   minutes past the hour
-    if now.tm_min % AIO_CLUSTER_DELAY == AIO_CLUSTER_OFFSET and now.tm_sec < 10:
-        # Send sensor data to the SD card and AIO
-        if sd_card_write:
-            sd_data_record = "%16s, %3.1f, %3.1f, %3.1f" % (
-                time_str,
-                temp_f,
+        disp.show(refresh=startup_init)  # Enable the display
+        startup_init = False
+
+        if now.tm_min == 0:
+            ticks, caught_up, skipped = schedule.stats
+            mean_ms, max_ms = schedule.jitter
+            print(
+                "Scheduler: %d ticks, %d caught up, %d skipped, jitter %.0f/%.0f ms"
+                % (ticks, caught_up, skipped, mean_ms, max_ms)
+            )
+            passes, peak, total, collections = heap.stats
+            print(
+                "Heap: %s free, clock ticks %d, peak %d, total %d bytes, %d collections"
+                % (heap.mem_free, passes, peak, total, collections)
+            )
+            print("Display: %d date and %d clock texts built" % disp.format_counts)
+
+        # Write buffered log records that have reached the flush age
+        if logger:
+            logger.poll()
+        if fan_log:
+            fan_log.poll()
+
+        # Hand the fresh readings to the SD and AIO tasks
+        if cluster_minute(now):
+            cluster_due = minute  # Kept until the AIO task sends the cluster
+            sd_log_due.set()
+        aio_due.set()
+
+        # Wait for the next minute's deadline
+        minute = None
+        while minute == None:
+            await asyncio.sleep(schedule.delay())
+            minute = schedule.fire()
+
+
+async def sd_log_task():
+    """Append a record to the SD card log file every AIO_CLUSTER_DELAY
+    minutes."""
+    while True:
+        await sd_log_due.wait()
+        sd_log_due.clear()
+        if not sd_card_write:
+            continue
+        temp_c, temp_f = sensor.temperature
+        dew_pt_c, dew_pt_f = sensor.dew_point
+        humid = sensor.humidity
+        if None in (temp_f, humid, dew_pt_f):
+            continue
+        epoch = time.time()
+        sd_data_record = "%16s, %3.1f, %3.1f, %3.1f" % (
+            time_string(time.localtime(epoch)),
+            temp_f,
+            humid,
+            dew_pt_f,
+        )
+        print("SD: " + sd_data_record)
+        if ringlog:
+            pcb_c, pcb_f = pcb.temperature
+            ringlog.append(
+                epoch,
+                temp_c,
                 humid,
-                dew_pt_f,
+                dew_pt_c,
+                pcb_c,
+                sensor.corrosion_index,
+                sensor.heater_on,
             )
-            print("SD: " + sd_data_record)
-            if disp.sd_card:
+        if logger:
+            if logger.log(sd_data_record, epoch):  # Buffer flushed to the SD card
                 disp.sd_icon = True
-                log_file = open("/sd/logfile.csv", "a")
-                log_file.write(sd_data_record)
-                log_file.close()
-                time.sleep(1)
+                await asyncio.sleep(0.5)  # Show the SD icon briefly
                 disp.sd_icon = False
-            else:
-                disp.alert("-- NO SD CARD")
-
-        # Send sensor data to Adafruit IO
-        if aio_feed_write:
-            disp.show()  # Update the display
-            # Send temperature to AIO feed
-            if temp_f != None:
-                disp._temperature.color = disp.BLUE
-                disp.network_icon = True
-                disp.pyportal.push_to_io(SHOP_TEMP, temp_f)
-                disp.network_icon = False
-                time.sleep(AIO_SENSOR_DELAY)
-            disp._temperature.color = disp.WHITE
-
-            disp.show()  # Update the display
-            # Send humidity to AIO feed
-            if humid != None:
-                disp._humidity.color = disp.BLUE
-                disp.network_icon = True
-                disp.pyportal.push_to_io(SHOP_HUMID, humid)
-                disp.network_icon = False
-                time.sleep(AIO_SENSOR_DELAY)
-            disp._humidity.color = disp.WHITE
-
-            disp.show()  # Update the display
-            # Send dew point temperature to AIO feed
-            if dew_pt_f != None:
-                disp._dew_point.color = disp.BLUE
+        else:
+            disp.alert("-- NO SD CARD", ALERT_ERROR)
+
+
+async def aio_task():
+    """Send the sensor cluster to Adafruit IO every AIO_CLUSTER_DELAY
+    minutes, replay queued records in the minutes between clusters, and
+    update the local time from the AIO time service."""
+    global aio_results, cluster_due
+    while True:
+        await aio_due.wait()
+        aio_due.clear()
+        if not aio_feed_write:
+            continue
+
+        if cluster_due == None:
+            # Replay any records queued during a network outage
+            if outbox and outbox.pending:
                 disp.network_icon = True
-                disp.pyportal.push_to_io(SHOP_DP, dew_pt_f)
+                outbox.replay(send_record)
                 disp.network_icon = False
-                time.sleep(AIO_SENSOR_DELAY)
-            disp._dew_point.color = disp.WHITE
+            continue
+        now = time.localtime(cluster_due * 60)  # The cluster minute
+        cluster_due = None
 
-            disp.show()  # Update the display
-            # Send PyPortal PCB temperature to AIO feed
-            if pcb_f != None:
-                disp._pcb_temp.color = disp.BLUE
-                disp.network_icon = True
-                disp.pyportal.push_to_io(SHOP_PCB_TEMP, pcb_f)
-                disp.network_icon = False
-                time.sleep(AIO_SENSOR_DELAY)
-            disp._pcb_temp.color = disp.CYAN
+        temp_c, temp_f = sensor.temperature
+        dew_pt_c, dew_pt_f = sensor.dew_point
+        humid = sensor.humidity
+        pcb_c, pcb_f = pcb.temperature
+        corrosion_index = sensor.corrosion_index
 
-            disp.show()  # Update the display
-            # Send corrosion index value to AIO feed
+        # Send sensor data to Adafruit IO as a single grouped request. The
+        #   record is first queued on the SD card so that it survives a
+        #   network outage or an error reload; queued records are replayed
+        #   oldest first.
+        disp.show()  # Update the display
+        # fmt: off
+        cluster = [
+            (SHOP_TEMP,     temp_f,   disp._temperature, disp.WHITE),
+            (SHOP_HUMID,    humid,    disp._humidity,    disp.WHITE),
+            (SHOP_DP,       dew_pt_f, disp._dew_point,   disp.WHITE),
+            (SHOP_PCB_TEMP, pcb_f,    disp._pcb_temp,    disp.CYAN),
+        ]
+        # fmt: on
+        with disp.batch():
+            for feed, value, label, color in cluster:
+                if value != None:
+                    label.color = disp.BLUE
+            corr_value = None
             if not None in (temp_f, dew_pt_f):
+                corr_value = corrosion_index
                 disp._status_icon.fill = disp.BLUE
                 disp._status.color = None
-                disp.network_icon = True
-                disp.pyportal.push_to_io(SHOP_CORR, corrosion_index)
-                disp.network_icon = False
-                disp.corrosion_status = corrosion_index  # refresh status
-                time.sleep(AIO_SENSOR_DELAY)
 
-            disp.show()  # Update the display
+        minutes = None
+        if forecast.ready:
+            minutes = forecast.minutes_to_alert
+            if minutes == None:
+                minutes = FORECAST_HORIZON  # No ALERT forecast within the horizon
+        record = (time.time(), temp_f, humid, dew_pt_f, pcb_f, corr_value, minutes)
+        disp.network_icon = True
+        if outbox:
+            outbox.append(record)
+            outbox.replay(send_record)
+            if outbox.pending:
+                aio_results = {}  # Current record is still queued
+        else:
+            send_record(record)
+        disp.network_icon = False
+
+        # Restore the feed colors; flag any feed that was not delivered
+        with disp.batch():
+            for feed, value, label, color in cluster:
+                if aio_results.get(feed, value == None):
+                    label.color = color
+                else:
+                    label.color = disp.ORANGE
+        if corr_value != None:
+            disp.corrosion_status = corrosion_index  # refresh status
+            if not aio_results.get(SHOP_CORR, False):
+                disp._status_icon.fill = disp.ORANGE
 
-            try:
-                # Update the local time from AIO time service
-                disp.network_icon = True
-                disp.clock_icon = True
-                disp.clock_tick = False
-                disp.pyportal.get_local_time()
-                disp.clock_icon = False
-                disp.network_icon = False
-                now = time.localtime()
-                time_str = format_str % (now[0], now[1], now[2], now[3], now[4], now[5])
-                print("Time updated from AIO:", time_str)
-            except (ValueError, RuntimeError) as e:
-                disp.alert("-- Get time error -" + str(e))
+        disp.show()  # Update the display
+        await asyncio.sleep(0)  # Let the clock and gesture tasks run
+
+        if now.tm_min == AIO_CLUSTER_OFFSET:
+            send_statistics()  # Hourly 24-hour aggregates
+
+        try:
+            # Update the local time from AIO time service
+            disp.network_icon = True
+            disp.clock_icon = True
+            disp.clock_tick = False
+            disp.pyportal.get_local_time()
+            disp.clock_icon = False
+            disp.network_icon = False
+            print("Time updated from AIO:", time_string())
+            schedule.sync()  # Realign the minute deadlines to the new time
+        except (ValueError, RuntimeError) as e:
+            disp.alert("-- Get time error -" + str(e), ALERT_ERROR)
 
         disp.show()  # Update the display
         disp.alert()  # Clear error notifications
 
-    # Wait one second before looping (blocking)
-    prev_sec = now.tm_sec
-    while now.tm_sec == prev_sec:
-        now = time.localtime()
+
+async def main():
+    await asyncio.gather(
+        asyncio.create_task(clock_task()),
+        asyncio.create_task(gesture_task()),
+        asyncio.create_task(fan_task()),
+        asyncio.create_task(sensor_task()),
+        asyncio.create_task(sd_log_task()),
+        asyncio.create_task(aio_task()),
+    )
+
+
+try:
+    asyncio.run(main())
+finally:
+    # Write buffered log records before the error reload; each write is tried
+    # on its own so that a failed card write doesn't skip the others
+    if logger:
+        try:
+            logger.sync()
+        except OSError as e:
+            print("Log sync error -", e)
+    if fan_log:
+        try:
+            fan_log.sync()
+        except OSError as e:
+            print("Fan log sync error -", e)
+    if sd_present:
+        try:
+            wetness.save(WETNESS_STATE)
+        except OSError as e:
+            print("Time of wetness save error -", e)
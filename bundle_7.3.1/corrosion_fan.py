@@ -0,0 +1,165 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_fan.py  2022-07-17 v1.0717
+
+import time
+import board
+
+
+class CorrosionFan:
+    """A PCB cooling fan controller. The fan starts when the PCB temperature
+    reaches on_c and stops when it falls to off_c after running for at least
+    min_run seconds. The cooling demand rises from 0 at off_c to 1 at full_c.
+    With pwm=True the fan speed follows the demand, with a floor of
+    min_duty so that the fan does not stall.
+
+    The display backlight heats the PCB. Its share of the PCB temperature
+    is estimated as backlight_gain degrees Celsius at full brightness,
+    reached with a first-order lag of backlight_tau seconds. The fan starts
+    on the measured PCB temperature, but stops when the PCB temperature
+    less the backlight's share falls to off_c, so the backlight's heat does
+    not keep the fan running; it is left to the backlight limit. The
+    controller dims the backlight in step with the cooling demand, which
+    follows the measured PCB temperature whether or not the fan runs:
+    brightness_limit falls from 1.0 toward min_brightness as the demand
+    rises.
+
+    Run time, duty-weighted run time, starts, and energy (fan_power watts at
+    full duty) are totalled for logging. Times are kept as integer
+    time.monotonic_ns() values."""
+
+    def __init__(
+        self,
+        pin=board.D4,
+        on_c=26.7,
+        off_c=25.6,
+        full_c=32.2,
+        min_run=300,
+        pwm=False,
+        min_duty=0.3,
+        frequency=25000,
+        min_brightness=0.0,
+        backlight_gain=2.0,
+        backlight_tau=600,
+        fan_power=0.5,
+        debug=False,
+    ):
+        self._on_c = on_c  # Start temperature (C)
+        self._off_c = off_c  # Stop temperature (C)
+        self._full_c = full_c  # Full demand temperature (C)
+        self._min_run = min_run * 1000000000  # Minimum run time (ns)
+        self._min_duty = min_duty  # Lowest PWM duty while running
+        self._min_brightness = min_brightness  # Backlight limit at full demand
+        self._backlight_gain = backlight_gain  # PCB rise at full brightness (C)
+        self._backlight_tau = backlight_tau * 1000000000  # Rise time constant (ns)
+        self._fan_power = fan_power  # Fan power at full duty (W)
+
+        if pwm:
+            import pwmio
+
+            self._fan = pwmio.PWMOut(pin, frequency=frequency, duty_cycle=0)
+        else:
+            from digitalio import DigitalInOut, Direction
+
+            self._fan = DigitalInOut(pin)  # D4 Stemma 3-pin connector
+            self._fan.direction = Direction.OUTPUT
+            self._fan.value = False  # Initialize with fan off
+        self._pwm = pwm
+
+        self._running = False
+        self._duty = 0.0  # Current fan duty (0.0 to 1.0)
+        self._demand = 0.0  # Current cooling demand (0.0 to 1.0)
+        self._started = None  # Time the fan last started (ns)
+        self._last = None  # Time of the previous update (ns)
+        self._pcb_c = None
+        self._backlight_rise = 0.0  # Estimated backlight PCB rise (C)
+
+        self._run_ns = 0  # Total fan run time (ns)
+        self._duty_ms = 0  # Total duty-weighted run time (ms)
+        self._starts = 0  # Number of fan starts
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def running(self):
+        # The fan is running.
+        return self._running
+
+    @property
+    def duty(self):
+        # The current fan duty (0.0 to 1.0).
+        return self._duty
+
+    @property
+    def brightness_limit(self):
+        # The highest idle backlight brightness for the current demand.
+        return 1.0 - self._demand * (1.0 - self._min_brightness)
+
+    @property
+    def backlight_rise(self):
+        # The estimated PCB temperature rise from the backlight (C).
+        return self._backlight_rise
+
+    @property
+    def stats(self):
+        # Run seconds, duty-weighted run seconds, and starts; integers.
+        return self._run_ns // 1000000000, self._duty_ms // 1000, self._starts
+
+    @property
+    def energy(self):
+        # Estimated fan energy since instantiation (Wh).
+        return self._duty_ms * self._fan_power / 3600000
+
+    def update(self, pcb_c, brightness=0.0, now=None):
+        """Update the fan from the PCB temperature (C) and the backlight
+        brightness (0.0 to 1.0) at now (time.monotonic_ns() by default). A
+        None temperature keeps the fan state. Returns the fan duty."""
+        if now is None:
+            now = time.monotonic_ns()
+        elapsed = 0
+        if self._last is not None:
+            elapsed = max(now - self._last, 0)
+            if self._running:
+                self._run_ns += elapsed
+                self._duty_ms += int(elapsed // 1000000 * self._duty)
+        self._last = now
+
+        # The backlight's estimated PCB rise approaches its steady state
+        target = self._backlight_gain * brightness
+        if self._backlight_tau:
+            step = min(elapsed / self._backlight_tau, 1.0)
+        else:
+            step = 1.0
+        self._backlight_rise += (target - self._backlight_rise) * step
+        if pcb_c == None:
+            return self._duty
+        self._pcb_c = pcb_c
+
+        # Start on the PCB temperature; stop on it less the backlight's share
+        control_c = pcb_c - self._backlight_rise
+        if self._running:
+            if control_c <= self._off_c and now - self._started >= self._min_run:
+                self._running = False
+        elif pcb_c >= self._on_c:
+            self._running = True
+            self._started = now
+            self._starts += 1
+
+        # The cooling demand follows the measured PCB temperature
+        self._demand = min(
+            max((pcb_c - self._off_c) / (self._full_c - self._off_c), 0.0), 1.0
+        )
+        self._duty = 0.0
+        if self._running:
+            self._duty = 1.0
+            if self._pwm:
+                self._duty = self._min_duty + (1.0 - self._min_duty) * self._demand
+        if self._pwm:
+            self._fan.duty_cycle = int(self._duty * 65535)
+        else:
+            self._fan.value = self._running
+        return self._duty
@@ -0,0 +1,166 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_logic.py  2022-07-17 v1.0717
+"""Board-independent corrosion calculations shared by the device and the
+host-side log tools."""
+
+from cedargrove_unit_converter.temperature import dew_point
+
+# fmt: off
+# Corrosion index thresholds
+ALERT_MARGIN   =  2  # Temperature to dew point margin for CORROSION ALERT (C)
+WARNING_MARGIN =  5  # Temperature to dew point margin for CORROSION WARNING (C)
+ALERT_HUMIDITY = 80  # Relative humidity for CORROSION ALERT (%)
+
+NORMAL  = 0
+WARNING = 1
+ALERT   = 2
+
+# Corrosion state hysteresis and sensor heater limits (CorrosionState)
+ALERT_HYSTERESIS    =    1  # Margin above ALERT_MARGIN to leave ALERT (C)
+WARNING_HYSTERESIS  =    1  # Margin above WARNING_MARGIN to leave WARNING (C)
+HUMIDITY_HYSTERESIS =    3  # Humidity below ALERT_HUMIDITY to leave ALERT (%)
+STATE_DWELL         =  600  # Minimum time in a state before a lower state (sec)
+HEATER_MIN_ON       =  120  # Minimum heater on time (sec)
+HEATER_MIN_OFF      =  300  # Minimum heater off time (sec)
+HEATER_DUTY         = 0.10  # Heater duty-cycle limit
+HEATER_DUTY_WINDOW  = 3600  # Duty-cycle averaging period (sec)
+# fmt: on
+
+
+def condition(temp_c, humid_pct):
+    """Constrain and round raw sensor values and calculate the dew point.
+    Returns temperature (C), humidity (%), and dew point (C); any value that
+    cannot be determined is None."""
+    if temp_c != None:
+        temp_c = round(min(max(temp_c, -40), 125), 1)
+    if humid_pct != None:
+        humid_pct = round(min(max(humid_pct, 0), 100), 1)
+    if None in (temp_c, humid_pct):
+        return temp_c, humid_pct, None
+    return temp_c, humid_pct, dew_point(temp_c, humid_pct)
+
+
+def corrosion_index(temp_c, humid_pct, dew_c):
+    """The corrosion index: 0 (NORMAL), 1 (WARNING), or 2 (ALERT). Returns None
+    if the temperature or dew point is None."""
+    if None in (temp_c, dew_c):
+        return None
+    if (temp_c <= dew_c + ALERT_MARGIN) or humid_pct >= ALERT_HUMIDITY:
+        return ALERT
+    if temp_c <= dew_c + WARNING_MARGIN:
+        return WARNING
+    return NORMAL
+
+
+class CorrosionState:
+    """A corrosion index and sensor heater state machine. A higher corrosion
+    index is entered at the corrosion_index() thresholds without delay; a
+    lower index is entered only after STATE_DWELL seconds in the current
+    state and once the margin or humidity clears its threshold by the
+    hysteresis amount.
+
+    The heater follows the ALERT state, limited by minimum on and off times
+    and a duty-cycle budget. Sensirion specifies the SHT3x heater for
+    plausibility checks rather than continuous use and rates the SHT4x
+    heater for a 10% duty cycle; the same 10% limit is applied here. The
+    budget fills at the duty rate up to duty * duty_window seconds and
+    drains while the heater is on."""
+
+    def __init__(
+        self,
+        dwell=STATE_DWELL,
+        heater_min_on=HEATER_MIN_ON,
+        heater_min_off=HEATER_MIN_OFF,
+        heater_duty=HEATER_DUTY,
+        duty_window=HEATER_DUTY_WINDOW,
+    ):
+        self._dwell = dwell
+        self._min_on = heater_min_on
+        self._min_off = heater_min_off
+        self._duty = heater_duty
+        self._budget_max = heater_duty * duty_window
+        self._budget = self._budget_max  # Heater seconds available (sec)
+
+        self._index = NORMAL
+        self._entered = None  # Time the current state was entered
+        self._heater = False
+        self._heater_changed = None  # Time of the last heater change
+        self._last = None  # Time of the previous update
+
+        self._transitions = 0  # Corrosion index changes
+        self._heater_switches = 0  # Heater on and off changes
+        self._heater_seconds = 0  # Total heater on time (sec)
+
+    @property
+    def index(self):
+        # The corrosion index: NORMAL, WARNING, or ALERT.
+        return self._index
+
+    @property
+    def heater(self):
+        # The requested sensor heater state.
+        return self._heater
+
+    @property
+    def stats(self):
+        # Corrosion index transitions, heater switches, and heater seconds.
+        return self._transitions, self._heater_switches, self._heater_seconds
+
+    def _release(self, temp_c, humid_pct, dew_c):
+        # The index with the thresholds relaxed by the hysteresis amounts
+        if (temp_c <= dew_c + ALERT_MARGIN + ALERT_HYSTERESIS) or (
+            humid_pct >= ALERT_HUMIDITY - HUMIDITY_HYSTERESIS
+        ):
+            return ALERT
+        if temp_c <= dew_c + WARNING_MARGIN + WARNING_HYSTERESIS:
+            return WARNING
+        return NORMAL
+
+    def update(self, now, temp_c, humid_pct, dew_c):
+        """Advance the state machine to now (seconds; any monotonic clock,
+        such as time.monotonic_ns() // 10**9) with a conditioned reading. A
+        reading with a None temperature or dew point keeps the current index.
+        Returns the corrosion index."""
+        if self._last is not None:
+            elapsed = max(now - self._last, 0)
+            if self._heater:
+                self._heater_seconds += elapsed
+                self._budget -= elapsed
+            self._budget = min(self._budget + elapsed * self._duty, self._budget_max)
+        self._last = now
+
+        index = corrosion_index(temp_c, humid_pct, dew_c)
+        if index is not None:
+            if index < self._index:
+                release = self._release(temp_c, humid_pct, dew_c)
+                index = max(index, min(self._index, release))
+                if self._entered is not None and now - self._entered < self._dwell:
+                    index = self._index
+            if index != self._index:
+                self._index = index
+                self._entered = now
+                self._transitions += 1
+            elif self._entered is None:
+                self._entered = now
+
+        # Heater follows ALERT within the dwell and duty-cycle limits
+        since = None if self._heater_changed is None else now - self._heater_changed
+        if self._heater:
+            if self._budget <= 0 or (
+                self._index != ALERT and (since is None or since >= self._min_on)
+            ):
+                self._set_heater(False, now)
+        elif (
+            self._index == ALERT
+            and (since is None or since >= self._min_off)
+            and self._budget >= self._min_on
+        ):
+            self._set_heater(True, now)
+        return self._index
+
+    def _set_heater(self, heater, now):
+        self._heater = heater
+        self._heater_changed = now
+        self._heater_switches += 1
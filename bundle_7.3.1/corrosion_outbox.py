@@ -0,0 +1,196 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_outbox.py  2022-07-17 v1.0717
+
+import time
+
+
+class CorrosionOutbox:
+    """A persistent store-and-forward queue for cluster records that have not
+    yet been delivered to Adafruit IO. Records are appended to a text file on
+    the SD card; a small index file holds the byte offset of the oldest
+    undelivered record and the pending record count so that start-up does not
+    rescan the queue file.
+
+    A record line that cannot be parsed, such as one torn by a power loss
+    during a write, is skipped, counted, and copied to a .bad file. The
+    queue file is truncated only after a replay has read it to the end."""
+
+    def __init__(
+        self,
+        path="/sd",
+        batch_size=4,
+        batch_interval=60,
+        fields=(6, 7),
+        debug=False,
+    ):
+        self._data_path = path + "/outbox.csv"
+        self._index_path = path + "/outbox.idx"
+        self._bad_path = path + "/outbox.bad"
+        self._batch_size = batch_size  # Maximum records sent per replay
+        self._batch_interval = batch_interval  # Minimum seconds between replays
+        self._fields = fields  # Fewest and most fields in a valid record
+        self._last_replay = None
+
+        self._offset = 0  # Byte offset of the oldest undelivered record
+        self._pending = 0  # Number of undelivered records
+        self._skipped = 0  # Malformed records skipped since instantiation
+        self._line_end = False  # The queue file is known to end with a newline
+        self._load_index()
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def pending(self):
+        # The number of records waiting to be delivered.
+        return self._pending
+
+    @property
+    def skipped(self):
+        # The number of malformed records skipped since instantiation.
+        return self._skipped
+
+    def _load_index(self):
+        # Read the index file; rebuild it from the queue file if missing or
+        #   if its offset is beyond the end of the queue file
+        try:
+            with open(self._index_path, "r") as index_file:
+                offset, pending = index_file.readline().split(",")
+                self._offset = int(offset)
+                self._pending = int(pending)
+            with open(self._data_path, "r") as data_file:
+                data_file.seek(0, 2)
+                if self._offset <= data_file.tell():
+                    return
+        except (OSError, ValueError):
+            pass
+        self._offset = 0
+        self._recount()
+        self._save_index()
+
+    def _recount(self):
+        # Count the records from the oldest undelivered record to the end
+        self._pending = 0
+        try:
+            with open(self._data_path, "r") as data_file:
+                data_file.seek(self._offset)
+                for line in data_file:
+                    if line.strip():
+                        self._pending += 1
+        except OSError:
+            pass  # No queue file yet
+
+    def _save_index(self):
+        with open(self._index_path, "w") as index_file:
+            index_file.write("%d,%d\n" % (self._offset, self._pending))
+
+    def append(self, record):
+        """Add a record (a tuple of numbers or None) to the end of the queue.
+        The next replay is not held back by batch_interval, so a record can
+        be sent straight after it is queued."""
+        line = ",".join(["" if v is None else str(v) for v in record])
+        if not self._line_end:
+            # End a record torn by a power loss so that it stays on its own line
+            try:
+                with open(self._data_path, "r") as data_file:
+                    data_file.seek(0, 2)
+                    if data_file.tell():
+                        data_file.seek(data_file.tell() - 1)
+                        if data_file.read(1) != "\n":
+                            line = "\n" + line
+            except OSError:
+                pass  # No queue file yet
+            self._line_end = True
+        with open(self._data_path, "a") as data_file:
+            data_file.write(line + "\n")
+        self._pending += 1
+        self._last_replay = None
+        self._save_index()
+
+    def _parse(self, line):
+        # A record tuple or None if the line is malformed
+        fields = line.strip().split(",")
+        if not self._fields[0] <= len(fields) <= self._fields[1]:
+            return None
+        record = []
+        for field in fields:
+            if field == "":
+                record.append(None)
+                continue
+            try:
+                record.append(int(field))
+            except ValueError:
+                try:
+                    record.append(float(field))  # Includes "1e-05" and "inf"
+                except ValueError:
+                    return None
+        return tuple(record)
+
+    def _skip(self, line):
+        # Count a malformed record and copy it to the .bad file
+        self._skipped += 1
+        print("OUTBOX: skipped malformed record", repr(line.strip()))
+        try:
+            with open(self._bad_path, "a") as bad_file:
+                bad_file.write(line.strip() + "\n")
+        except OSError:
+            pass
+
+    def replay(self, send):
+        """Deliver up to batch_size of the oldest records, oldest first, using
+        the send(record) function which returns True upon delivery. Stops at
+        the first failed delivery. Replays are spaced by at least
+        batch_interval seconds, except the first replay after an append.
+        Returns the number of records delivered."""
+        if self._pending == 0:
+            return 0
+        if (
+            self._last_replay is not None
+            and time.monotonic_ns() - self._last_replay
+            < self._batch_interval * 1000000000
+        ):
+            return 0
+        self._last_replay = time.monotonic_ns()
+
+        delivered = 0
+        at_end = False  # The replay read the queue file to its end
+        try:
+            with open(self._data_path, "r") as data_file:
+                data_file.seek(self._offset)
+                while delivered < self._batch_size:
+                    line = data_file.readline()
+                    if not line:
+                        at_end = True
+                        break
+                    if line.strip():
+                        record = self._parse(line)
+                        if record is None:
+                            self._skip(line)
+                        elif not send(record):
+                            break
+                        else:
+                            delivered += 1
+                        self._pending -= 1
+                    self._offset = data_file.tell()
+                else:
+                    at_end = not data_file.readline()
+        except OSError as e:
+            print("OUTBOX: replay error -", e)
+            self._pending = 0  # Recounted below; no records are truncated
+
+        if at_end:
+            # Every record was read; truncate the file to reclaim the SD space
+            self._pending = 0
+            self._offset = 0
+            with open(self._data_path, "w"):
+                pass
+        elif self._pending <= 0:
+            self._recount()  # The pending count drifted from the queue file
+        self._save_index()
+        if self._debug:
+            print("OUTBOX: delivered", delivered, "pending", self._pending)
+        return delivered
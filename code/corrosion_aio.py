@@ -0,0 +1,171 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_aio.py  2022-07-17 v1.0717
+
+import time
+
+try:
+    from adafruit_io.adafruit_io_errors import (
+        AdafruitIO_RequestError,
+        AdafruitIO_ThrottleError,
+    )
+except ImportError:
+    # Host-side tools without the Adafruit IO library
+    class AdafruitIO_RequestError(Exception):
+        pass
+
+    class AdafruitIO_ThrottleError(Exception):
+        pass
+
+
+class CorrosionAIO:
+    """Adafruit IO publisher for the Corrosion Monitor. Sends a cluster of
+    sensor feed values with a single request to the Adafruit IO group data
+    endpoint rather than one request per feed. If the Adafruit IO library
+    no longer provides the internals used for the group request, each feed
+    is sent with its own push_to_io call instead.
+
+    A throttle reply (HTTP 429) holds off all requests for throttle_hold
+    seconds, doubled for each consecutive throttle up to max_hold."""
+
+    def __init__(
+        self, pyportal, group="shop", throttle_hold=60, max_hold=960, debug=False
+    ):
+        self._pyportal = pyportal
+        self._group = group
+        self._io = None  # IO_HTTP client; created on first use
+        self._grouped = True  # The group data request is available
+        self._throttle_hold = throttle_hold  # First throttle hold-off (sec)
+        self._max_hold = max_hold  # Longest throttle hold-off (sec)
+        self._hold = 0  # Current throttle hold-off (sec); 0 when not throttled
+        self._hold_until = 0  # End of the throttle hold-off (monotonic ns)
+        self._throttles = 0  # Total number of throttle replies
+
+        self._requests = 0  # Total number of AIO requests sent
+        self._elapsed = 0  # Total seconds spent sending requests
+        self._last_elapsed = 0  # Seconds spent sending the most recent request
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def group(self):
+        # The Adafruit IO group key. Default is "shop".
+        return self._group
+
+    @property
+    def requests(self):
+        # The total number of requests sent to Adafruit IO.
+        return self._requests
+
+    @property
+    def elapsed(self):
+        # The total and most recent request wall-clock time (seconds).
+        return self._elapsed, self._last_elapsed
+
+    @property
+    def throttled(self):
+        # Requests are held off after a throttle reply.
+        return self._hold > 0 and time.monotonic_ns() < self._hold_until
+
+    @property
+    def throttles(self):
+        # The total number of throttle replies from Adafruit IO.
+        return self._throttles
+
+    def _feed_key(self, feed):
+        # Strip the group prefix from a full feed name ("shop.int-humidity")
+        if feed.startswith(self._group + "."):
+            return feed[len(self._group) + 1 :]
+        return feed
+
+    def push_cluster(self, feeds, created_at=None):
+        """Send a list of (feed name, value) pairs to Adafruit IO as a single
+        group data request. Feeds with a value of None are skipped. Returns a
+        dictionary of feed name to success (True/False) for the display
+        color flags; every feed is False when the request fails or is held
+        off by a throttle. An optional ISO-8601 created_at string timestamps
+        the cluster for delayed delivery."""
+        results = {}
+        payload = {"feeds": []}
+        for feed, value in feeds:
+            if value is None:
+                continue
+            results[feed] = False
+            payload["feeds"].append({"key": self._feed_key(feed), "value": value})
+        if not payload["feeds"]:
+            return results
+        if created_at is not None:
+            payload["created_at"] = created_at
+
+        if self.throttled:
+            return results
+
+        start = time.monotonic_ns()
+        response = None
+        try:
+            if self._grouped:
+                response = self._post_group(payload)
+            if not self._grouped:
+                response = self._push_feeds(payload)
+            self._hold = 0
+        except AdafruitIO_ThrottleError as e:
+            self._throttles += 1
+            self._hold = min(max(self._hold * 2, self._throttle_hold), self._max_hold)
+            self._hold_until = time.monotonic_ns() + self._hold * 1000000000
+            print("AIO throttled; holding off %d sec -" % self._hold, e)
+        except (AdafruitIO_RequestError, ValueError, RuntimeError, OSError) as e:
+            print("AIO push error -", e)
+        self._requests += 1
+        self._last_elapsed = (time.monotonic_ns() - start) / 1000000000
+        self._elapsed += self._last_elapsed
+
+        if response is None:
+            return results
+
+        # The group endpoint returns the created data points; mark each feed
+        #   that was acknowledged. Any other reply acknowledges the whole cluster.
+        if isinstance(response, list):
+            for point in response:
+                key = point.get("feed_key", "")
+                for feed in results:
+                    if key in (feed, self._feed_key(feed)):
+                        results[feed] = True
+        else:
+            for feed in results:
+                results[feed] = True
+
+        if self._debug:
+            print("AIO cluster:", results, "%0.2f sec" % self._last_elapsed)
+        return results
+
+    def _post_group(self, payload):
+        # Post the payload to the group data endpoint. The Adafruit IO
+        #   library has no public call for this endpoint, so this uses the
+        #   IO_HTTP internals _get_io_client, _compose_path, and _post. If a
+        #   library upgrade removes them, the grouped request is disabled
+        #   and push_cluster falls back to one push_to_io call per feed.
+        try:
+            if self._io is None:
+                self._io = self._pyportal.network._get_io_client()
+            post = self._io._post
+            path = self._io._compose_path("groups/{0}/data".format(self._group))
+        except AttributeError as e:
+            print("AIO group request unavailable; sending feeds singly -", e)
+            self._grouped = False
+            return None
+        return post(path, payload)
+
+    def _push_feeds(self, payload):
+        # Send each feed of the payload with its own push_to_io call. The
+        #   created_at timestamp is not sent, so a delayed record takes its
+        #   delivery time. Returns the delivered feed keys in the form of
+        #   the group endpoint reply.
+        delivered = []
+        for point in payload["feeds"]:
+            self._pyportal.push_to_io(self._group + "." + point["key"], point["value"])
+            delivered.append({"feed_key": point["key"]})
+        return delivered
@@ -8,7 +8,7 @@ import board
 import gc
 import displayio
 from adafruit_display_text.label import Label
-from adafruit_bitmap_font import bitmap_font
+from corrosion_fonts import load_font
 from adafruit_display_shapes.rect import Rect
 from adafruit_display_shapes.roundrect import RoundRect
 from adafruit_display_shapes.triangle import Triangle
@@ -21,6 +21,13 @@ from cedargrove_unit_converter.temperature import celsius_to_fahrenheit, dew_poi
 # Import the PyPortal class; includes ESP32 and IO_HTTP client modules
 import adafruit_pyportal
 
+# fmt: off
+# Alert priorities; queued alerts with a higher priority are shown first
+ALERT_STATUS = 0  # Corrosion status
+ALERT_NOTICE = 1  # Sensor heater and other state changes
+ALERT_ERROR  = 2  # SD card and network errors
+# fmt: on
+
 
 class CorrosionDisplay:
     def __init__(
@@ -30,6 +37,11 @@ class CorrosionDisplay:
         hour_24=False,
         sound=False,
         brightness=1.0,
+        auto_refresh=True,
+        max_fps=10,
+        profiler=None,
+        alert_queue=4,
+        alert_repeat=600,
         debug=False,
     ):
         # Input parameters
@@ -38,12 +50,24 @@ class CorrosionDisplay:
         self._hour_24_12 = hour_24
         self._sound = sound
         self._brightness = brightness
+        self._auto_refresh = auto_refresh
+        self._max_fps = max_fps
+        self._profiler = profiler  # Optional BootProfiler
+
+        # Display refresh control and statistics
+        self._batch_depth = 0  # Nesting depth of batched updates
+        self._refresh_pending = False  # Changes are waiting for a refresh
+        self._last_refresh = None  # Time of the most recent refresh (ns)
+        self._refresh_count = 0  # Number of display refreshes
+        self._frame_time = 0  # Duration of the most recent refresh (sec)
 
         # Celcius temperature and percent humidity start-up values
         self._temp_c = 0
         self._humid_pct = 0
         self._dew_c = 0
         self._pcb_c = 0
+        self._temp_range = (None, None)  # Celsius (minimum, maximum)
+        self._forecast = None  # Forecast minutes to condensation ALERT
 
         # Other parameters
         self.PROJECT = "Workshop Corrosion Monitor"
@@ -51,7 +75,23 @@ class CorrosionDisplay:
 
         self._message = ""
         self._clock_tick = True
+        self._updates_performed = 0  # Label text changes written to the display
+        self._updates_skipped = 0  # Unchanged label text writes skipped
         self._corrosion_status = 0
+        self._date_key = None  # Year and day of year of the date label text
+        self._time_key = None  # Minute of the day of the clock label text
+        self._date_formats = 0  # Date label texts built
+
+        # Alert queue and blink animation
+        self._alerts = ([], [], [])  # Queued texts, oldest first, per priority
+        self._queued = set()  # Texts of the queued alerts
+        self._alert_queue = alert_queue  # Maximum queued alerts
+        self._alert_repeat = alert_repeat  # Repeated alert hold-off (sec)
+        self._alert_text = None  # The alert being animated
+        self._alert_frame = 0  # The next animation frame
+        self._alert_shown = None  # The most recently completed alert
+        self._alert_shown_at = 0  # Time the most recent alert completed (ns)
+        self._time_formats = 0  # Clock label texts built
 
         self._weekday = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
         self._month = [
@@ -69,18 +109,32 @@ class CorrosionDisplay:
             "Dec",
         ]
 
-        # Load the text fonts from the fonts folder
-        FONT_1 = bitmap_font.load_font("/fonts/OpenSans-9.bdf")
-        FONT_2 = bitmap_font.load_font("/fonts/Arial-12.bdf")
-        FONT_3 = bitmap_font.load_font("/fonts/Arial-Bold-24.bdf")
-        CLOCK_FONT = bitmap_font.load_font("/fonts/Anton-Regular-104.bdf")
+        # Precomputed clock text: hour for each hour of the day (24-hour or
+        #   12-hour) and the minute text
+        self._hour_text = []
+        for hour in range(24):
+            if not self._hour_24_12:  # 12-hour clock
+                hour = hour % 12
+                if hour == 0:  # midnight and noon hour fix
+                    hour = 12
+            self._hour_text.append("{:2d}:".format(hour))
+        self._minute_text = ["{:02d}".format(minute) for minute in range(60)]
+
+        # Load the packed subset text fonts from the fonts folder; the subsets
+        #   are built from the BDF fonts with tools/font_pack.py
+        FONT_1 = load_font("/fonts/OpenSans-9.cgf")
+        FONT_2 = load_font("/fonts/Arial-12.cgf")
+        FONT_3 = load_font("/fonts/Arial-Bold-24.cgf")
+        CLOCK_FONT = load_font("/fonts/Anton-Regular-104.cgf")
+        self._profile("display: load fonts")
 
         # The board's integral display size
         WIDTH = board.DISPLAY.width  # 320 for PyPortal
         HEIGHT = board.DISPLAY.height  # 240 for PyPortal
 
-        # Set display brightness
+        # Set display brightness and refresh mode
         board.DISPLAY.brightness = self._brightness
+        board.DISPLAY.auto_refresh = self._auto_refresh
 
         # Default colors
         self.BLACK = 0x000000
@@ -98,6 +152,16 @@ class CorrosionDisplay:
         self.GRAY = 0x444455
         self.LCARS_LT_BLU = 0x1B6BA7
 
+        # Alert blink animation colors; one frame per animate() call
+        self._alert_colors = (
+            self.RED,
+            self.YELLOW,
+            self.RED,
+            self.YELLOW,
+            self.YELLOW,
+            self.YELLOW,
+        )
+
         # Get WiFi and account info from secrets.py
         try:
             from secrets import secrets
@@ -118,10 +182,12 @@ class CorrosionDisplay:
             status_neopixel=board.NEOPIXEL,
             default_bg="/corrosion_mon_startup.bmp",
         )
+        self._profile("display: PyPortal()")
         try:
             self.pyportal.get_local_time()
         except (ValueError, RuntimeError) as e:  # ValueError added from quote.py change
             print("Get time: An error occured -", e)
+        self._profile("display: get_local_time()")
 
         # Redundantly set brightness via the PyPortal class
         self.pyportal.set_backlight(self._brightness)
@@ -250,6 +316,7 @@ class CorrosionDisplay:
 
         # board.DISPLAY.show(self._image_group)  # Load display
         gc.collect()
+        self._profile("display: build group")
 
         # debug parameters
         self._debug = debug
@@ -266,27 +333,29 @@ class CorrosionDisplay:
     def temperature(self, temp_c=0):
         self._temp_c = temp_c
         if self._temp_c == None:
-            self._temp.text = "None"
+            self._set_text(self._temperature, "None")
             self._dew_c = None
-            self._dew.text = "None"
+            self._set_text(self._dew_point, "None")
             return
         self._dew_c = self.calculate_dew_point(self._temp_c, self._humid_pct)
         if self._scale == "F":
-            self._temperature.text = (
-                str(round(celsius_to_fahrenheit(self._temp_c), 1)) + "°"
+            self._set_text(
+                self._temperature,
+                str(round(celsius_to_fahrenheit(self._temp_c), 1)) + "°",
             )
             if self._dew_c != None:
-                self._dew_point.text = (
-                    str(round(celsius_to_fahrenheit(self._dew_c), 1)) + "°" + " Dew"
+                self._set_text(
+                    self._dew_point,
+                    str(round(celsius_to_fahrenheit(self._dew_c), 1)) + "°" + " Dew",
                 )
             else:
-                self._dew_point.text = "None"
+                self._set_text(self._dew_point, "None")
         else:
-            self._temperature.text = str(round(self._temp_c, 1)) + "°"
+            self._set_text(self._temperature, str(round(self._temp_c, 1)) + "°")
             if self._dew_c != None:
-                self._dew_point.text = str(round(self._dew_c, 1)) + "°" + " Dew"
+                self._set_text(self._dew_point, str(round(self._dew_c, 1)) + "°" + " Dew")
             else:
-                self._dew_point.text = "None"
+                self._set_text(self._dew_point, "None")
 
     @property
     def humidity(self):
@@ -297,21 +366,22 @@ class CorrosionDisplay:
     def humidity(self, humid_pct=0):
         self._humid_pct = humid_pct
         if self._humid_pct == None:
-            self._humidity.text = "None"
+            self._set_text(self._humidity, "None")
             self._dew_c = None
-            self._dew_point.text = "None"
+            self._set_text(self._dew_point, "None")
             return
-        self._humidity.text = str(round(self._humid_pct, 0)) + "%"
+        self._set_text(self._humidity, str(round(self._humid_pct, 0)) + "%")
         self._dew_c = self.calculate_dew_point(self._temp_c, self._humid_pct)
         if self._dew_c != None:
             if self._scale == "F":
-                self._dew_point.text = (
-                    str(round(celsius_to_fahrenheit(self._dew_c), 1)) + "°" + " Dew"
+                self._set_text(
+                    self._dew_point,
+                    str(round(celsius_to_fahrenheit(self._dew_c), 1)) + "°" + " Dew",
                 )
             else:
-                self._dew_point.text = str(round(self._dew_c, 1)) + "°" + " Dew"
+                self._set_text(self._dew_point, str(round(self._dew_c, 1)) + "°" + " Dew")
         else:
-            self._dew_point.text = "None"
+            self._set_text(self._dew_point, "None")
 
     @property
     def dew_point(self):
@@ -327,14 +397,51 @@ class CorrosionDisplay:
     def pcb_temperature(self, pcb_c=0):
         self._pcb_c = pcb_c
         if self._pcb_c == None:
-            self._pcb_temp.text = "None"
+            self._set_text(self._pcb_temp, "None")
             return
         if self._scale == "F":
-            self._pcb_temp.text = (
-                str(round(celsius_to_fahrenheit(self._pcb_c), 1)) + "°"
+            self._set_text(
+                self._pcb_temp,
+                str(round(celsius_to_fahrenheit(self._pcb_c), 1)) + "°",
             )
         else:
-            self._pcb_temp.text = str(round(self._pcb_c, 1)) + "°"
+            self._set_text(self._pcb_temp, str(round(self._pcb_c, 1)) + "°")
+
+    @property
+    def temperature_range(self):
+        # Show a Celsius (minimum, maximum) temperature range as the message.
+        return self._temp_range
+
+    @temperature_range.setter
+    def temperature_range(self, temp_range=(None, None)):
+        self._temp_range = temp_range
+        self._show_summary()
+
+    @property
+    def condensation_forecast(self):
+        # Show forecast minutes to condensation ALERT as the message; takes
+        #   priority over the temperature range. None or 0 clears the forecast.
+        return self._forecast
+
+    @condensation_forecast.setter
+    def condensation_forecast(self, minutes=None):
+        self._forecast = minutes
+        self._show_summary()
+
+    def _show_summary(self):
+        # Place the forecast or the temperature range in the message area
+        low_c, high_c = self._temp_range
+        if self._forecast:
+            text = "Dew ALERT in %d min" % self._forecast
+        elif None in (low_c, high_c):
+            text = ""
+        else:
+            if self._scale == "F":
+                low_c = celsius_to_fahrenheit(low_c)
+                high_c = celsius_to_fahrenheit(high_c)
+            text = "24h %.1f° to %.1f°" % (low_c, high_c)
+        if text != self._message:
+            self.message = text
 
     @property
     def message(self):
@@ -530,63 +637,198 @@ class CorrosionDisplay:
             return True
         return False
 
+    @property
+    def update_counts(self):
+        # The number of performed and skipped label text updates.
+        return self._updates_performed, self._updates_skipped
+
+    @property
+    def format_counts(self):
+        # The number of date and clock label texts built.
+        return self._date_formats, self._time_formats
+
+    def _set_text(self, label, text):
+        # Change a label's text only when the rendered value differs
+        if label.text == text:
+            self._updates_skipped += 1
+            return
+        label.text = text
+        self._updates_performed += 1
+
+    @property
+    def refresh_count(self):
+        # The number of explicit display refreshes.
+        return self._refresh_count
+
+    @property
+    def frame_time(self):
+        # The duration of the most recent explicit refresh (seconds).
+        return self._frame_time
+
+    @property
+    def refresh_pending(self):
+        # Changes are waiting for a refresh that was deferred by max_fps.
+        return self._refresh_pending
+
+    def batch(self):
+        """Accumulate display changes and refresh once when the batch ends.
+        Usage: with display.batch(): ..."""
+        return self
+
+    def __enter__(self):
+        if self._batch_depth == 0:
+            board.DISPLAY.auto_refresh = False
+        self._batch_depth += 1
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.refresh()
+            board.DISPLAY.auto_refresh = self._auto_refresh
+        return False
+
+    def refresh(self):
+        """Refresh the display no faster than max_fps. A refresh requested
+        within the frame period is deferred and reported by refresh_pending.
+        Returns True if the display was refreshed.
+
+        The frame budget is applied here rather than by the display's
+        target_frames_per_second, which skips the refresh entirely when
+        called later than one frame after the previous one."""
+        now = time.monotonic_ns()
+        if (
+            self._last_refresh is not None
+            and now - self._last_refresh < 1000000000 // self._max_fps
+        ):
+            self._refresh_pending = True
+            return False
+        if not board.DISPLAY.refresh():
+            self._refresh_pending = True
+            return False
+        self._last_refresh = time.monotonic_ns()
+        self._frame_time = (self._last_refresh - now) / 1000000000
+        self._refresh_count += 1
+        self._refresh_pending = False
+        return True
+
+    def _profile(self, phase):
+        # Mark the end of an instantiation phase when profiling
+        if self._profiler:
+            self._profiler.mark(phase)
+
     def calculate_dew_point(self, t_c, h):
         # Check for None values and return calculated value or None
         if t_c == None or h == None:
             return None
         return dew_point(t_c, h)
 
-    def alert(self, text=""):
-        # Place alert message in clock message area. Default is the previous message.
-        self._msg_text = text[:20]
-        if self._msg_text == "" or self._msg_text == None:
-            self._msg_text = ""
-            self._project_message.text = self._message
-        else:
-            print("ALERT: " + self._msg_text)
-            self._project_message.color = self.RED
-            self._project_message.text = self._msg_text
-            time.sleep(0.1)
-            # self.panel.play_tone(880, 0.100)  # A5
-            self._project_message.color = self.YELLOW
-            time.sleep(0.1)
-            # self.panel.play_tone(880, 0.100)  # A5
-            self._project_message.color = self.RED
-            time.sleep(0.1)
-            # self.panel.play_tone(880, 0.100)  # A5
-            self._project_message.color = self.YELLOW
-            time.sleep(0.5)
-            self._project_message.color = None
+    def alert(self, text="", priority=ALERT_STATUS):
+        # Queue an alert message for the clock message area and return
+        #   without waiting; animate() blinks each queued alert in turn. An
+        #   alert that is being shown or is already queued, or that matches
+        #   the last alert shown within alert_repeat seconds, is dropped. When
+        #   the queue is full, the newest of the lowest-priority alerts is
+        #   dropped. Each priority (ALERT_STATUS, ALERT_NOTICE, ALERT_ERROR)
+        #   has its own queue, so the work done does not grow with the
+        #   number of queued alerts.
+        #   Default restores the message once no alert is being shown.
+        if text == "" or text == None:
+            if self._alert_text == None:
+                self._set_text(self._project_message, self._message)
+            return
+        text = text[:20]
+        if text == self._alert_text or text in self._queued:
+            return
+        if (
+            text == self._alert_shown
+            and time.monotonic_ns() - self._alert_shown_at
+            < self._alert_repeat * 1000000000
+        ):
+            return
+        if len(self._queued) >= self._alert_queue:
+            for lower in range(priority):
+                if self._alerts[lower]:
+                    self._queued.remove(self._alerts[lower].pop())
+                    break
+            else:
+                return  # Queue is full of alerts with the same or higher priority
+        print("ALERT: " + text)
+        self._alerts[priority].append(text)
+        self._queued.add(text)
         return
 
+    @property
+    def alerts_pending(self):
+        # The number of queued alerts, including the one being shown.
+        return len(self._queued) + (self._alert_text != None)
+
+    def animate(self):
+        # Advance the alert blink animation by one frame. Called from the
+        #   main loop's fastest task tick; each call does a bounded amount
+        #   of work.
+        if self._alert_text == None:
+            if not self._queued:
+                return
+            for queue in reversed(self._alerts):  # Highest priority first
+                if queue:
+                    self._alert_text = queue.pop(0)
+                    break
+            self._queued.remove(self._alert_text)
+            self._alert_frame = 0
+            self._set_text(self._project_message, self._alert_text)
+        if self._alert_frame < len(self._alert_colors):
+            # self.panel.play_tone(880, 0.100)  # A5
+            self._project_message.color = self._alert_colors[self._alert_frame]
+            self._alert_frame += 1
+            return
+        # The animation is complete; restore the message
+        self._alert_shown = self._alert_text
+        self._alert_shown_at = time.monotonic_ns()
+        self._alert_text = None
+        self._project_message.color = self.YELLOW
+        self._set_text(self._project_message, self._message)
+
     def show(self, refresh=False):
         # Display time and refresh display. The primary function of this class.
+        #   The date text is formatted once a day and the clock text is
+        #   joined from the precomputed hour and minute text once a minute;
+        #   other calls reuse the label text (see format_counts). Only a
+        #   refresh, which loads the display group, waits for the display.
         self._datetime = time.localtime()  # xST structured time object
 
-        self._hour = self._datetime.tm_hour  # Format 24-hour or 12-hour output
-        if not self._hour_24_12:  # 12-hour clock
-            if self._hour >= 12:
-                self._hour = self._hour - 12
-            if self._hour == 0:  # midnight hour fix
-                self._hour = 12
-
-        self._project_message.text = self._message
-        self._clock_day_mon_yr.text = (
-            self._weekday[self._datetime.tm_wday]
-            + "  "
-            + self._month[self._datetime.tm_mon - 1]
-            + " "
-            + "{:02d}".format(self._datetime.tm_mday)
-            + ", "
-            + "{:04d}".format(self._datetime.tm_year)
-        )
+        if self._alert_text == None:  # Not replacing an alert being shown
+            self._set_text(self._project_message, self._message)
+
+        date_key = (self._datetime.tm_year * 512) + self._datetime.tm_yday
+        if date_key != self._date_key:
+            self._date_key = date_key
+            self._date_formats += 1
+            self._set_text(
+                self._clock_day_mon_yr,
+                "%s  %s %02d, %04d"
+                % (
+                    self._weekday[self._datetime.tm_wday],
+                    self._month[self._datetime.tm_mon - 1],
+                    self._datetime.tm_mday,
+                    self._datetime.tm_year,
+                ),
+            )
 
-        self._clock_digits.text = (
-            "{:2d}".format(self._hour) + ":" + "{:02d}".format(self._datetime.tm_min)
-        )
+        time_key = (self._datetime.tm_hour * 60) + self._datetime.tm_min
+        if time_key != self._time_key:
+            self._time_key = time_key
+            self._time_formats += 1
+            self._set_text(
+                self._clock_digits,
+                self._hour_text[self._datetime.tm_hour]
+                + self._minute_text[self._datetime.tm_min],
+            )
 
         if refresh:
             board.DISPLAY.show(self._image_group)  # Load display
-        time.sleep(0.1)  # Allow display to load
-        gc.collect()
+        if not self._auto_refresh and self._batch_depth == 0:
+            self.refresh()
+        elif refresh:
+            time.sleep(0.1)  # Allow the newly loaded display to be drawn
         return
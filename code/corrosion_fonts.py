@@ -0,0 +1,77 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_fonts.py  2022-07-17 v1.0717
+
+import struct
+import displayio
+import bitmaptools
+from fontio import Glyph
+
+_MAGIC = b"CGF1"
+_HEADER = "<4sHhhhhhh"
+_GLYPH = "<IBBhhhh"
+
+
+class PackedFont:
+    """A subset font packed by tools/font_pack.py. All glyphs are preloaded
+    in a single pass through the file; each glyph bitmap is read directly
+    into a displayio.Bitmap with bitmaptools.readinto."""
+
+    def __init__(self, path):
+        self._glyphs = {}
+        with open(path, "rb") as packed:
+            header = packed.read(struct.calcsize(_HEADER))
+            magic, count, width, height, x, y, ascent, descent = struct.unpack(
+                _HEADER, header
+            )
+            if magic != _MAGIC:
+                raise ValueError("Not a packed font: " + path)
+            self._bounding_box = (width, height, x, y)
+            self.ascent = ascent
+            self.descent = descent
+
+            glyph_size = struct.calcsize(_GLYPH)
+            table = packed.read(glyph_size * count)
+            for i in range(count):
+                code, width, height, dx, dy, shift_x, shift_y = struct.unpack_from(
+                    _GLYPH, table, i * glyph_size
+                )
+                bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+                if width and height:
+                    bitmaptools.readinto(
+                        bitmap,
+                        packed,
+                        bits_per_pixel=1,
+                        element_size=1,
+                        reverse_pixels_in_element=True,
+                    )
+                self._glyphs[code] = Glyph(
+                    bitmap, 0, width, height, dx, dy, shift_x, shift_y
+                )
+
+    def get_bounding_box(self):
+        """The font's bounding box: width, height, x offset, y offset."""
+        return self._bounding_box
+
+    def get_glyph(self, code_point):
+        """The glyph for a code point or None if it is not in the subset."""
+        return self._glyphs.get(code_point)
+
+    def load_glyphs(self, code_points):
+        """All glyphs are loaded at instantiation."""
+        return
+
+
+def load_font(path, preload=None):
+    """Load a packed subset font (.cgf) or, for any other font file, an
+    adafruit_bitmap_font font. An optional preload string loads its glyphs
+    into a bitmap font in a single pass rather than one glyph at a time."""
+    if path.endswith(".cgf"):
+        return PackedFont(path)
+    from adafruit_bitmap_font import bitmap_font
+
+    font = bitmap_font.load_font(path)
+    if preload:
+        font.load_glyphs(preload)
+    return font
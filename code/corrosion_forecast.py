@@ -0,0 +1,145 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_forecast.py  2022-07-17 v1.0717
+"""Board-independent condensation forecast, used on the device and by the
+host-side replay tool."""
+
+from array import array
+from corrosion_logic import ALERT_MARGIN, WARNING_MARGIN
+
+
+class CondensationForecast:
+    """Predicts the minutes until the temperature to dew point margin falls
+    to the WARNING and ALERT margins. Least-squares lines are fitted to the
+    newest size temperature and dew point samples. The fit sums slide with
+    each evenly spaced sample in O(1) time and are recalculated from the
+    sample rings once per size samples to clear rounding drift. A missing
+    reading or a gap longer than 1.5 sample intervals restarts the fit."""
+
+    def __init__(self, size=30, interval=60, horizon=240, min_samples=10, debug=False):
+        self._size = size  # Fit window (samples)
+        self._interval = interval  # Sample interval (sec)
+        self._horizon = horizon  # Longest forecast (minutes)
+        self._min_samples = min_samples  # Samples needed for a forecast
+
+        self._temps = array("f", [0] * size)  # Temperature ring (C)
+        self._dews = array("f", [0] * size)  # Dew point ring (C)
+        self.reset()
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    def reset(self):
+        """Discard the samples and restart the fit."""
+        self._head = 0  # Ring slot of the next sample
+        self._count = 0  # Samples in the rings
+        self._updates = 0  # Samples since the sums were recalculated
+        self._last_epoch = None
+        # Sums of y and x*y, where x is 0 for the oldest sample
+        self._sum_t = 0.0
+        self._sum_xt = 0.0
+        self._sum_d = 0.0
+        self._sum_xd = 0.0
+
+    @property
+    def ready(self):
+        # True when the fit holds enough samples for a forecast.
+        return self._count >= self._min_samples
+
+    def _resum(self):
+        self._sum_t = self._sum_xt = self._sum_d = self._sum_xd = 0.0
+        for x in range(self._count):
+            slot = (self._head - self._count + x) % self._size
+            self._sum_t += self._temps[slot]
+            self._sum_xt += x * self._temps[slot]
+            self._sum_d += self._dews[slot]
+            self._sum_xd += x * self._dews[slot]
+        self._updates = 0
+
+    def update(self, epoch, temp_c, dew_c):
+        """Add a temperature and dew point sample taken at epoch seconds."""
+        if None in (temp_c, dew_c) or (
+            self._last_epoch is not None
+            and not 0 < epoch - self._last_epoch <= 1.5 * self._interval
+        ):
+            self.reset()
+            if None in (temp_c, dew_c):
+                return
+        self._last_epoch = epoch
+
+        if self._count == self._size:
+            # The oldest sample leaves and every other sample's x drops by 1
+            old_t = self._temps[self._head]
+            old_d = self._dews[self._head]
+            self._temps[self._head] = temp_c
+            self._dews[self._head] = dew_c
+            new_t = self._temps[self._head]  # As stored in the ring
+            new_d = self._dews[self._head]
+            self._sum_xt += (self._size - 1) * new_t - (self._sum_t - old_t)
+            self._sum_t += new_t - old_t
+            self._sum_xd += (self._size - 1) * new_d - (self._sum_d - old_d)
+            self._sum_d += new_d - old_d
+        else:
+            self._temps[self._head] = temp_c
+            self._dews[self._head] = dew_c
+            self._sum_t += self._temps[self._head]
+            self._sum_xt += self._count * self._temps[self._head]
+            self._sum_d += self._dews[self._head]
+            self._sum_xd += self._count * self._dews[self._head]
+            self._count += 1
+        self._head = (self._head + 1) % self._size
+
+        self._updates += 1
+        if self._updates >= self._size:
+            self._resum()
+
+    def _fit(self, sum_y, sum_xy):
+        # The fitted value at the newest sample and the slope per sample
+        n = self._count
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+        return (sum_y - slope * sum_x) / n + slope * (n - 1), slope
+
+    @property
+    def trend(self):
+        # Temperature and dew point slopes (C per hour); None until ready.
+        if not self.ready:
+            return None, None
+        per_hour = 3600 / self._interval
+        return (
+            self._fit(self._sum_t, self._sum_xt)[1] * per_hour,
+            self._fit(self._sum_d, self._sum_xd)[1] * per_hour,
+        )
+
+    def minutes_to(self, margin):
+        """Minutes until the fitted margin falls to margin (C); 0 if it is at
+        or below margin now. None if not ready or no crossing is forecast
+        within the horizon."""
+        if not self.ready:
+            return None
+        temp, temp_slope = self._fit(self._sum_t, self._sum_xt)
+        dew, dew_slope = self._fit(self._sum_d, self._sum_xd)
+        now = temp - dew
+        if now <= margin:
+            return 0
+        slope = temp_slope - dew_slope  # Margin change per sample
+        if slope >= 0:
+            return None
+        minutes = (margin - now) / slope * self._interval / 60
+        if minutes > self._horizon:
+            return None
+        return int(minutes + 0.5)
+
+    @property
+    def minutes_to_warning(self):
+        # Forecast minutes until the WARNING margin; see minutes_to().
+        return self.minutes_to(WARNING_MARGIN)
+
+    @property
+    def minutes_to_alert(self):
+        # Forecast minutes until the ALERT margin; see minutes_to().
+        return self.minutes_to(ALERT_MARGIN)
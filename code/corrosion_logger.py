@@ -0,0 +1,249 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_logger.py  2022-07-17 v1.0717
+
+import os
+import time
+
+
+class CorrosionLogger:
+    """A buffered SD card log writer. Records are held in RAM and written to
+    the log file together, one line per record, when flush_count records are
+    buffered or the oldest buffered record is flush_age seconds old. Call
+    sync() before a power-risk event to write the buffer and commit the file
+    system.
+
+    With rotate set to "day" or "month", path is a folder that receives one
+    log file per day (YYYYMMDD.csv) or month (YYYYMM.csv). A sidecar
+    index.csv in the folder lists each file's first and last record epoch and
+    record count. Each flush appends a line for the records it wrote; readers
+    merge the lines of a file (earliest first, latest last, sum of counts).
+    When a new file is started the index is compacted to one line per file
+    and files older than retention days are removed (0 keeps all files); a
+    compaction interrupted by a power loss is finished at instantiation.
+    Only the current file's index entry is held in RAM."""
+
+    def __init__(
+        self,
+        path="/sd/logfile.csv",
+        flush_count=6,
+        flush_age=3600,
+        rotate=None,
+        retention=0,
+        debug=False,
+    ):
+        self._path = path
+        self._flush_count = flush_count  # Flush after this many records
+        self._flush_age = flush_age  # Flush when oldest record is this old (sec)
+        self._rotate = rotate  # None, "day", or "month"
+        self._retention = retention  # Days of rotated files to keep; 0 keeps all
+        self._buffer = []  # (epoch, record line) waiting to be written
+        self._oldest = None  # Time the oldest buffered record was logged (ns)
+        self._framed = None  # Log file known to end with a newline
+
+        self._records = 0  # Total records written to the file
+        self._flushes = 0  # Total buffer flushes (file open/close cycles)
+
+        # Current rotated file's index entry: [name, first epoch, last epoch,
+        #   count] of the records written since instantiation
+        self._current = None
+        if self._rotate:
+            try:
+                os.mkdir(self._path)
+            except OSError:
+                pass  # Folder exists
+            self._recover_index()
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def pending(self):
+        # The number of buffered records not yet written to the file.
+        return len(self._buffer)
+
+    @property
+    def stats(self):
+        # The total number of records written and buffer flushes.
+        return self._records, self._flushes
+
+    @property
+    def index(self):
+        # The current rotated file's [name, first epoch, last epoch, count]
+        #   for the records written since instantiation; None before then.
+        return self._current
+
+    def _append_index(self, name, first, last, count):
+        with open(self._path + "/index.csv", "a") as index_file:
+            index_file.write("%s,%d,%d,%d\n" % (name, first, last, count))
+
+    def _recover_index(self):
+        # Finish a compaction interrupted by a power loss. A compacted
+        #   index.tmp is complete once index.csv is gone; while index.csv
+        #   remains, the compaction had not finished and index.tmp is
+        #   discarded.
+        index_path = self._path + "/index.csv"
+        compact_path = self._path + "/index.tmp"
+        try:
+            os.stat(compact_path)
+        except OSError:
+            return  # No interrupted compaction
+        try:
+            try:
+                os.stat(index_path)
+            except OSError:
+                os.rename(compact_path, index_path)
+                return
+            os.remove(compact_path)
+        except OSError as e:
+            print("Log index recovery error -", e)
+
+    def _compact_index(self, newest):
+        # Rewrite the index with one line per run of lines for the same file,
+        #   removing files with no records newer than the retention period.
+        #   Streams the index, holding one entry at a time.
+        limit = newest - (self._retention * 86400) if self._retention else None
+        index_path = self._path + "/index.csv"
+        compact_path = self._path + "/index.tmp"
+        try:
+            with open(index_path, "r") as index_file:
+                with open(compact_path, "w") as compact_file:
+                    entry = None
+                    for line in index_file:
+                        fields = line.strip().split(",")
+                        if len(fields) != 4:
+                            continue
+                        try:
+                            name = fields[0]
+                            first, last, count = [int(f) for f in fields[1:]]
+                        except ValueError:
+                            continue
+                        if entry and entry[0] == name:
+                            entry[1] = min(entry[1], first)
+                            entry[2] = max(entry[2], last)
+                            entry[3] += count
+                            continue
+                        self._keep_entry(compact_file, entry, limit)
+                        entry = [name, first, last, count]
+                    self._keep_entry(compact_file, entry, limit)
+            os.rename(compact_path, index_path)  # Replaces the index
+        except OSError as e:
+            print("Log index compaction error -", e)
+
+    def _keep_entry(self, compact_file, entry, limit):
+        # Write an index entry, or remove its file if it is past retention
+        if entry == None:
+            return
+        if limit != None and entry[2] < limit:
+            try:
+                os.remove(self._path + "/" + entry[0])
+            except OSError:
+                pass  # Already removed
+            return
+        compact_file.write("%s,%d,%d,%d\n" % tuple(entry))
+
+    def _file_name(self, epoch):
+        # The rotated log file name for a record epoch
+        date = time.localtime(epoch)
+        if self._rotate == "month":
+            return "%04d%02d.csv" % (date[0], date[1])
+        return "%04d%02d%02d.csv" % (date[0], date[1], date[2])
+
+    def log(self, record, epoch=None):
+        """Buffer a record line (without newline) logged at epoch seconds
+        (default is now). Returns True if the buffer was flushed to the
+        file."""
+        if epoch is None:
+            epoch = time.time()
+        if not self._buffer:
+            self._oldest = time.monotonic_ns()
+        self._buffer.append((int(epoch), record))
+        if len(self._buffer) >= self._flush_count:
+            self.flush()
+            return True
+        return self.poll()
+
+    def poll(self):
+        """Flush the buffer if the oldest buffered record is flush_age
+        seconds old. Call periodically so that a quiet log is still written
+        on time. Returns True if the buffer was flushed to the file."""
+        if (
+            self._buffer
+            and time.monotonic_ns() - self._oldest >= self._flush_age * 1000000000
+        ):
+            self.flush()
+            return True
+        return False
+
+    def _check_framing(self, path):
+        # Start on a new line if the existing log file lacks a final newline
+        try:
+            size = os.stat(path)[6]
+        except OSError:
+            return ""  # New log file
+        if size == 0:
+            return ""
+        with open(path, "rb") as log_file:
+            log_file.seek(size - 1)
+            if log_file.read(1) == b"\n":
+                return ""
+        return "\n"
+
+    def _write(self, path, lines):
+        prefix = ""
+        if path != self._framed:
+            prefix = self._check_framing(path)
+            self._framed = path
+        with open(path, "a") as log_file:
+            log_file.write(prefix + "\n".join(lines) + "\n")
+
+    def flush(self):
+        """Write all buffered records with one open/write/close cycle per
+        log file."""
+        if not self._buffer:
+            return
+        if not self._rotate:
+            self._write(self._path, [record for _, record in self._buffer])
+        else:
+            new_file = False
+            start = 0
+            while start < len(self._buffer):
+                # Group consecutive records that belong to the same file
+                name = self._file_name(self._buffer[start][0])
+                end = start + 1
+                while end < len(self._buffer) and (
+                    self._file_name(self._buffer[end][0]) == name
+                ):
+                    end += 1
+                self._write(
+                    self._path + "/" + name,
+                    [record for _, record in self._buffer[start:end]],
+                )
+                first, last = self._buffer[start][0], self._buffer[end - 1][0]
+                self._append_index(name, first, last, end - start)
+                if self._current == None or name > self._current[0]:
+                    new_file = new_file or self._current != None
+                    self._current = [name, first, last, 0]
+                if name == self._current[0]:
+                    self._current[2] = last
+                    self._current[3] += end - start
+                start = end
+            if new_file:
+                self._compact_index(self._buffer[-1][0])
+        self._records += len(self._buffer)
+        self._flushes += 1
+        if self._debug:
+            print("LOG: wrote", len(self._buffer), "records")
+        self._buffer = []
+        self._oldest = None
+
+    def sync(self):
+        """Flush the buffer and commit pending file system writes."""
+        self.flush()
+        try:
+            os.sync()
+        except AttributeError:
+            pass  # os.sync is not available
@@ -0,0 +1,167 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_profiler.py  2022-07-17 v1.0717
+
+import time
+import gc
+
+
+class BootProfiler:
+    """A lightweight start-up phase profiler. Each call to mark() ends a
+    phase and records its duration (time.monotonic_ns) and the change in
+    free heap (gc.mem_free) since the previous mark. Uses only time and gc,
+    so it also runs under CPython where gc.mem_free is not available."""
+
+    def __init__(self, debug=False):
+        self._phases = []  # (name, duration ns, heap change bytes) per phase
+        self._start = time.monotonic_ns()
+        self._last = self._start
+        self._last_free = self._mem_free()
+
+        self._debug = debug
+
+    def _mem_free(self):
+        # Free heap in bytes; None when not running under CircuitPython
+        try:
+            return gc.mem_free()
+        except AttributeError:
+            return None
+
+    @property
+    def phases(self):
+        # A list of (name, duration ns, heap change bytes) tuples.
+        return self._phases
+
+    @property
+    def total(self):
+        # Total time (seconds) from instantiation to the most recent mark.
+        return (self._last - self._start) / 1000000000
+
+    def mark(self, name):
+        """End the current phase and record its duration and heap change. A
+        negative heap change is memory consumed by the phase."""
+        now = time.monotonic_ns()
+        free = self._mem_free()
+        if None in (free, self._last_free):
+            delta = None
+        else:
+            delta = free - self._last_free
+        self._phases.append((name, now - self._last, delta))
+        if self._debug:
+            print("*Profile:", name, (now - self._last) / 1000000, "ms")
+        # Exclude the profiler's own overhead from the next phase
+        self._last = time.monotonic_ns()
+        self._last_free = self._mem_free()
+
+    def summary(self):
+        """Return the phase table as a list of text lines."""
+        lines = ["%-28s %10s %10s" % ("phase", "ms", "heap")]
+        for name, duration, delta in self._phases:
+            lines.append(
+                "%-28s %10.1f %10s"
+                % (name[:28], duration / 1000000, "-" if delta is None else delta)
+            )
+        deltas = [delta for _, _, delta in self._phases if delta is not None]
+        lines.append(
+            "%-28s %10.1f %10s"
+            % ("total", self.total * 1000, sum(deltas) if deltas else "-")
+        )
+        return lines
+
+    def print_summary(self):
+        """Print the phase table to the REPL."""
+        for line in self.summary():
+            print(line)
+
+    def save(self, path="/sd/boot_profile.txt", stamp=""):
+        """Append the phase table to a file, typically on the SD card."""
+        with open(path, "a") as profile_file:
+            profile_file.write("boot " + stamp + "\n")
+            for line in self.summary():
+                profile_file.write(line + "\n")
+
+
+class HeapWatch:
+    """Records the heap allocated by each pass of a steady-state loop.
+    Call start() and stop() around the pass; the bytes allocated in between
+    are read from gc.mem_alloc, or under CPython from tracemalloc when it is
+    tracing. A pass that included a garbage collection is not counted.
+    collect() runs gc.collect only when the free heap is below
+    collect_below bytes, rather than on every display update."""
+
+    def __init__(self, collect_below=16384, debug=False):
+        self._collect_below = collect_below
+        self._start = None  # Allocated heap at the start of the pass
+        self._passes = 0  # Passes measured
+        self._last = None  # Bytes allocated by the most recent pass
+        self._peak = 0  # Most bytes allocated by a pass
+        self._total = 0  # Bytes allocated by all measured passes
+        self._collections = 0  # gc.collect calls made by collect()
+
+        self._debug = debug
+
+    def _mem_alloc(self):
+        # Allocated heap in bytes; None when it cannot be measured
+        try:
+            return gc.mem_alloc()
+        except AttributeError:
+            pass
+        try:
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                return tracemalloc.get_traced_memory()[0]
+        except ImportError:
+            pass
+        return None
+
+    def _mem_free(self):
+        try:
+            return gc.mem_free()
+        except AttributeError:
+            return None
+
+    @property
+    def last(self):
+        # Bytes allocated by the most recent measured pass; None if unknown.
+        return self._last
+
+    @property
+    def stats(self):
+        # Passes measured, peak and total bytes allocated, and collections.
+        return self._passes, self._peak, self._total, self._collections
+
+    @property
+    def mem_free(self):
+        # Free heap in bytes; None when not running under CircuitPython.
+        return self._mem_free()
+
+    def start(self):
+        """Begin a loop pass."""
+        self._start = self._mem_alloc()
+
+    def stop(self):
+        """End a loop pass and record the bytes it allocated. Returns the
+        byte count or None if it could not be measured."""
+        end = self._mem_alloc()
+        if None in (self._start, end) or end < self._start:
+            self._last = None  # Not measurable or a collection ran
+            return None
+        self._last = end - self._start
+        self._passes += 1
+        self._peak = max(self._peak, self._last)
+        self._total += self._last
+        if self._debug and self._last:
+            print("*Heap: pass allocated", self._last, "bytes")
+        return self._last
+
+    def collect(self):
+        """Collect garbage if the free heap is below collect_below bytes.
+        Returns True if a collection ran."""
+        free = self._mem_free()
+        if free is None or free >= self._collect_below:
+            return False
+        gc.collect()
+        self._collections += 1
+        return True
@@ -0,0 +1,203 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_ringlog.py  2022-07-17 v1.0717
+
+import os
+import struct
+
+# fmt: off
+# Ring log file layout (little-endian); shared with tools/ringlog_reader.py
+RING_MAGIC   = b"CGRL"
+RING_VERSION = 1
+RING_HEADER  = "<4sHHIIIII"  # magic, version, record size, capacity, head,
+                             #   count, first epoch, last epoch
+RING_HEADER_SIZE = 32        # header is padded to 32 bytes
+RING_RECORD  = "<Ihhhhbb"    # epoch seconds, temperature, humidity, dew point,
+                             #   PCB temperature (x100), corrosion index, heater
+RING_NONE    = -32768        # stored in place of a None measurement
+# fmt: on
+
+
+def pack_value(value):
+    """Scale a measurement by 100 for storage; None is stored as RING_NONE."""
+    if value is None:
+        return RING_NONE
+    return max(min(int(round(value * 100)), 32767), -32767)
+
+
+def unpack_value(value):
+    """Restore a stored measurement; RING_NONE is restored as None."""
+    if value == RING_NONE:
+        return None
+    return value / 100
+
+
+class CorrosionRingLog:
+    """A fixed-size binary log of sensor records in a preallocated ring file
+    on the SD card. Records are struct-packed: epoch seconds, temperature,
+    humidity, dew point, PCB temperature (Celsius), corrosion index, and
+    heater flag. Appends overwrite the oldest record when the ring is full
+    and cost two small writes: the record and the header index. Records are
+    in time order, so a time range is found with a binary search."""
+
+    def __init__(self, path="/sd/ringlog.bin", capacity=52560, debug=False):
+        # Default capacity is one year of 10-minute records (735kB)
+        self._path = path
+        self._record_size = struct.calcsize(RING_RECORD)
+        self._capacity = capacity
+        self._head = 0  # Ring index of the next record to write
+        self._count = 0  # Number of records in the ring
+        self._first = 0  # Epoch of the oldest record
+        self._last = 0  # Epoch of the newest record
+
+        # Only a missing file is created. A read error is raised rather than
+        #   erasing the ring; a damaged header is kept aside as path.bad.
+        try:
+            os.stat(self._path)
+        except OSError:
+            self._create()
+        else:
+            try:
+                self._read_header()
+            except ValueError as e:
+                print("Ring log:", e, "- kept as", self._path + ".bad")
+                self._set_aside()
+                self._create()
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def count(self):
+        # The number of records in the ring.
+        return self._count
+
+    @property
+    def capacity(self):
+        # The maximum number of records held by the ring.
+        return self._capacity
+
+    @property
+    def time_range(self):
+        # The epoch of the oldest and the newest record.
+        return self._first, self._last
+
+    def _read_header(self):
+        with open(self._path, "rb") as ring_file:
+            header = ring_file.read(RING_HEADER_SIZE)
+        if len(header) < RING_HEADER_SIZE:
+            raise ValueError("Ring log header is incomplete")
+        (magic, version, size, capacity, head, count, first, last) = struct.unpack_from(
+            RING_HEADER, header
+        )
+        if magic != RING_MAGIC or version != RING_VERSION or size != self._record_size:
+            raise ValueError("Not a compatible ring log")
+        self._capacity = capacity
+        self._head = head
+        self._count = count
+        self._first = first
+        self._last = last
+
+    def _header(self):
+        header = bytearray(RING_HEADER_SIZE)
+        struct.pack_into(
+            RING_HEADER,
+            header,
+            0,
+            RING_MAGIC,
+            RING_VERSION,
+            self._record_size,
+            self._capacity,
+            self._head,
+            self._count,
+            self._first,
+            self._last,
+        )
+        return header
+
+    def _set_aside(self):
+        # Keep a damaged ring file as path.bad, replacing an earlier one
+        try:
+            os.remove(self._path + ".bad")
+        except OSError:
+            pass
+        os.rename(self._path, self._path + ".bad")
+
+    def _create(self):
+        # Preallocate the ring file so that appends never extend the file
+        self._head = 0
+        self._count = 0
+        self._first = 0
+        self._last = 0
+        block = bytes(512)
+        remaining = self._capacity * self._record_size
+        with open(self._path, "wb") as ring_file:
+            ring_file.write(self._header())
+            while remaining > 0:
+                ring_file.write(block[: min(remaining, 512)])
+                remaining -= 512
+
+    def append(self, epoch, temp_c, humid, dew_c, pcb_c, corrosion_index, heater):
+        """Write a record at the head of the ring and update the header."""
+        record = struct.pack(
+            RING_RECORD,
+            int(epoch),
+            pack_value(temp_c),
+            pack_value(humid),
+            pack_value(dew_c),
+            pack_value(pcb_c),
+            -1 if corrosion_index is None else corrosion_index,
+            1 if heater else 0,
+        )
+        with open(self._path, "r+b") as ring_file:
+            ring_file.seek(RING_HEADER_SIZE + self._head * self._record_size)
+            ring_file.write(record)
+            self._head = (self._head + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+            self._last = int(epoch)
+            if self._count == 1:
+                self._first = self._last
+            elif self._count == self._capacity:
+                # The oldest record is now the one at the head
+                ring_file.seek(RING_HEADER_SIZE + self._head * self._record_size)
+                self._first = struct.unpack("<I", ring_file.read(4))[0]
+            ring_file.seek(0)
+            ring_file.write(self._header())
+
+    def _unpack(self, data):
+        epoch, temp, humid, dew, pcb, index, heater = struct.unpack(RING_RECORD, data)
+        return (
+            epoch,
+            unpack_value(temp),
+            unpack_value(humid),
+            unpack_value(dew),
+            unpack_value(pcb),
+            None if index < 0 else index,
+            bool(heater),
+        )
+
+    def _read(self, ring_file, index):
+        # Read the record at a logical index; 0 is the oldest record
+        slot = (self._head - self._count + index) % self._capacity
+        ring_file.seek(RING_HEADER_SIZE + slot * self._record_size)
+        return ring_file.read(self._record_size)
+
+    def query(self, start=0, end=0xFFFFFFFF):
+        """Yield the records with start <= epoch <= end, oldest first."""
+        with open(self._path, "rb") as ring_file:
+            low = 0
+            high = self._count
+            while low < high:  # Find the first record at or after start
+                middle = (low + high) // 2
+                if struct.unpack_from("<I", self._read(ring_file, middle))[0] < start:
+                    low = middle + 1
+                else:
+                    high = middle
+            for index in range(low, self._count):
+                record = self._unpack(self._read(ring_file, index))
+                if record[0] > end:
+                    break
+                yield record
@@ -0,0 +1,113 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_scheduler.py  2022-07-17 v1.0717
+
+import time
+
+
+class MinuteScheduler:
+    """A deadline scheduler for the once-a-minute sensor tick. Deadlines
+    are kept on time.monotonic_ns and aligned to wall-clock minute
+    boundaries, so a late wake-up does not drift the following deadlines.
+    Each tick is identified by its epoch minute number (epoch // 60), which
+    only increases while the wall clock runs forward, so each minute and
+    each cluster minute fires exactly once. A backward wall clock step (a
+    daylight saving fall-back or a time correction) realigns the ticks to
+    the wall clock; the minutes it repeats fire again.
+
+    A tick that is more than one period late is caught up: the missed
+    minutes fire one after another, up to max_catch_up of them; beyond that
+    the oldest missed minutes are skipped and counted. The lateness of each
+    tick is kept for jitter statistics. Call sync() after the wall clock is
+    set to realign the deadlines to the wall-clock minutes."""
+
+    def __init__(
+        self, period=60, max_catch_up=2, clock_ns=None, wall=None, debug=False
+    ):
+        self._period_ns = period * 1000000000
+        self._period = period
+        self._max_catch_up = max_catch_up  # Missed ticks fired late
+        self._clock_ns = clock_ns or time.monotonic_ns  # Monotonic clock (ns)
+        self._wall = wall or time.time  # Wall clock (epoch seconds)
+
+        self._tick = None  # Number of the next tick (epoch // period)
+        self._last_tick = None  # Number of the most recently fired tick
+        self._deadline = 0  # Monotonic time of the next tick (ns)
+
+        self._ticks = 0  # Ticks fired
+        self._caught_up = 0  # Ticks fired more than one period late
+        self._skipped = 0  # Ticks skipped
+        self._late_sum = 0  # Total lateness of fired ticks (ns)
+        self._late_max = 0  # Greatest lateness of a fired tick (ns)
+        self.sync()
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def tick(self):
+        # The number (epoch // period) of the next tick.
+        return self._tick
+
+    @property
+    def stats(self):
+        # Ticks fired, ticks caught up, and ticks skipped.
+        return self._ticks, self._caught_up, self._skipped
+
+    @property
+    def jitter(self):
+        # Mean and maximum tick lateness (ms).
+        if not self._ticks:
+            return 0.0, 0.0
+        return self._late_sum / self._ticks / 1000000, self._late_max / 1000000
+
+    def sync(self):
+        """Align the next deadline to its wall-clock period boundary. Before
+        the first tick this is the next boundary; after that it is the tick
+        following the most recently fired tick, so a small wall clock step
+        neither repeats nor silently drops a tick. Ticks passed over by a
+        forward step are caught up or skipped by fire(). A backward step to
+        before the most recently fired tick restarts the ticks at the next
+        boundary rather than waiting out the step. The deadline is never
+        more than one period away."""
+        wall = self._wall()
+        now = self._clock_ns()
+        tick = int(wall // self._period) + 1
+        if self._last_tick != None and tick >= self._last_tick:
+            tick = self._last_tick + 1
+        self._tick = tick
+        wait = int((tick * self._period - wall) * 1000000000)
+        self._deadline = now + min(wait, self._period_ns)
+
+    def delay(self):
+        """Seconds until the next deadline; 0 when it is due."""
+        wait = min(max(self._deadline - self._clock_ns(), 0), self._period_ns)
+        return wait / 1000000000
+
+    def fire(self):
+        """Return the tick number (epoch // period) when a deadline is due,
+        otherwise None."""
+        late = self._clock_ns() - self._deadline
+        if late < 0:
+            return None
+        missed = late // self._period_ns  # Later deadlines also passed
+        if missed > self._max_catch_up:
+            skip = missed - self._max_catch_up
+            self._skipped += skip
+            self._tick += skip
+            self._deadline += skip * self._period_ns
+            late -= skip * self._period_ns
+        if late >= self._period_ns:
+            self._caught_up += 1
+        self._ticks += 1
+        self._late_sum += late
+        self._late_max = max(self._late_max, late)
+
+        tick = self._tick
+        self._last_tick = tick
+        self._tick += 1
+        self._deadline += self._period_ns
+        return tick
@@ -5,6 +5,7 @@
 
 import time
 import board
+from array import array
 from analogio import AnalogIn
 
 # Temperature Converter Helpers
@@ -13,10 +14,14 @@ from cedargrove_unit_converter.temperature import (
     heat_index,
     dew_point,
 )
+from corrosion_logic import condition, CorrosionState
 
 
 class CorrosionTemp:
-    """A sensor class for the PyPortal's integral temperature sensor."""
+    """A sensor class for the PyPortal's integral temperature sensor. The
+    ADT7410 converts continuously (240ms per conversion), so with a
+    temp_delay of 0 each read returns the latest conversion without
+    waiting."""
 
     def __init__(self, sensor="ADT7410", temp_delay=0.5):
         import adafruit_adt7410  # Integral I2C temperature sensor
@@ -35,71 +40,177 @@ class CorrosionTemp:
 
     def read(self):
         """Update the temperature current value"""
-        time.sleep(self._temp_delay)  # Wait to read temperature value
+        if self._temp_delay:
+            time.sleep(self._temp_delay)  # Wait to read temperature value
         self._temp_c = round(self._corrosion_sensor.temperature, 1)  # Celsius
         self._temp_f = round(celsius_to_fahrenheit(self._temp_c), 1)  # Fahrenheit
         return
 
 
+class LightSampler:
+    """A block sampler for an analog light sensor. Captures a block of samples
+    into a preallocated buffer with a single buffered-ADC call when the
+    analogbufio module is available, otherwise with an AnalogIn loop.
+    The block is reduced with the native sum(), min(), and max() built-ins."""
+
+    def __init__(self, pin=board.LIGHT, samples=2000, sample_rate=100000, bits=12):
+        self._pin = pin
+        self._samples = samples
+        self._sample_rate = sample_rate
+        self._buffer = array("H", [0] * samples)  # Preallocated sample block
+        self._shift = 16 - bits  # Scales raw buffered-ADC counts to 16 bits
+        self._mean = 0
+        self._min = 0
+        self._max = 0
+        try:
+            import analogbufio  # Buffered (DMA) ADC
+
+            self._analogbufio = analogbufio
+            self._sensor = None
+        except ImportError:
+            self._analogbufio = None
+            self._sensor = AnalogIn(self._pin)
+
+    @property
+    def bulk(self):
+        # Samples are captured with the buffered ADC.
+        return self._analogbufio != None
+
+    @property
+    def samples(self):
+        # The number of samples per block.
+        return self._samples
+
+    @property
+    def buffer(self):
+        # The most recently captured sample block.
+        return self._buffer
+
+    @property
+    def mean(self):
+        # Mean of the most recent block (0 - 65535).
+        return self._mean
+
+    @property
+    def min_max(self):
+        # Minimum and maximum of the most recent block (0 - 65535).
+        return self._min, self._max
+
+    def sample(self):
+        """Capture and reduce a block of samples. Returns the block mean."""
+        buffer = self._buffer
+        if self._analogbufio:
+            with self._analogbufio.BufferedIn(
+                self._pin, sample_rate=self._sample_rate
+            ) as adc:
+                adc.readinto(buffer)
+            shift = self._shift
+        else:
+            sensor = self._sensor
+            for i in range(self._samples):
+                buffer[i] = sensor.value
+            shift = 0
+        self._mean = (sum(buffer) / self._samples) * (1 << shift)
+        self._min = min(buffer) << shift
+        self._max = max(buffer) << shift
+        return self._mean
+
+
 class CorrosionLight:
     """A sensor class for the PyPortal's integral light sensor."""
 
-    def __init__(self):
-        """Instantiate the light sensor and measure the ambient light level."""
-        self._sensor = AnalogIn(board.LIGHT)
+    def __init__(self, samples=2000, ttl=0.25):
+        """Instantiate the light sensor and measure the ambient light level.
+        Readings are cached for ttl seconds so that the raw, normalized, and
+        lux views of the same frame share a single acquisition."""
+        self._sampler = LightSampler(pin=board.LIGHT, samples=samples)
+        self._ttl = ttl  # Reading cache time-to-live (seconds)
+        self._acquired = None  # Time of the cached reading (ns)
+        self._acquisitions = 0  # Number of sample blocks acquired
+        self._raw = 0
         self.ambient_calibrate()
 
     @property
     def raw(self):
         """Acquire the current and ambient raw light sensor value."""
-        self._read_sensor_value()
+        self._cached_value()
         return self._raw, self._ambient
 
     @property
     def normalized(self):
         """Acquire the current and ambient normalized light sensor value."""
-        self._read_sensor_value()
+        self._cached_value()
         return self._raw / 65535, self._ambient / 65535
 
     @property
     def lux(self):
         """Acquire the current and ambient lux light sensor value. Full-scale
         raw value (65535) is approximately 1100 Lux."""
-        self._read_sensor_value()
+        self._cached_value()
         return self._raw / 65535 * 1100, self._ambient / 65535 * 1100
 
+    @property
+    def acquisitions(self):
+        # The number of sample blocks acquired since instantiation.
+        return self._acquisitions
+
+    def refresh(self):
+        """Acquire a new reading regardless of the age of the cached value."""
+        self._read_sensor_value()
+
+    def _cached_value(self):
+        # Acquire a new reading only when the cached reading has expired
+        if (
+            self._acquired is None
+            or time.monotonic_ns() - self._acquired > self._ttl * 1000000000
+        ):
+            self._read_sensor_value()
+
     def _read_sensor_value(self):
         """Read and average sensor values. Adjust the ambient baseline
-        with the new reading."""
-        self._raw = 0
-        for i in range(2000):
-            self._raw = self._raw + self._sensor.value
-        self._raw = self._raw / 2000
+        with the new reading; once per acquisition."""
+        self._raw = self._sampler.sample()
+        self._acquisitions += 1
+        self._acquired = time.monotonic_ns()
         self._ambient = (0.99 * self._ambient) + (0.01 * self._raw)
 
     def ambient_calibrate(self):
         """Establish an ambient light level."""
-        self._ambient = 0
-        for i in range(2000):
-            self._ambient = self._ambient + self._sensor.value
-        self._ambient = self._ambient / 2000
+        self._ambient = self._sampler.sample()
+        self._acquisitions += 1
 
 
 class CorrosionTempHumid:
     """A sensor class for the SHT31D-based indoor/outdoor and the AM2320-based
     indoor temperature and humidity sensors."""
 
-    def __init__(self, sensor="SHT31D", temp_delay=3, humid_delay=4, debug=False):
+    def __init__(
+        self, sensor="SHT31D", temp_delay=3, humid_delay=4, periodic=False, debug=False
+    ):
+        self._periodic = False
         if sensor == "SHT31D":
             import adafruit_sht31d  # I2C temperature/humidity sensor; indoor/outdoor
 
+            self._sht31d = adafruit_sht31d
             self._corrosion_sensor = adafruit_sht31d.SHT31D(board.I2C())
+            self._corrosion_sensor.heater = False  # turn heater OFF
+            if periodic:
+                # The sensor measures continuously at 1Hz; each read fetches
+                #   the latest combined temperature and humidity measurement
+                #   with a single I2C transaction and without waiting. The
+                #   heater is set first; the sensor accepts other commands
+                #   only after a Break ends periodic measurement. The
+                #   driver's 4Hz accelerated response time (art) mode is not
+                #   used; with one read per minute it only adds self-heating.
+                self._corrosion_sensor.frequency = adafruit_sht31d.FREQUENCY_1
+                self._corrosion_sensor.mode = adafruit_sht31d.MODE_PERIODIC
+                self._periodic = True
         if sensor == "AM2320":
             import adafruit_am2320  # I2C temperature/humidity sensor; indoor
 
             self._corrosion_sensor = adafruit_am2320.AM2320(board.I2C())
+            self._corrosion_sensor.heater = False  # turn heater OFF
 
-        self._corrosion_sensor.heater = False  # turn heater OFF
         self._heater_on = False
         self._temp_delay = temp_delay  # Temperature measurement delay (sec)
         self._humid_delay = humid_delay  # Humidity measurement delay (sec)
@@ -109,6 +220,7 @@ class CorrosionTempHumid:
         self._dew_f = None
         self._humid_pct = None
         self._corrosion_index = 0  # 0:Normal, 1:Warning, 2:ALERT
+        self._state = CorrosionState()  # Index hysteresis and heater limits
 
         self._debug = debug
         if self._debug:
@@ -138,51 +250,76 @@ class CorrosionTempHumid:
     @heater_on.setter
     def heater_on(self, heater=False):
         self._heater_on = heater
+        if self._periodic:
+            # Break periodic measurement (single-shot mode) to switch the heater
+            self._corrosion_sensor.mode = self._sht31d.MODE_SINGLE
         if self._heater_on:
             self._corrosion_sensor.heater = True  # Turn sensor heater ON
         else:
             self._corrosion_sensor.heater = False  # Turn sensor heater OFF
+        if self._periodic:
+            self._corrosion_sensor.mode = self._sht31d.MODE_PERIODIC
         return
 
+    @property
+    def state(self):
+        # The corrosion index and heater state machine.
+        return self._state
+
+    @property
+    def periodic(self):
+        # The sensor is in periodic (non-blocking) acquisition mode.
+        return self._periodic
+
+    def _latest(self, temps, humids):
+        # Periodic mode returns lists of buffered measurements; use the newest
+        #   real one. The driver backfills empty buffer slots with an
+        #   all-ones word, read as 130.0C and 100.0%; a single value is
+        #   returned unchanged.
+        if not isinstance(temps, list):
+            return temps, humids
+        for temp_c, humid_pct in zip(reversed(temps), reversed(humids)):
+            if temp_c != 130.0 or humid_pct != 100.0:
+                return temp_c, humid_pct
+        return None, None
+
     def read(self):
         """Update the temperature and humidity with current values,
-        calculate dew point and corrosion index"""
-        time.sleep(self._temp_delay)  # Wait to read temperature value
-        self._temp_c = self._corrosion_sensor.temperature
+        calculate dew point and corrosion index. In periodic mode the latest
+        measurement is fetched without delay."""
+        if self._periodic:
+            # Both values come from the same cached periodic fetch
+            self._temp_c, self._humid_pct = self._latest(
+                self._corrosion_sensor.temperature,
+                self._corrosion_sensor.relative_humidity,
+            )
+        else:
+            time.sleep(self._temp_delay)  # Wait to read temperature value
+            self._temp_c = self._corrosion_sensor.temperature
+            time.sleep(self._humid_delay)  # Wait to read humidity value
+            self._humid_pct = self._corrosion_sensor.relative_humidity
+
+        # Constrain and round values, calculate dew point values
+        self._temp_c, self._humid_pct, self._dew_c = condition(
+            self._temp_c, self._humid_pct
+        )
         if self._temp_c != None:
-            self._temp_c = min(max(self._temp_c, -40), 125)  # constrain value
-            self._temp_c = round(self._temp_c, 1)  # Celsius
             self._temp_f = round(celsius_to_fahrenheit(self._temp_c), 1)  # Fahrenheit
         else:
             self._temp_f = None
-        time.sleep(self._humid_delay)  # Wait to read humidity value
-        self._humid_pct = self._corrosion_sensor.relative_humidity
-        if self._humid_pct != None:
-            self._humid_pct = min(max(self._humid_pct, 0), 100)  # constrain value
-            self._humid_pct = round(self._corrosion_sensor.relative_humidity, 1)
-
-        # Calculate dew point values
-        if None in (self._temp_c, self._humid_pct):
-            self._dew_c = None
-            self._dew_f = None
-        else:
-            self._dew_c = dew_point(self._temp_c, self._humid_pct)
+        if self._dew_c != None:
             self._dew_f = round(celsius_to_fahrenheit(self._dew_c), 1)
-
-        # calculate corrosion index value; keep former value if temp or dewpoint = None
-        if None in (self._temp_c, self._dew_c):
-            return
         else:
-            if (self._temp_c <= self._dew_c + 2) or self._humid_pct >= 80:
-                self._corrosion_index = 2  # CORROSION ALERT
-                self._corrosion_sensor.heater = True  # turn heater ON
-                self._heater_on = True
-            elif self._temp_c <= self._dew_c + 5:
-                self._corrosion_index = 1  # CORROSION WARNING
-                self._corrosion_sensor.heater = False  # turn heater OFF
-                self._heater_on = False
-            else:
-                self._corrosion_index = 0  # NORMAL
-                self._corrosion_sensor.heater = False  # turn heater OFF
-                self._heater_on = False
+            self._dew_f = None
+
+        # Update the corrosion index and heater with hysteresis, dwell, and
+        #   duty-cycle limits; the index is kept if temp or dewpoint = None.
+        self._corrosion_index = self._state.update(
+            time.monotonic_ns() // 1000000000,
+            self._temp_c,
+            self._humid_pct,
+            self._dew_c,
+        )
+        if self._state.heater != self._heater_on:
+            self.heater_on = self._state.heater
         return
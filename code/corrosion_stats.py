@@ -0,0 +1,135 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_stats.py  2022-07-17 v1.0717
+"""Board-independent rolling statistics for the sensor channels."""
+
+from array import array
+
+
+class _Window:
+    """Running aggregates for the newest size samples of a RollingStats
+    ring. The mean and variance are updated with Welford's method, adding
+    the new sample and removing the expired one. The minimum and maximum
+    are the fronts of monotonic deques of ring slots held in fixed arrays."""
+
+    def __init__(self, size):
+        self.size = size
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.low = array("H", [0] * size)  # Slots with increasing values
+        self.low_front = 0
+        self.low_len = 0
+        self.high = array("H", [0] * size)  # Slots with decreasing values
+        self.high_front = 0
+        self.high_len = 0
+
+    @property
+    def footprint(self):
+        # Bytes used by the deque arrays.
+        return 2 * self.size * self.low.itemsize
+
+    def add(self, values, slot):
+        value = values[slot]
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        # Drop deque entries that can no longer be the minimum or maximum
+        while self.low_len and values[
+            self.low[(self.low_front + self.low_len - 1) % self.size]
+        ] >= value:
+            self.low_len -= 1
+        self.low[(self.low_front + self.low_len) % self.size] = slot
+        self.low_len += 1
+        while self.high_len and values[
+            self.high[(self.high_front + self.high_len - 1) % self.size]
+        ] <= value:
+            self.high_len -= 1
+        self.high[(self.high_front + self.high_len) % self.size] = slot
+        self.high_len += 1
+
+    def remove(self, values, slot):
+        value = values[slot]
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+        else:
+            delta = value - self.mean
+            self.mean -= delta / self.count
+            self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+        # The expired sample can only be at the front of a deque
+        if self.low_len and self.low[self.low_front] == slot:
+            self.low_front = (self.low_front + 1) % self.size
+            self.low_len -= 1
+        if self.high_len and self.high[self.high_front] == slot:
+            self.high_front = (self.high_front + 1) % self.size
+            self.high_len -= 1
+
+
+class RollingStats:
+    """Rolling mean, standard deviation, minimum, and maximum of one channel
+    over windows of the newest samples (for example, 1 and 24 hours of
+    readings). Samples are held in a preallocated array ring sized for the
+    longest window and each window's aggregates are updated in O(1) time per
+    sample (amortized for the minimum and maximum). All buffers are
+    allocated at instantiation, so the RAM footprint is fixed. None readings
+    are skipped."""
+
+    def __init__(self, windows=(12, 288), debug=False):
+        self._capacity = max(windows)  # Ring size; the longest window (samples)
+        self._values = array("f", [0] * self._capacity)  # Sample ring
+        self._head = 0  # Ring slot of the next sample
+        self._count = 0  # Samples in the ring
+        self._windows = [_Window(size) for size in windows]
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+            print("*Init: footprint", self.footprint, "bytes")
+
+    @property
+    def footprint(self):
+        # Bytes used by the sample ring and the window deques.
+        return self._capacity * self._values.itemsize + sum(
+            window.footprint for window in self._windows
+        )
+
+    @property
+    def count(self):
+        # The number of samples in the ring.
+        return self._count
+
+    def add(self, value):
+        """Add a sample to the ring and to every window."""
+        if value == None:
+            return
+        slot = self._head
+        for window in self._windows:
+            if window.count == window.size:
+                window.remove(self._values, (slot - window.size) % self._capacity)
+        self._values[slot] = value
+        for window in self._windows:
+            window.add(self._values, slot)
+        self._head = (slot + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def summary(self, window=0):
+        """The (mean, standard deviation, minimum, maximum) of a window,
+        selected by its position in windows. Values are None until the
+        window holds a sample."""
+        stats = self._windows[window]
+        if stats.count == 0:
+            return None, None, None, None
+        deviation = (stats.m2 / stats.count) ** 0.5
+        return (
+            stats.mean,
+            deviation,
+            self._values[stats.low[stats.low_front]],
+            self._values[stats.high[stats.high_front]],
+        )
@@ -0,0 +1,168 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# corrosion_wetness.py  2022-07-17 v1.0717
+"""Board-independent ISO 9223 time-of-wetness accumulator, used on the
+device and by the host-side log tools."""
+
+import struct
+from array import array
+
+# fmt: off
+WINDOWS = (30, 90, 365)  # Rolling window lengths (days)
+
+# ISO 9223 time-of-wetness category upper limits (hours per year) for
+#   categories T1 to T5
+TOW_LIMITS = (10, 250, 2500, 5500)
+
+# Indicative corrosivity category for each time-of-wetness category at a site
+#   with low sulfur dioxide and chloride deposition (P0-P1, S0-S1). Confirm
+#   the category against ISO 9223 for sites with higher pollution levels.
+CORROSIVITY = ("C1", "C2", "C3", "C3", "C4")
+
+_STATE = "<4siIIfB"  # magic, day, days seen, last epoch, total hours, last wet
+_MAGIC = b"TOW1"
+# fmt: on
+
+
+class TimeOfWetness:
+    """Accumulates ISO 9223 time of wetness: hours with relative humidity
+    above 80% and temperature above 0 degrees Celsius. Wet hours are kept in
+    a fixed 365-day ring of daily totals with a running sum for each rolling
+    window, so each update costs O(1) and memory use is constant (about
+    1.5kB). Each reading's wetness holds until the next reading, up to
+    max_gap seconds."""
+
+    def __init__(self, humid_threshold=80, temp_threshold=0, max_gap=1200, debug=False):
+        self._humid_threshold = humid_threshold
+        self._temp_threshold = temp_threshold
+        self._max_gap = max_gap  # Longest interval credited to one reading (sec)
+
+        self._hours = array("f", [0] * 365)  # Wet hours per day; ring by day number
+        self._sums = [0.0] * len(WINDOWS)  # Wet hours in each rolling window
+        self._day = None  # Day number (epoch // 86400) of the latest reading
+        self._days_seen = 0  # Days since the first reading, including today
+        self._last_epoch = None  # Epoch of the latest reading
+        self._last_wet = False  # The latest reading met the wetness condition
+        self._total = 0.0  # Wet hours since the first reading
+
+        self._debug = debug
+        if self._debug:
+            print("*Init:", self.__class__)
+            print("*Init: ", self.__dict__)
+
+    @property
+    def total_hours(self):
+        # Wet hours since the first reading.
+        return self._total
+
+    def hours(self, window=365):
+        """Wet hours in the rolling window (30, 90, or 365 days)."""
+        return self._sums[WINDOWS.index(window)]
+
+    def annual_hours(self, window=365):
+        """Wet hours in the rolling window scaled to one year. Windows that
+        are not yet full are scaled by the days observed."""
+        days = min(window, self._days_seen)
+        if days == 0:
+            return 0.0
+        return self.hours(window) * 365 / days
+
+    def tow_category(self, window=365):
+        """ISO 9223 time-of-wetness category (1 to 5 for T1 to T5)."""
+        annual = self.annual_hours(window)
+        for category, limit in enumerate(TOW_LIMITS):
+            if annual <= limit:
+                return category + 1
+        return len(TOW_LIMITS) + 1
+
+    def corrosivity(self, window=365):
+        """Indicative corrosivity category ("C1" to "C4") for the window."""
+        return CORROSIVITY[self.tow_category(window) - 1]
+
+    def _advance(self, day):
+        # Move the ring forward to a new day; days leave each window in turn
+        steps = day - self._day
+        if steps >= 365:
+            for slot in range(365):
+                self._hours[slot] = 0
+            self._sums = [0.0] * len(WINDOWS)
+        else:
+            for new_day in range(self._day + 1, day + 1):
+                for i, window in enumerate(WINDOWS):
+                    self._sums[i] -= self._hours[(new_day - window) % 365]
+                    if self._sums[i] < 0:
+                        self._sums[i] = 0.0  # Rounding residue
+                self._hours[new_day % 365] = 0
+        self._days_seen += steps
+        self._day = day
+
+    def update(self, epoch, temp_c, humid):
+        """Add a reading. Credits the interval since the previous reading when
+        the previous reading was wet. Returns True when a new day starts."""
+        day = int(epoch // 86400)
+        new_day = False
+        if self._day is None:
+            self._day = day
+            self._days_seen = 1
+        elif day > self._day:
+            self._advance(day)
+            new_day = True
+
+        if self._last_wet and self._last_epoch is not None:
+            interval = min(max(epoch - self._last_epoch, 0), self._max_gap) / 3600
+            self._hours[day % 365] += interval
+            for i in range(len(WINDOWS)):
+                self._sums[i] += interval
+            self._total += interval
+
+        self._last_wet = (
+            None not in (temp_c, humid)
+            and humid > self._humid_threshold
+            and temp_c > self._temp_threshold
+        )
+        self._last_epoch = epoch
+        return new_day
+
+    def save(self, path):
+        """Write the accumulator state to a file."""
+        with open(path, "wb") as state_file:
+            state_file.write(
+                struct.pack(
+                    _STATE,
+                    _MAGIC,
+                    -1 if self._day is None else self._day,
+                    self._days_seen,
+                    0 if self._last_epoch is None else int(self._last_epoch),
+                    self._total,
+                    1 if self._last_wet else 0,
+                )
+            )
+            state_file.write(self._hours)
+
+    def load(self, path):
+        """Restore the accumulator state from a file. Returns False if the
+        file is missing or invalid."""
+        try:
+            with open(path, "rb") as state_file:
+                header = state_file.read(struct.calcsize(_STATE))
+                magic, day, days_seen, last_epoch, total, last_wet = struct.unpack(
+                    _STATE, header
+                )
+                if magic != _MAGIC:
+                    return False
+                state_file.readinto(self._hours)
+        except (OSError, ValueError):
+            return False
+        self._day = None if day < 0 else day
+        self._days_seen = days_seen
+        self._last_epoch = last_epoch if last_epoch else None
+        self._total = total
+        self._last_wet = bool(last_wet)
+        # Rebuild the window sums from the daily totals
+        for i, window in enumerate(WINDOWS):
+            self._sums[i] = 0.0
+            if self._day is not None:
+                for back in range(min(window, self._days_seen)):
+                    self._sums[i] += self._hours[(self._day - back) % 365]
+        return True
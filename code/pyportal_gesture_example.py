@@ -4,39 +4,35 @@
 # pyportal_gesture_example.py 2022-07-12 v4.0712
 
 import board
-from analogio import AnalogIn
-
-# Instantiate light sensor input
-light_sensor = AnalogIn(board.LIGHT)
+from corrosion_sensors import LightSampler
 
 # Gesture detection threshold: foreground to background ratio
 GESTURE_DETECT_THRESHOLD = 0.90
 
+# Light sensor samples per reading. A high samples value will reduce
+#   sensitivity to flickering light sources but will proportionally increase
+#   acquisition latency.
+SAMPLES = 2000
+
+# Instantiate light sensor input; uses the buffered ADC when available
+light_sensor = LightSampler(pin=board.LIGHT, samples=SAMPLES)
+
 
-def read_foreground(background, samples=2000):
+def read_foreground(background):
     """Read and average sensor values. Adjust the background baseline
-    slightly with the new reading. A high samples value will reduce sensitivity
-    to flickering light sources but will proportionally increase acquisition
-    latency. Background level is adjusted slightly each time the foreground
-    level is read. A maximum reading is equivalent to approximately 1100 Lux."""
-    foreground = 0
-    for i in range(samples):
-        foreground = foreground + light_sensor.value
-    foreground = foreground / samples
+    slightly with the new reading. Background level is adjusted slightly each
+    time the foreground level is read. A maximum reading is equivalent to
+    approximately 1100 Lux."""
+    foreground = light_sensor.sample()
     background = (0.99 * background) + (0.01 * foreground)
     # Calculate foreground to background brightness ratio
     ratio = foreground / background
     return foreground, background, ratio
 
-def read_background(samples=2000):
+def read_background():
     """Read and average sensor values to establish the background light
-    level. A high samples value will reduce sensitivity to flickering light
-    sources but will proportionally increase acquisition latency. """
-    background = 0
-    for i in range(samples):
-        background = background + light_sensor.value
-    background = background / samples
-    return background
+    level."""
+    return light_sensor.sample()
 
 
 # Establish baseline background value
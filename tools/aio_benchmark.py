@@ -0,0 +1,206 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# aio_benchmark.py  2022-07-17 v1.0717
+"""Compares the former five push_to_io calls per sensor cluster with the
+single grouped request of corrosion_aio.CorrosionAIO, against a local HTTP
+stand-in for Adafruit IO that adds a fixed latency to every request.
+
+The legacy path follows the PyPortal library's push_to_io: a feed lookup
+(GET) and a data post (POST) for each feed, then the AIO_SENSOR_DELAY sleep
+after each feed. The sleeps are added to the blocked time rather than
+slept. The grouped path is also run through its per-feed fallback.
+
+The publisher's error handling is then checked: HTTP 500 and 429 replies
+must be reported as undelivered feeds rather than raised, and a 429 must
+hold off further requests. Exits with status 1 if a check fails.
+
+Usage: python tools/aio_benchmark.py --clusters 10 --latency 0.25
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from corrosion_aio import (
+    AdafruitIO_RequestError,
+    AdafruitIO_ThrottleError,
+    CorrosionAIO,
+)
+
+# fmt: off
+AIO_SENSOR_DELAY = 2  # Former sleep after each feed (sec)
+
+CLUSTER = [
+    ("shop.int-temperature",    72.5),
+    ("shop.int-humidity",       48.2),
+    ("shop.int-dewpoint",       51.6),
+    ("shop.int-pcb-temperature", 88.1),
+    ("shop.int-corrosion-index", 0),
+]
+# fmt: on
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Adafruit IO stand-in. Replies to feed lookups, feed data, and group
+    data posts after the server's latency; the server's status list, when
+    not empty, supplies the status of the next reply."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        server = self.server
+        server.requests += 1
+        time.sleep(server.latency)
+        status = server.statuses.pop(0) if server.statuses else 200
+        data = json.dumps(body if status == 200 else {"error": "stand-in"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        key = self.path.rstrip("/").split("/")[-1]
+        self._reply({"key": key})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if "/groups/" in self.path:
+            self._reply([{"feed_key": point["key"]} for point in payload["feeds"]])
+        else:
+            self._reply({"value": payload.get("value")})
+
+
+def request(method, url, payload=None):
+    """Send a JSON request; raise the Adafruit IO library's errors for
+    error replies."""
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(
+        url, data=data, method=method, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(req) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        if e.code == 429:
+            raise AdafruitIO_ThrottleError(e.reason)
+        raise AdafruitIO_RequestError(e.reason)
+
+
+class StandInIO:
+    """The IO_HTTP calls used by CorrosionAIO's group request."""
+
+    def __init__(self, url):
+        self._url = url
+
+    def _compose_path(self, path):
+        return self._url + "/api/v2/user/" + path
+
+    def _post(self, path, payload):
+        return request("POST", path, payload)
+
+
+class StandInNetwork:
+    def __init__(self, url):
+        self._url = url
+
+    def _get_io_client(self):
+        return StandInIO(self._url)
+
+
+class StandInPyPortal:
+    """The PyPortal calls used to send feed data: push_to_io looks up the
+    feed and then posts the value, as the PyPortal library does."""
+
+    def __init__(self, url, grouped=True):
+        self._url = url
+        self.network = StandInNetwork(url) if grouped else object()
+
+    def push_to_io(self, feed, value):
+        base = self._url + "/api/v2/user/feeds/" + feed
+        request("GET", base)
+        request("POST", base + "/data", {"value": value})
+
+
+def run_legacy(server, url, clusters):
+    pyportal = StandInPyPortal(url)
+    server.requests = 0
+    start = time.monotonic()
+    for _ in range(clusters):
+        for feed, value in CLUSTER:
+            pyportal.push_to_io(feed, value)
+    elapsed = time.monotonic() - start
+    return server.requests, elapsed, elapsed + clusters * len(CLUSTER) * AIO_SENSOR_DELAY
+
+
+def run_grouped(server, url, clusters, grouped=True):
+    aio = CorrosionAIO(StandInPyPortal(url, grouped=grouped), group="shop")
+    server.requests = 0
+    start = time.monotonic()
+    for _ in range(clusters):
+        results = aio.push_cluster(CLUSTER)
+        if not all(results.values()):
+            print("undelivered feeds:", results)
+    elapsed = time.monotonic() - start
+    return server.requests, elapsed, elapsed
+
+
+def check_errors(server, url):
+    """Returns a list of failure descriptions; empty when all pass."""
+    failures = []
+    aio = CorrosionAIO(StandInPyPortal(url), group="shop", throttle_hold=1)
+    for status in (500, 404, 429):
+        server.statuses = [status]
+        try:
+            results = aio.push_cluster(CLUSTER)
+        except Exception as e:
+            failures.append("HTTP %d raised %r" % (status, e))
+            continue
+        if any(results.values()):
+            failures.append("HTTP %d reported delivered feeds" % status)
+    server.requests = 0
+    if any(aio.push_cluster(CLUSTER).values()) or server.requests:
+        failures.append("request sent during the throttle hold-off")
+    time.sleep(1.1)
+    if not all(aio.push_cluster(CLUSTER).values()):
+        failures.append("cluster not delivered after the hold-off")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark grouped AIO publishing.")
+    parser.add_argument("--clusters", type=int, default=10, help="sensor clusters")
+    parser.add_argument("--latency", type=float, default=0.25, help="request latency (sec)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.latency = args.latency
+    server.statuses = []
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+
+    print("%-10s %10s %12s %12s" % ("", "requests", "network s", "blocked s"))
+    for name, run in (
+        ("push_to_io", lambda: run_legacy(server, url, args.clusters)),
+        ("grouped", lambda: run_grouped(server, url, args.clusters)),
+        ("fallback", lambda: run_grouped(server, url, args.clusters, grouped=False)),
+    ):
+        print("%-10s %10d %12.2f %12.2f" % ((name,) + run()))
+
+    server.latency = 0
+    failures = check_errors(server, url)
+    print("error handling: " + ("; ".join(failures) or "ok"))
+    server.shutdown()
+    sys.exit(1 if failures else 0)
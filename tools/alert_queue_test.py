@@ -0,0 +1,140 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# alert_queue_test.py  2022-07-17 v1.0717
+"""Host-side checks of the CorrosionDisplay alert queue under the stand-in
+board modules on a virtual clock:
+
+  order     alerts are shown highest priority first and oldest first
+            within a priority; a queued or shown alert is not queued
+            again; a full queue drops the newest of the lowest-priority
+            alerts; no alert() call sleeps
+  time      alert() takes the same time with a queue of one alert and of
+            --queue alerts: a repeated alert, a status alert into a queue
+            full of status alerts, and an error alert into a queue full of
+            error alerts are each timed --repeat times, and the median
+            with the long queue may not exceed --max-ratio of the median
+            with the short one
+
+Exits with status 1 if a check fails.
+
+Usage: python tools/alert_queue_test.py --queue 256 --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+clock = standins.VirtualClock()
+standins.install(clock)
+
+
+def shown(disp):
+    """Animate the queue to the end. Returns the alert texts in the order
+    they were shown."""
+    texts = []
+    while disp.alerts_pending:
+        disp.animate()
+        if disp._alert_text != None and disp._alert_text not in texts[-1:]:
+            texts.append(disp._alert_text)
+    return texts
+
+
+def check_order():
+    """Returns a list of failure descriptions."""
+    from corrosion_display import ALERT_STATUS, ALERT_NOTICE, ALERT_ERROR
+
+    failures = []
+    disp = standins.display(clock, alert_queue=4)
+    start = clock.ns
+    disp.alert("NORMAL")
+    disp.alert("-- NO SD CARD", ALERT_ERROR)
+    disp.alert("Sensor heater: ON", ALERT_NOTICE)
+    disp.alert("NORMAL")  # Already queued
+    disp.alert("CORROSION WARNING")
+    disp.alert("-- Get time error", ALERT_ERROR)  # Drops CORROSION WARNING
+    disp.alert("CORROSION ALERT")  # Queue full of higher priorities
+    if clock.ns != start:
+        failures.append("alert() slept %.3f s" % ((clock.ns - start) / 1e9))
+    expected = ["-- NO SD CARD", "-- Get time error", "Sensor heater: ON", "NORMAL"]
+    texts = shown(disp)
+    if texts != expected:
+        failures.append("shown %r, expected %r" % (texts, expected))
+
+    disp.alert("NORMAL")  # Within alert_repeat of the last showing
+    if disp.alerts_pending:
+        failures.append("a repeated alert was queued within alert_repeat")
+    clock.advance(601)
+    disp.alert("NORMAL")
+    if shown(disp) != ["NORMAL"]:
+        failures.append("alert not shown again after alert_repeat")
+    return failures
+
+
+def alert_calls(length):
+    """alert() calls on queues of length alerts: a repeated alert, a status
+    alert into a queue full of status alerts, and an error alert into a
+    queue full of error alerts. None of them changes the queue."""
+    from corrosion_display import ALERT_STATUS, ALERT_ERROR
+
+    sys.stdout = open(os.devnull, "w")  # Queued alerts are printed
+    try:
+        status = standins.display(clock, alert_queue=length)
+        for i in range(length):
+            status.alert("status %d" % i, ALERT_STATUS)
+        error = standins.display(clock, alert_queue=length)
+        for i in range(length):
+            error.alert("error %d" % i, ALERT_ERROR)
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    return (
+        lambda: status.alert("status 0"),
+        lambda: status.alert("status new"),
+        lambda: error.alert("error new", ALERT_ERROR),
+    )
+
+
+def median_times(calls, repeat, batch=100):
+    """Median time (sec) of each call, timed in batches of calls and
+    alternating between the calls to share the host's timing drift."""
+    times = [[] for _ in calls]
+    for _ in range(repeat):
+        for call, call_times in zip(calls, times):
+            start = time.perf_counter()
+            for _ in range(batch):
+                call()
+            call_times.append((time.perf_counter() - start) / batch)
+    for call_times in times:
+        call_times.sort()
+    return [call_times[len(call_times) // 2] for call_times in times]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the display alert queue.")
+    parser.add_argument("--queue", type=int, default=256, help="long queue length")
+    parser.add_argument("--repeat", type=int, default=200, help="timed batches per case")
+    parser.add_argument("--max-ratio", type=float, default=1.5, help="long to short time limit")
+    args = parser.parse_args()
+
+    failures = check_order()
+    print("order  " + ("; ".join(failures) or "ok"))
+    failed = bool(failures)
+
+    calls = alert_calls(1) + alert_calls(args.queue)
+    times = median_times(calls, args.repeat)
+    short, long = times[:3], times[3:]
+    failures = []
+    print("%-16s %10s %10s" % ("alert() us", "queue 1", "queue %d" % args.queue))
+    for name, a, b in zip(("repeated", "status full", "error full"), short, long):
+        print("%-16s %10.3f %10.3f" % (name, a * 1e6, b * 1e6))
+        if b > a * args.max_ratio:
+            failures.append("%s %.1fx slower with %d alerts" % (name, b / a, args.queue))
+    print("time   " + ("; ".join(failures) or "ok"))
+    failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,177 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# boot_profile_test.py  2022-07-17 v1.0717
+"""Host-side checks of the boot phase profiler (corrosion_profiler) under
+the stand-in board modules, and a boot-time regression check.
+
+  phases    on a virtual clock with a stand-in gc.mem_free, each mark()
+            records its phase name, duration, and heap change exactly,
+            and the summary table and total agree with them
+  save      save() appends a stamped table to the file on each boot
+  boot      the part of corrosion_code's boot that runs on the host is
+            profiled: imports, the light sensor, fan, statistics, and
+            forecast constructors, and the SD logs and outbox on a
+            temporary folder; fails if the total exceeds --budget ms
+
+The display, the temperature sensors, and the network need the PyPortal
+libraries and are not part of the boot check. CPython has no
+gc.mem_free, so the boot table shows no heap changes. Exits with status 1
+if a check fails.
+
+Usage: python tools/boot_profile_test.py --budget 2000
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+clock = standins.VirtualClock()
+adc = standins.install(clock)
+
+import corrosion_profiler
+from corrosion_profiler import BootProfiler
+
+# fmt: off
+PHASES = (                      # Phase, seconds, bytes allocated
+    ("import system modules",   0.120,  4096),
+    ("import corrosion_display", 0.850, 22528),
+    ("SD card check",           0.500,     0),
+    ("CorrosionTempHumid()",    0.004,   640),
+)
+HEAP = 120000                   # Stand-in free heap at start-up (bytes)
+# fmt: on
+
+
+def check_phases():
+    """Returns the profiler and a list of failure descriptions."""
+    failures = []
+    heap = [HEAP]
+    time_module = corrosion_profiler.time
+    gc_module = corrosion_profiler.gc
+    corrosion_profiler.time = clock.module()
+    corrosion_profiler.gc = types.SimpleNamespace(mem_free=lambda: heap[0])
+    try:
+        profiler = BootProfiler()
+        for name, seconds, allocated in PHASES:
+            clock.advance(seconds)
+            heap[0] -= allocated
+            profiler.mark(name)
+    finally:
+        corrosion_profiler.time = time_module
+        corrosion_profiler.gc = gc_module
+
+    expected = [
+        (name, int(seconds * 1000000000), -allocated)
+        for name, seconds, allocated in PHASES
+    ]
+    if profiler.phases != expected:
+        failures.append("phases %r, expected %r" % (profiler.phases, expected))
+    total = sum(seconds for _, seconds, _ in PHASES)
+    if abs(profiler.total - total) > 1e-9:
+        failures.append("total %.9f s, expected %.9f s" % (profiler.total, total))
+    summary = profiler.summary()
+    if len(summary) != len(PHASES) + 2:
+        failures.append("summary has %d lines" % len(summary))
+    else:
+        for line, (name, seconds, allocated) in zip(summary[1:], PHASES):
+            fields = line.split()
+            if float(fields[-2]) != round(seconds * 1000, 1) or int(fields[-1]) != -allocated:
+                failures.append("summary line %r" % line)
+        fields = summary[-1].split()
+        heap_total = -sum(allocated for _, _, allocated in PHASES)
+        if float(fields[1]) != round(total * 1000, 1) or int(fields[2]) != heap_total:
+            failures.append("summary total %r" % summary[-1])
+    return profiler, failures
+
+
+def check_save(profiler, folder):
+    failures = []
+    path = os.path.join(folder, "boot_profile.txt")
+    profiler.save(path, stamp="2022-07-01, 00:00:00")
+    profiler.save(path, stamp="2022-07-02, 00:00:00")
+    with open(path) as profile_file:
+        lines = profile_file.read().splitlines()
+    table = profiler.summary()
+    expected = ["boot 2022-07-01, 00:00:00"] + table + ["boot 2022-07-02, 00:00:00"] + table
+    if lines != expected:
+        failures.append("saved %d lines, expected %d" % (len(lines), len(expected)))
+    return failures
+
+
+def boot(folder):
+    """Profile the host-runnable part of the boot. Returns the profiler."""
+    for name in list(sys.modules):
+        if name.startswith("corrosion_") and name != "corrosion_profiler":
+            del sys.modules[name]  # Import afresh, as at power-up
+    profiler = BootProfiler()
+    sensors = importlib.import_module("corrosion_sensors")
+    profiler.mark("import corrosion_sensors")
+    modules = {}
+    for name in (
+        "corrosion_outbox",
+        "corrosion_logger",
+        "corrosion_ringlog",
+        "corrosion_wetness",
+        "corrosion_stats",
+        "corrosion_forecast",
+        "corrosion_fan",
+        "corrosion_scheduler",
+    ):
+        modules[name] = importlib.import_module(name)
+    profiler.mark("import other modules")
+
+    sensors.CorrosionLight()
+    profiler.mark("CorrosionLight()")
+    modules["corrosion_fan"].CorrosionFan(pin="D4")
+    profiler.mark("CorrosionFan()")
+    for _ in range(5):
+        modules["corrosion_stats"].RollingStats(windows=(12, 288))
+    profiler.mark("RollingStats()")
+    modules["corrosion_forecast"].CondensationForecast(size=30, interval=60, horizon=240)
+    modules["corrosion_scheduler"].MinuteScheduler(period=60)
+    profiler.mark("forecast and scheduler")
+
+    modules["corrosion_outbox"].CorrosionOutbox(path=folder)
+    modules["corrosion_logger"].CorrosionLogger(
+        os.path.join(folder, "logs"), flush_count=6, flush_age=3600, rotate="day"
+    )
+    modules["corrosion_ringlog"].CorrosionRingLog(
+        os.path.join(folder, "ringlog.bin"), capacity=52560
+    )
+    modules["corrosion_logger"].CorrosionLogger(os.path.join(folder, "fan.csv"))
+    modules["corrosion_wetness"].TimeOfWetness()
+    profiler.mark("SD logs and outbox")
+    return profiler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the boot phase profiler.")
+    parser.add_argument("--budget", type=float, default=2000, help="host boot limit (ms)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as folder:
+        profiler, failures = check_phases()
+        print("phases  " + ("; ".join(failures) or "ok"))
+        failed = failed or bool(failures)
+        failures = check_save(profiler, folder)
+        print("save    " + ("; ".join(failures) or "ok"))
+        failed = failed or bool(failures)
+
+        adc.clock = standins.VirtualClock()  # Light sensor time apart from the boot
+        profiler = boot(folder)
+        profiler.print_summary()
+        if profiler.total * 1000 > args.budget:
+            print("boot    %.1f ms exceeds the %.0f ms budget" % (profiler.total * 1000, args.budget))
+            failed = True
+        else:
+            print("boot    ok")
+    sys.exit(1 if failed else 0)
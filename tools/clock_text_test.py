@@ -0,0 +1,105 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# clock_text_test.py  2022-07-17 v1.0717
+"""Host-side checks of the CorrosionDisplay clock and date text cache
+under the stand-in board modules on a virtual clock. show() is called
+every --interval seconds for --days days, starting mid-minute before a
+midnight, with extra calls bunched within single minutes:
+
+  counts    format_counts grows by at most one clock text per minute and
+            one date text per day; over the run, by exactly the minutes
+            and the days shown; show() does not sleep
+  text      the clock and date labels match the time, formatted directly
+            in the former way, after every call; midnight and noon read
+            12 on the 12-hour clock
+
+Run for the 12-hour and the 24-hour clock. Exits with status 1 if a check
+fails.
+
+Usage: python tools/clock_text_test.py --days 3 --interval 7
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+# Start 30 seconds into the minute, 90 minutes before a midnight
+clock = standins.VirtualClock(epoch=standins.START_EPOCH - 5400 + 30)
+standins.install(clock)
+
+WEEKDAY = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTH = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def expected_text(now, hour_24):
+    """The clock and date texts of a structured time, formatted directly."""
+    hour = now.tm_hour
+    if not hour_24:
+        hour = hour % 12
+        if hour == 0:
+            hour = 12
+    return (
+        "{:2d}:{:02d}".format(hour, now.tm_min),
+        "%s  %s %02d, %04d"
+        % (WEEKDAY[now.tm_wday], MONTH[now.tm_mon - 1], now.tm_mday, now.tm_year),
+    )
+
+
+def check_clock(hour_24, days, interval):
+    """Returns the show() calls and a list of failure descriptions."""
+    disp = standins.display(clock, hour_24=hour_24)
+    failures = []
+    minutes = set()
+    dates = set()
+    calls = 0
+    end = clock.ns + days * 86400 * 1000000000
+    while clock.ns < end and len(failures) < 10:
+        # Bunch a few calls within the minute every tenth step
+        for _ in range(4 if calls % 10 == 0 else 1):
+            before = disp.format_counts
+            start = clock.ns
+            disp.show()
+            if clock.ns != start:
+                failures.append("show() slept %.3f s" % ((clock.ns - start) / 1e9))
+            calls += 1
+            now = clock.localtime()
+            minute = clock.time() // 60
+            after = disp.format_counts
+            new_date = (now.tm_year, now.tm_yday) not in dates
+            new_minute = minute not in minutes
+            if after[0] - before[0] != new_date:
+                failures.append("date texts %d at %s" % (after[0] - before[0], now[:6]))
+            if after[1] - before[1] != new_minute:
+                failures.append("clock texts %d at %s" % (after[1] - before[1], now[:6]))
+            dates.add((now.tm_year, now.tm_yday))
+            minutes.add(minute)
+            text = (disp._clock_digits.text, disp._clock_day_mon_yr.text)
+            if text != expected_text(now, hour_24):
+                failures.append("shown %r at %s" % (text, now[:6]))
+            clock.advance(0.5)
+        clock.advance(interval)
+    if disp.format_counts != (len(dates), len(minutes)):
+        failures.append(
+            "%d date and %d clock texts for %d days and %d minutes"
+            % (disp.format_counts + (len(dates), len(minutes)))
+        )
+    return calls, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the display clock text cache.")
+    parser.add_argument("--days", type=float, default=3, help="simulated days")
+    parser.add_argument("--interval", type=float, default=7, help="seconds between calls")
+    args = parser.parse_args()
+
+    failed = False
+    for name, hour_24 in (("12-hour", False), ("24-hour", True)):
+        calls, failures = check_clock(hour_24, args.days, args.interval)
+        print("%-8s %d calls: %s" % (name, calls, "; ".join(failures) or "ok"))
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# clock_tick_heap_test.py  2022-07-17 v1.0717
+"""Host-side check that the steady-state clock tick allocates no net heap.
+A CorrosionDisplay is built under the stand-in board modules on a virtual
+clock, and the tick path of corrosion_code's clock_task is driven once a
+second: the tick indicator toggles every tick, and at each minute the
+clock label is updated by show() and the heap watch's collect() is called.
+Each tick is measured by corrosion_profiler.HeapWatch with tracemalloc
+tracing, as on the device it is by gc.mem_alloc.
+
+The first --warm-up minutes fill the display's caches and are not checked.
+After them, every tick between the minutes must allocate no net bytes.
+A minute's label text change replaces the glyph tiles of the old text, and
+CPython's integer and free-list churn moves the traced heap by a few bytes
+either way, so the minute ticks are checked by the retained heap: it must
+stay within --slack bytes of the level after the warm-up, through the run
+and across a day boundary. Exits with status 1 if a check fails.
+
+Usage: python tools/clock_tick_heap_test.py --minutes 180 --slack 2048
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+# Start the check 30 minutes before a midnight so that it crosses a day
+clock = standins.VirtualClock(epoch=standins.START_EPOCH - 1800)
+standins.install(clock)
+
+from corrosion_profiler import HeapWatch
+
+
+def tick(disp, heap, minute_tick):
+    """One pass of clock_task. Returns the bytes it allocated."""
+    heap.start()
+    disp.clock_tick = not disp.clock_tick  # Change the on-screen tick indicator
+    if minute_tick:
+        disp.show()  # Update clock display
+        heap.collect()  # Collect garbage only when the heap runs low
+    if disp.refresh_pending:
+        disp.refresh()  # Complete a refresh deferred by the frame budget
+    return heap.stop()
+
+
+def check_ticks(minutes, warm_up, slack):
+    """Returns the ticks measured, the most retained heap growth after the
+    warm-up (bytes), and a list of failure descriptions."""
+    disp = standins.display(clock, brightness=0.75)
+    heap = HeapWatch()
+    failures = []
+    measured = 0
+    level = None  # Retained heap after the warm-up
+    growth = 0
+    date = disp._clock_day_mon_yr.text
+    tracemalloc.start()
+    try:
+        for second in range(minutes * 60):
+            clock.advance(1)
+            minute_tick = clock.time() % 60 == 0
+            allocated = tick(disp, heap, minute_tick)
+            if second < warm_up * 60:
+                continue
+            if minute_tick:
+                retained = tracemalloc.get_traced_memory()[0]
+                if level == None:
+                    level = retained
+                growth = max(growth, retained - level)
+            elif allocated != 0:
+                failures.append("tick %d allocated %r bytes" % (second, allocated))
+            else:
+                measured += 1
+    finally:
+        tracemalloc.stop()
+    if growth > slack:
+        failures.append("retained heap grew %d bytes over the minutes" % growth)
+    if disp._clock_day_mon_yr.text == date:
+        failures.append("the check did not cross a day boundary")
+    return measured, growth, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the clock tick heap allocation.")
+    parser.add_argument("--minutes", type=int, default=180, help="simulated minutes")
+    parser.add_argument("--warm-up", type=int, default=2, help="unchecked minutes")
+    parser.add_argument("--slack", type=int, default=2048, help="retained heap limit (bytes)")
+    args = parser.parse_args()
+
+    measured, growth, failures = check_ticks(args.minutes, args.warm_up, args.slack)
+    print("%d ticks between minutes without allocation" % measured)
+    print("retained heap growth over the minutes: %d bytes" % growth)
+    for failure in failures[:10]:
+        print("  " + failure)
+    print("check: " + ("%d failures" % len(failures) if failures else "ok"))
+    sys.exit(1 if failures else 0)
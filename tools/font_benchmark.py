@@ -0,0 +1,117 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# font_benchmark.py  2022-07-17 v1.0717
+"""Compares the start-up font loading of the former BDF fonts with the
+packed subset fonts (.cgf) loaded by corrosion_fonts.load_font, for the
+four fonts in code/fonts.
+
+The BDF path loads each font with adafruit_bitmap_font and then fetches
+the glyphs of the packed subset one at a time with get_glyph, as labels
+did when first drawn; the packed path loads the .cgf, which preloads every
+glyph in one pass. Each load is timed and its retained and peak heap are
+measured with tracemalloc. The glyphs of both paths are then compared
+field by field and pixel by pixel.
+
+Runs on the host with the Blinka displayio, bitmaptools, and fontio
+modules and adafruit_bitmap_font:
+  pip install adafruit-blinka-displayio adafruit-circuitpython-bitmap-font
+Host times and heap are CPython's, so only the before and after ratio
+carries over to the device. Exits with status 1 if a glyph differs.
+
+Usage: python tools/font_benchmark.py --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from adafruit_bitmap_font import bitmap_font
+from corrosion_fonts import load_font
+
+FONTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "fonts")
+NAMES = ("OpenSans-9", "Arial-12", "Arial-Bold-24", "Anton-Regular-104")
+
+
+def load_bdf(name, codes):
+    font = bitmap_font.load_font(os.path.join(FONTS, name + ".bdf"))
+    for code in codes:
+        font.get_glyph(code)  # Loaded glyph by glyph on first use
+    return font
+
+
+def load_cgf(name, codes):
+    return load_font(os.path.join(FONTS, name + ".cgf"))
+
+
+def measure(loader, name, codes, repeat):
+    """Best load time (ms), and retained and peak heap (bytes) of a load."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(name, codes)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    font = loader(name, codes)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del font
+    return best * 1000, retained, peak
+
+
+def glyph_differences(name, codes):
+    """Code points whose BDF and packed glyphs differ."""
+    bdf = load_bdf(name, codes)
+    cgf = load_cgf(name, codes)
+    differ = []
+    for code in codes:
+        a = bdf.get_glyph(code)
+        b = cgf.get_glyph(code)
+        fields = ("width", "height", "dx", "dy", "shift_x", "shift_y")
+        if a is None or b is None or any(getattr(a, f) != getattr(b, f) for f in fields):
+            differ.append(code)
+            continue
+        pixels = [
+            (a.bitmap[x, y] != 0) != (b.bitmap[x, y] != 0)
+            for y in range(a.height)
+            for x in range(a.width)
+        ]
+        if any(pixels):
+            differ.append(code)
+    return differ
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark start-up font loading.")
+    parser.add_argument("--repeat", type=int, default=3, help="timed loads per font")
+    args = parser.parse_args()
+
+    print(
+        "%-18s %7s %10s %10s %10s %10s %10s %10s"
+        % ("", "glyphs", "BDF ms", "cgf ms", "BDF heap", "cgf heap", "BDF peak", "cgf peak")
+    )
+    totals = [0, 0, 0, 0, 0, 0]
+    failed = False
+    for name in NAMES:
+        packed = load_cgf(name, ())  # Holds the glyphs the UI renders
+        codes = [code for code in range(32, 256) if packed.get_glyph(code)]
+        bdf = measure(load_bdf, name, codes, args.repeat)
+        cgf = measure(load_cgf, name, codes, args.repeat)
+        row = (bdf[0], cgf[0], bdf[1], cgf[1], bdf[2], cgf[2])
+        totals = [t + r for t, r in zip(totals, row)]
+        print("%-18s %7d %10.1f %10.1f %10d %10d %10d %10d" % ((name, len(codes)) + row))
+        differ = glyph_differences(name, codes)
+        if differ:
+            print("  glyphs differ: " + "".join(chr(c) for c in differ))
+            failed = True
+    print(
+        "%-18s %7s %10.1f %10.1f %10d %10d %10d %10d"
+        % (("total", "") + tuple(totals))
+    )
+    print("start-up font loading %.1fx faster" % (totals[0] / totals[1]))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,126 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# font_pack.py  2022-07-17 v1.0717
+"""Host-side font build step. Converts a BDF font into a packed binary
+subset font (.cgf) that contains only the glyphs the display can render.
+The packed font is loaded in a single pass by corrosion_fonts.PackedFont.
+
+Packed font layout (little-endian):
+  header:      "<4sHhhhhhh"  magic b"CGF1", glyph count, bounding box width,
+                             height, x offset, y offset, ascent, descent
+  glyph table: "<IBBhhhh"    code point, width, height, dx, dy, shift_x,
+                             shift_y; one entry per glyph
+  bitmaps:     one 1-bit bitmap per glyph in table order; rows padded to a
+               whole byte with the leftmost pixel in the most significant bit
+
+The fonts the display loads are listed in FONTS with their BDF source and
+character subset; --all rebuilds every one of them in a fonts folder.
+
+Usage: python tools/font_pack.py Arial-12.bdf Arial-12.cgf --chars " 0123456789"
+       python tools/font_pack.py --all code/fonts
+"""
+
+import argparse
+import os
+import struct
+
+MAGIC = b"CGF1"
+HEADER = "<4sHhhhhhh"
+GLYPH = "<IBBhhhh"
+
+# Printable ASCII plus the degree symbol
+ASCII = "".join(chr(c) for c in range(32, 127)) + "°"
+
+# The display's packed fonts: packed font file, BDF source, characters
+# fmt: off
+FONTS = (
+    ("OpenSans-9.cgf",        "OpenSans-9.bdf",        ASCII),  # Titles, date, messages
+    ("Arial-12.cgf",          "Arial-12.bdf",          " %-.0123456789CDFNenow°"),  # Humidity, dew point
+    ("Arial-Bold-24.cgf",     "Arial-Bold-24.bdf",     " !-.0123456789Neno°"),  # Temperature, status
+    ("Anton-Regular-104.cgf", "Anton-Regular-104.bdf", " 0123456789:"),  # Clock digits
+)
+# fmt: on
+
+
+def read_bdf(path):
+    """Parse a BDF file. Returns the font properties and a dictionary of
+    glyphs keyed by code point."""
+    font = {"bbox": (0, 0, 0, 0), "ascent": 0, "descent": 0}
+    glyphs = {}
+    glyph = None
+    bitmap = None
+    with open(path, "r", encoding="latin-1") as bdf:
+        for line in bdf:
+            fields = line.split()
+            if not fields:
+                continue
+            keyword = fields[0]
+            if bitmap is not None:
+                if keyword == "ENDCHAR":
+                    glyph["bitmap"] = bytes.fromhex("".join(bitmap))
+                    if glyph["code"] >= 0:
+                        glyphs[glyph["code"]] = glyph
+                    glyph = None
+                    bitmap = None
+                else:
+                    bitmap.append(keyword)
+            elif keyword == "FONTBOUNDINGBOX":
+                font["bbox"] = tuple(int(v) for v in fields[1:5])
+            elif keyword == "FONT_ASCENT":
+                font["ascent"] = int(fields[1])
+            elif keyword == "FONT_DESCENT":
+                font["descent"] = int(fields[1])
+            elif keyword == "STARTCHAR":
+                glyph = {"code": -1, "shift": (0, 0), "bbx": (0, 0, 0, 0)}
+            elif keyword == "ENCODING":
+                glyph["code"] = int(fields[1])
+            elif keyword == "DWIDTH":
+                glyph["shift"] = (int(fields[1]), int(fields[2]))
+            elif keyword == "BBX":
+                glyph["bbx"] = tuple(int(v) for v in fields[1:5])
+            elif keyword == "BITMAP":
+                bitmap = []
+    return font, glyphs
+
+
+def pack_font(source, destination, chars=ASCII):
+    """Write the glyphs for chars from the BDF source to a packed font file.
+    Returns the number of glyphs written."""
+    font, glyphs = read_bdf(source)
+    codes = sorted(set(ord(c) for c in chars) & set(glyphs))
+    with open(destination, "wb") as packed:
+        packed.write(
+            struct.pack(
+                HEADER, MAGIC, len(codes), *font["bbox"], font["ascent"], font["descent"]
+            )
+        )
+        for code in codes:
+            width, height, dx, dy = glyphs[code]["bbx"]
+            packed.write(struct.pack(GLYPH, code, width, height, dx, dy, *glyphs[code]["shift"]))
+        for code in codes:
+            width, height, _, _ = glyphs[code]["bbx"]
+            bitmap = glyphs[code]["bitmap"]
+            packed.write(bitmap[: ((width + 7) // 8) * height])
+    return len(codes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a BDF font subset.")
+    parser.add_argument("source", nargs="?", help="BDF font file")
+    parser.add_argument("destination", nargs="?", help="packed font file (.cgf)")
+    parser.add_argument("--chars", default=ASCII, help="characters to include")
+    parser.add_argument("--all", metavar="FOLDER", help="rebuild the FONTS in a fonts folder")
+    args = parser.parse_args()
+    if args.all:
+        builds = [
+            (os.path.join(args.all, bdf), os.path.join(args.all, cgf), chars)
+            for cgf, bdf, chars in FONTS
+        ]
+    elif args.source and args.destination:
+        builds = [(args.source, args.destination, args.chars)]
+    else:
+        parser.error("give a source and destination, or --all FOLDER")
+    for source, destination, chars in builds:
+        count = pack_font(source, destination, chars)
+        print("%s: %d glyphs" % (destination, count))
@@ -0,0 +1,112 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# forecast_replay.py  2022-07-17 v1.0717
+"""Replays recorded Corrosion Monitor logs through the device's
+condensation forecast (corrosion_forecast) and measures its lead time: how
+long before each fall of the temperature to dew point margin to the ALERT
+margin the forecast first predicted it. Forecasts that end without an ALERT
+are counted as false alarms.
+
+The SD card logs hold one record every 10 minutes, so the default fit
+window is 6 records (1 hour) with a 600-second interval.
+
+Usage: python tools/forecast_replay.py logfile.csv /sd/logs ringlog.bin
+"""
+
+import argparse
+import os
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+
+from log_analytics import classify, source_records
+from corrosion_forecast import CondensationForecast
+from corrosion_logic import ALERT_MARGIN
+
+
+class LeadTimes:
+    """Pairs forecast runs with ALERT margin onsets. A run starts at the
+    first record with an ALERT forecast within the horizon and ends at the
+    onset or when the forecast is withdrawn."""
+
+    def __init__(self):
+        self.leads = []  # Lead time (sec) of each onset; 0 when not forecast
+        self.false_alarms = 0
+        self._run_start = None  # Epoch of the first forecast in the run
+        self._alert = True  # Margin was at or below ALERT; no onset until it clears
+
+    def add(self, epoch, margin, minutes):
+        if margin is None:
+            self._run_start = None
+            self._alert = True
+            return
+        if margin <= ALERT_MARGIN:
+            if not self._alert:
+                start = self._run_start
+                self.leads.append(0 if start is None else epoch - start)
+            self._alert = True
+            self._run_start = None
+            return
+        self._alert = False
+        if minutes is None:
+            if self._run_start is not None:
+                self.false_alarms += 1
+            self._run_start = None
+        elif self._run_start is None:
+            self._run_start = epoch
+
+    def report(self):
+        forecast = sorted(lead for lead in self.leads if lead > 0)
+        lines = [
+            "ALERT onsets: %d  forecast: %d  missed: %d  false alarms: %d"
+            % (
+                len(self.leads),
+                len(forecast),
+                len(self.leads) - len(forecast),
+                self.false_alarms,
+            )
+        ]
+        if forecast:
+            lines.append(
+                "lead time (min): min %.0f  median %.0f  mean %.0f  max %.0f"
+                % (
+                    forecast[0] / 60,
+                    forecast[len(forecast) // 2] / 60,
+                    sum(forecast) / len(forecast) / 60,
+                    forecast[-1] / 60,
+                )
+            )
+        return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure condensation forecast lead time.")
+    parser.add_argument("paths", nargs="+", help="CSV logs, log folders, or ring logs")
+    parser.add_argument("--interval", type=int, default=600, help="record interval (sec)")
+    parser.add_argument("--size", type=int, default=6, help="fit window (records)")
+    parser.add_argument("--min-samples", type=int, default=4, help="records for a forecast")
+    parser.add_argument("--horizon", type=int, default=240, help="longest forecast (min)")
+    parser.add_argument("--verbose", action="store_true", help="print every forecast")
+    args = parser.parse_args()
+
+    forecast = CondensationForecast(
+        size=args.size,
+        interval=args.interval,
+        horizon=args.horizon,
+        min_samples=args.min_samples,
+    )
+    leads = LeadTimes()
+    for epoch, temp_c, _, dew_c, _ in classify(source_records(args.paths)):
+        forecast.update(epoch, temp_c, dew_c)
+        minutes = forecast.minutes_to_alert
+        margin = None if None in (temp_c, dew_c) else temp_c - dew_c
+        leads.add(epoch, margin, minutes)
+        if args.verbose and minutes is not None:
+            print(
+                "%s  margin %5.1f  ALERT in %3d min"
+                % (time.strftime("%Y-%m-%d %H:%M", time.gmtime(epoch)), margin, minutes)
+            )
+    print("\n".join(leads.report()))
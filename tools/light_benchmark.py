@@ -0,0 +1,121 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# light_benchmark.py  2022-07-17 v1.0717
+"""Compares the AnalogIn loop and the buffered-ADC (analogbufio) paths of
+corrosion_sensors.LightSampler against a simulated light sensor.
+
+The stand-in ADC advances a virtual clock by --read-us for each AnalogIn
+read, the assumed cost of one interpreted loop pass on the device, and by
+one sample period at the sampler's sample rate for each buffered sample.
+For each path the benchmark reports the device samples per second and
+block time on that clock, the host time to capture and reduce a block, and
+the gesture detection latency: the detection loop of
+pyportal_gesture_example runs while a hand shades the sensor to --shade of
+the ambient level at a random time, and the latency is the time from the
+hand to the end of the first block whose foreground to background ratio
+is below the detection threshold.
+
+Both paths must return the same block mean for a constant light level.
+Exits with status 1 if they do not or a gesture is not detected.
+
+Usage: python tools/light_benchmark.py --read-us 25 --trials 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+clock = standins.VirtualClock()
+adc = standins.install(clock)
+
+from corrosion_sensors import LightSampler
+
+# fmt: off
+AMBIENT = 40000                  # Ambient light level (0 - 65535)
+GESTURE_DETECT_THRESHOLD = 0.90  # Foreground to background ratio
+SAMPLES = 2000                   # Samples per block
+# fmt: on
+
+
+def make_sampler(bulk):
+    standins.use_bulk(bulk)
+    sampler = LightSampler(pin="LIGHT", samples=SAMPLES)
+    if sampler.bulk != bulk:
+        raise RuntimeError("stand-in analogbufio not used as requested")
+    return sampler
+
+
+def throughput(sampler, blocks):
+    """Device samples/s and block time (virtual clock), and host time per
+    block (capture and reduce)."""
+    adc.signal = lambda seconds: AMBIENT
+    start_ns = clock.ns
+    start = time.perf_counter()
+    for _ in range(blocks):
+        sampler.sample()
+    host = (time.perf_counter() - start) / blocks
+    block = (clock.ns - start_ns) / blocks / 1000000000
+    return SAMPLES / block, block, host
+
+
+def detection(sampler, trials, shade, seed=0):
+    """Mean and maximum gesture detection latency (sec) and the gestures
+    not detected within two seconds."""
+    rng = random.Random(seed)
+    latencies = []
+    missed = 0
+    for _ in range(trials):
+        onset = clock.monotonic() + rng.uniform(0.5, 1.5)
+        adc.signal = lambda seconds: AMBIENT * shade if seconds >= onset else AMBIENT
+        background = sampler.sample()
+        while clock.monotonic() < onset + 2:
+            foreground = sampler.sample()
+            background = (0.99 * background) + (0.01 * foreground)
+            if foreground / background < GESTURE_DETECT_THRESHOLD:
+                if clock.monotonic() > onset:
+                    latencies.append(clock.monotonic() - onset)
+                break
+        else:
+            missed += 1
+    if not latencies:
+        return 0.0, 0.0, missed
+    return sum(latencies) / len(latencies), max(latencies), missed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark light sensor sampling.")
+    parser.add_argument("--read-us", type=float, default=25, help="AnalogIn loop pass (us)")
+    parser.add_argument("--blocks", type=int, default=50, help="blocks per throughput run")
+    parser.add_argument("--trials", type=int, default=200, help="gestures")
+    parser.add_argument("--shade", type=float, default=0.5, help="shaded light fraction")
+    args = parser.parse_args()
+
+    adc.read_ns = int(args.read_us * 1000)
+    failures = []
+    means = {}
+    print(
+        "%-10s %10s %9s %9s %20s %8s"
+        % ("", "samples/s", "block ms", "host ms", "latency mean/max ms", "missed")
+    )
+    for name, bulk in (("AnalogIn", False), ("BufferedIn", True)):
+        sampler = make_sampler(bulk)
+        rate, block, host = throughput(sampler, args.blocks)
+        means[name] = sampler.mean
+        mean, worst, missed = detection(sampler, args.trials, args.shade)
+        print(
+            "%-10s %10.0f %9.1f %9.2f %10.1f %9.1f %8d"
+            % (name, rate, block * 1000, host * 1000, mean * 1000, worst * 1000, missed)
+        )
+        if missed:
+            failures.append("%s missed %d gestures" % (name, missed))
+    if abs(means["AnalogIn"] - means["BufferedIn"]) >= 16:
+        failures.append("block means differ: %r" % means)
+    print("check: " + ("; ".join(failures) or "ok"))
+    sys.exit(1 if failures else 0)
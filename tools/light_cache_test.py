@@ -0,0 +1,130 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# light_cache_test.py  2022-07-17 v1.0717
+"""Host-side checks of the CorrosionLight reading cache (corrosion_sensors)
+with the stand-in light sensor on a virtual clock. The AnalogIn reads and
+buffered-ADC blocks taken by each frame are counted:
+
+  frame     raw, normalized, and lux read in one frame take one sample
+            block, agree with each other, and update the ambient level once
+  ttl       a second frame within the time-to-live takes no samples; a
+            frame after it takes one new block
+  refresh   refresh() takes a new block within the time-to-live
+  cadence   frames at the gesture task's 0.2 second interval take at most
+            one block each
+
+The checks run for the AnalogIn loop and the buffered-ADC paths. Exits
+with status 1 if a check fails.
+
+Usage: python tools/light_cache_test.py --samples 2000 --ttl 0.25
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+clock = standins.VirtualClock()
+adc = standins.install(clock)
+
+import corrosion_sensors
+from corrosion_sensors import CorrosionLight
+
+corrosion_sensors.time = clock.module()  # The ttl is timed on the virtual clock
+
+# fmt: off
+LEVELS  = (40000, 36000, 44000, 20000)  # Light levels of successive frames
+SAMPLES = 2000                          # Samples per block; set by --samples
+# fmt: on
+
+
+def blocks_taken():
+    # Sample blocks taken since the counters were reset
+    if adc.blocks:
+        return adc.blocks
+    return adc.reads / SAMPLES
+
+
+def frame(light):
+    """Read all three views of one frame. Returns the blocks taken."""
+    adc.reset()
+    raw, ambient = light.raw
+    normalized, normalized_ambient = light.normalized
+    lux, lux_ambient = light.lux
+    views = (raw, ambient, normalized * 65535, normalized_ambient * 65535)
+    if abs(views[0] - views[2]) > 0.01 or abs(lux - raw / 65535 * 1100) > 0.01:
+        raise AssertionError("views of one frame differ: %r" % (views,))
+    return blocks_taken()
+
+
+def check_light(bulk, samples, ttl):
+    """Returns a list of failure descriptions."""
+    failures = []
+    level = [LEVELS[0]]
+    adc.signal = lambda seconds: level[0]
+    standins.use_bulk(bulk)
+    adc.reset()
+    light = CorrosionLight(samples=samples, ttl=ttl)
+    if light.acquisitions != 1 or blocks_taken() != 1:
+        failures.append("calibration took %r blocks" % blocks_taken())
+
+    # frame: one block; the ambient level moves once toward the reading
+    level[0] = LEVELS[1]
+    ambient = light._ambient  # Not read through a view, which would sample
+    try:
+        blocks = frame(light)
+    except AssertionError as e:
+        failures.append(str(e))
+        blocks = None
+    expected = 0.99 * ambient + 0.01 * LEVELS[1]
+    if blocks != 1:
+        failures.append("frame took %r blocks" % blocks)
+    if abs(light.raw[1] - expected) > 0.5:
+        failures.append("ambient %.1f, expected %.1f" % (light.raw[1], expected))
+
+    # ttl: cached within the time-to-live, one new block after it
+    clock.advance(ttl / 2)
+    level[0] = LEVELS[2]
+    if frame(light) != 0:
+        failures.append("frame within the ttl took samples")
+    clock.advance(ttl)
+    if frame(light) != 1 or abs(light.raw[0] - LEVELS[2]) > 16:
+        failures.append("frame after the ttl did not take one new block")
+
+    # refresh: a new block regardless of the cache
+    level[0] = LEVELS[3]
+    adc.reset()
+    light.refresh()
+    if blocks_taken() != 1 or abs(light.raw[0] - LEVELS[3]) > 16:
+        failures.append("refresh() did not take one new block")
+
+    # cadence: the gesture task's frames
+    start = light.acquisitions
+    worst = 0
+    for _ in range(50):
+        clock.advance(0.2)
+        worst = max(worst, frame(light))
+    if worst > 1:
+        failures.append("a 0.2 s frame took %r blocks" % worst)
+    if light.acquisitions - start > 50:
+        failures.append("%d acquisitions in 50 frames" % (light.acquisitions - start))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the CorrosionLight reading cache.")
+    parser.add_argument("--samples", type=int, default=2000, help="samples per block")
+    parser.add_argument("--ttl", type=float, default=0.25, help="cache time-to-live (sec)")
+    args = parser.parse_args()
+    SAMPLES = args.samples
+
+    failed = False
+    for name, bulk in (("AnalogIn", False), ("BufferedIn", True)):
+        failures = check_light(bulk, args.samples, args.ttl)
+        print("%-10s %s" % (name, "; ".join(failures) or "ok"))
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,202 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# log_analytics.py  2022-07-17 v1.0717
+"""Host-side analytics for Corrosion Monitor SD card logs. Log files are
+streamed through a generator pipeline in fixed-size chunks, so memory use
+does not depend on log size. The dew point and corrosion index of every
+record are recalculated with the device's own logic (corrosion_logic) and
+passed through the device's CorrosionState, so that the corrosion index
+includes its hysteresis and dwell as displayed and reported by the device.
+They are summarized as hours in each corrosion state, the longest ALERT
+episodes, and sensor heater duty.
+ISO 9223 time of wetness is accumulated with the device's TimeOfWetness
+(corrosion_wetness) for the 30, 90, and 365 days ending at the last
+record.
+
+Accepts CSV logs (including the legacy logfile.csv written without line
+breaks), rotated log folders, and binary ring logs (ringlog.bin).
+
+Usage: python tools/log_analytics.py logfile.csv /sd/logs ringlog.bin
+"""
+
+import argparse
+import calendar
+import heapq
+import os
+import re
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, "..", "code"))
+sys.path.insert(0, os.path.join(_HERE, "..", "bundle_7.3.1"))
+
+from corrosion_logic import condition, corrosion_index, CorrosionState, ALERT
+from corrosion_wetness import TimeOfWetness, WINDOWS
+from cedargrove_unit_converter.temperature import fahrenheit_to_celsius
+
+# A CSV record: "YYYY-MM-DD, HH:MM:SS, temp_f, humid, dew_f"
+_RECORD = re.compile(
+    rb"(\d{4})-(\d\d)-(\d\d), (\d\d):(\d\d):(\d\d),"
+    rb"\s*(-?\d+\.\d),\s*(-?\d+\.\d),\s*(-?\d+\.\d)"
+)  # Values have one decimal place; legacy records are not line separated
+_CHUNK = 1 << 20  # Bytes read per chunk
+_STATES = ("NORMAL", "WARNING", "ALERT")
+
+
+def csv_records(path):
+    """Yield (epoch, temp_c, humid) from a CSV log. Records are found by
+    pattern rather than by line, so unframed legacy logs are also read."""
+    tail = b""
+    with open(path, "rb") as log_file:
+        while True:
+            chunk = log_file.read(_CHUNK)
+            data = tail + chunk
+            end = 0
+            for match in _RECORD.finditer(data):
+                # A match touching the end of the data may be incomplete
+                if chunk and match.end() >= len(data) - 1:
+                    break
+                fields = match.groups()
+                epoch = calendar.timegm(tuple(int(v) for v in fields[:6]) + (0, 0, 0))
+                temp_c = round(fahrenheit_to_celsius(float(fields[6])), 1)
+                yield epoch, temp_c, float(fields[7])
+                end = match.end()
+            if not chunk:
+                return
+            tail = data[end:]
+
+
+def ring_records(path):
+    """Yield (epoch, temp_c, humid) from a binary ring log."""
+    sys.path.insert(0, _HERE)
+    from ringlog_reader import RingLogReader
+
+    with RingLogReader(path) as reader:
+        for record in reader.query():
+            yield record[0], record[1], record[2]
+
+
+def source_records(paths):
+    """Yield (epoch, temp_c, humid) from every log file, folder, or ring log
+    in the order given; folder contents are read in file name order."""
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(n for n in os.listdir(path) if n.endswith(".csv"))
+            names = [n for n in names if n != "index.csv"]
+            yield from source_records([os.path.join(path, n) for n in names])
+        elif path.endswith(".bin"):
+            yield from ring_records(path)
+        else:
+            yield from csv_records(path)
+
+
+def classify(records):
+    """Recalculate dew point and corrosion index with the device logic.
+    Yields (epoch, temp_c, humid, dew_c, index)."""
+    for epoch, temp_c, humid in records:
+        temp_c, humid, dew_c = condition(temp_c, humid)
+        yield epoch, temp_c, humid, dew_c, corrosion_index(temp_c, humid, dew_c)
+
+
+class Summary:
+    """Accumulates state hours, the longest ALERT episodes, and heater duty
+    in constant memory. Each record represents the interval until the next
+    record, limited to max_gap seconds to bridge power or logging outages."""
+
+    def __init__(self, max_gap=1200, top=5):
+        self.max_gap = max_gap
+        self.top = top
+        self.records = 0
+        self.seconds = [0, 0, 0]  # Seconds in NORMAL, WARNING, ALERT
+        self.heater_seconds = 0
+        self.episodes = []  # Min-heap of (duration, start epoch)
+        self._previous = None  # (epoch, index, heater) of the previous record
+        self._episode_start = None
+
+    def _close_episode(self, end):
+        duration = end - self._episode_start
+        if len(self.episodes) < self.top:
+            heapq.heappush(self.episodes, (duration, self._episode_start))
+        else:
+            heapq.heappushpop(self.episodes, (duration, self._episode_start))
+        self._episode_start = None
+
+    def add(self, epoch, index, heater=False):
+        if index is None:
+            return
+        self.records += 1
+        if self._previous:
+            previous_epoch, previous_index, previous_heater = self._previous
+            interval = min(max(epoch - previous_epoch, 0), self.max_gap)
+            self.seconds[previous_index] += interval
+            if previous_heater:
+                self.heater_seconds += interval
+            if previous_index == ALERT and (
+                index != ALERT or epoch - previous_epoch > self.max_gap
+            ):
+                self._close_episode(previous_epoch + interval)
+        if index == ALERT and self._episode_start is None:
+            self._episode_start = epoch
+        self._previous = (epoch, index, heater)
+
+    def finish(self):
+        if self._episode_start is not None:
+            self._close_episode(self._previous[0])
+
+    def report(self):
+        total = sum(self.seconds)
+        lines = ["records: %d  hours: %.1f" % (self.records, total / 3600)]
+        for state, seconds in zip(_STATES, self.seconds):
+            share = 100 * seconds / total if total else 0
+            lines.append("%-8s %10.1f h %6.1f %%" % (state, seconds / 3600, share))
+        # The SHT31D heater follows ALERT within the CorrosionState limits
+        lines.append(
+            "heater   %10.1f h %6.1f %% duty"
+            % (self.heater_seconds / 3600, 100 * self.heater_seconds / total if total else 0)
+        )
+        lines.append("longest ALERT episodes:")
+        for duration, start in sorted(self.episodes, reverse=True):
+            lines.append(
+                "  %s  %6.1f h"
+                % (time.strftime("%Y-%m-%d %H:%M", time.gmtime(start)), duration / 3600)
+            )
+        return lines
+
+
+def wetness_report(wetness):
+    """Return the time-of-wetness windows as a list of text lines."""
+    lines = ["time of wetness: %.1f h" % wetness.total_hours]
+    for window in WINDOWS:
+        lines.append(
+            "  %3d days %8.1f h %8.1f h/yr  T%d %s"
+            % (
+                window,
+                wetness.hours(window),
+                wetness.annual_hours(window),
+                wetness.tow_category(window),
+                wetness.corrosivity(window),
+            )
+        )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize Corrosion Monitor logs.")
+    parser.add_argument("paths", nargs="+", help="CSV logs, log folders, or ring logs")
+    parser.add_argument("--max-gap", type=int, default=1200, help="longest interval (sec)")
+    parser.add_argument("--top", type=int, default=5, help="ALERT episodes to list")
+    args = parser.parse_args()
+
+    summary = Summary(max_gap=args.max_gap, top=args.top)
+    wetness = TimeOfWetness(max_gap=args.max_gap)
+    state = CorrosionState()
+    for epoch, temp_c, humid, dew_c, index in classify(source_records(args.paths)):
+        # The device reports the state machine's index, not the raw threshold
+        #   index; a record without a reading still counts as a gap
+        state_index = state.update(epoch, temp_c, humid, dew_c)
+        summary.add(epoch, None if index is None else state_index, state.heater)
+        wetness.update(epoch, temp_c, humid)
+    summary.finish()
+    print("\n".join(summary.report() + wetness_report(wetness)))
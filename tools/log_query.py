@@ -0,0 +1,113 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# log_query.py  2022-07-17 v1.0717
+"""Host-side query API for the rotated SD card logs written by
+corrosion_logger.CorrosionLogger. The sidecar index.csv is read first and
+only the log files whose first/last timestamps overlap the requested range
+are opened. The index may hold several lines for a file, one per buffer
+flush; they are merged. Epochs are the device's local-time epoch seconds.
+
+Usage: python tools/log_query.py /path/to/sd/logs --start 2022-07-01 --end 2022-07-31
+"""
+
+import argparse
+import calendar
+import os
+import time
+
+
+def parse_time(text):
+    """Convert "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" to epoch seconds."""
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return calendar.timegm(time.strptime(text, pattern))
+        except ValueError:
+            pass
+    raise ValueError("Unrecognized time: " + text)
+
+
+def parse_record(line):
+    """Split a log line "YYYY-MM-DD, HH:MM:SS, temp_f, humid, dew_f" into an
+    (epoch, temp_f, humid, dew_f) tuple; returns None for a malformed line."""
+    fields = [field.strip() for field in line.split(",")]
+    if len(fields) < 5:
+        return None
+    try:
+        epoch = parse_time(fields[0] + " " + fields[1])
+        return (epoch, float(fields[2]), float(fields[3]), float(fields[4]))
+    except ValueError:
+        return None
+
+
+class LogArchive:
+    """A folder of rotated log files and its index.csv. If the device lost
+    power while compacting the index, the compacted index.tmp is read."""
+
+    def __init__(self, folder):
+        self._folder = folder
+        path = os.path.join(folder, "index.csv")
+        if not os.path.exists(path):
+            path = os.path.join(folder, "index.tmp")
+        entries = {}  # name -> [first epoch, last epoch, count]
+        with open(path, "r") as index_file:
+            for line in index_file:
+                fields = line.strip().split(",")
+                if len(fields) != 4:
+                    continue
+                try:
+                    first, last, count = [int(field) for field in fields[1:]]
+                except ValueError:
+                    continue
+                entry = entries.setdefault(fields[0], [first, last, 0])
+                entry[0] = min(entry[0], first)
+                entry[1] = max(entry[1], last)
+                entry[2] += count
+        # (name, first epoch, last epoch, count), oldest first
+        self.index = sorted(
+            ((name,) + tuple(entry) for name, entry in entries.items()),
+            key=lambda entry: entry[1],
+        )
+
+    def files(self, start=0, end=2**32):
+        """The log file paths whose records overlap start <= epoch <= end."""
+        return [
+            os.path.join(self._folder, name)
+            for name, first, last, _ in self.index
+            if first <= end and last >= start
+        ]
+
+    def records(self, start=0, end=2**32):
+        """Yield (epoch, temp_f, humid, dew_f) records in the range, opening
+        only the overlapping files and reading them line by line."""
+        for path in self.files(start, end):
+            with open(path, "r") as log_file:
+                for line in log_file:
+                    record = parse_record(line)
+                    if record and start <= record[0] <= end:
+                        yield record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query rotated corrosion logs.")
+    parser.add_argument("folder", help="rotated log folder containing index.csv")
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--end", default=None, help="YYYY-MM-DD[ HH:MM:SS]")
+    args = parser.parse_args()
+    archive = LogArchive(args.folder)
+    start = parse_time(args.start) if args.start else 0
+    end = 2**32
+    if args.end:
+        end = parse_time(args.end)
+        if len(args.end) == 10:
+            end += 86399  # Include the whole end date
+    for epoch, temp_f, humid, dew_f in archive.records(start, end):
+        print(
+            "%s, %3.1f, %3.1f, %3.1f"
+            % (
+                time.strftime("%Y-%m-%d, %H:%M:%S", time.gmtime(epoch)),
+                temp_f,
+                humid,
+                dew_f,
+            )
+        )
@@ -0,0 +1,169 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# logger_benchmark.py  2022-07-17 v1.0717
+"""Compares the former SD log write, an open/write/close of
+/sd/logfile.csv followed by time.sleep(1) for every record, with the
+buffered corrosion_logger.CorrosionLogger, on the host filesystem in a
+temporary folder. Cluster records are logged ten minutes apart.
+
+For each writer the benchmark reports the records per second of host time,
+the records per second including the former one second sleeps (counted
+rather than slept), the file opens per record (counted with a wrapper
+around open), and the lines in the log files. The buffered writer is run
+with a single log file and with daily rotation, whose opens include the
+sidecar index.
+
+The buffered writer is then checked: every record is on its own line
+after sync(), a lone record is written once it reaches the flush age, and
+a log file left without a final newline is framed before the next record.
+Exits with status 1 if a check fails.
+
+Usage: python tools/logger_benchmark.py --records 5000 --flush-count 6
+"""
+
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+
+sys.path.insert(0, standins.CODE)
+
+import corrosion_logger
+from corrosion_logger import CorrosionLogger
+
+START_EPOCH = standins.START_EPOCH
+
+
+class OpenCounter:
+    """Counts the files opened through it; assign to a module's open."""
+
+    def __init__(self):
+        self.opens = 0
+
+    def __call__(self, *args, **kwargs):
+        self.opens += 1
+        return builtins.open(*args, **kwargs)
+
+
+def record(i):
+    epoch = START_EPOCH + i * 600
+    date = time.gmtime(epoch)
+    text = "%04d-%02d-%02d, %02d:%02d:%02d, %3.1f, %3.1f, %3.1f" % (
+        date[:6] + (72.5, 48.2, 51.6)
+    )
+    return epoch, text
+
+
+def count_lines(folder):
+    lines = 0
+    for name in os.listdir(folder):
+        if name.endswith(".csv") and name != "index.csv":
+            with open(os.path.join(folder, name)) as log_file:
+                lines += len(log_file.read().splitlines())
+    return lines
+
+
+def run_legacy(folder, records):
+    counter = OpenCounter()
+    path = os.path.join(folder, "logfile.csv")
+    start = time.perf_counter()
+    for i in range(records):
+        log_file = counter(path, "a")
+        log_file.write(record(i)[1])
+        log_file.close()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed + records, counter.opens, count_lines(folder)
+
+
+def run_buffered(folder, records, flush_count, rotate):
+    counter = OpenCounter()
+    corrosion_logger.open = counter
+    try:
+        if rotate:
+            logger = CorrosionLogger(folder, flush_count=flush_count, rotate=rotate)
+        else:
+            logger = CorrosionLogger(os.path.join(folder, "logfile.csv"), flush_count=flush_count)
+        start = time.perf_counter()
+        for i in range(records):
+            epoch, text = record(i)
+            logger.log(text, epoch)
+        logger.sync()
+        elapsed = time.perf_counter() - start
+    finally:
+        del corrosion_logger.open
+    return elapsed, elapsed, counter.opens, count_lines(folder)
+
+
+def check_age(folder):
+    """A lone record is written at the flush age, not before."""
+    clock = standins.VirtualClock()
+    time_module = corrosion_logger.time
+    corrosion_logger.time = clock.module()
+    try:
+        logger = CorrosionLogger(os.path.join(folder, "age.csv"), flush_count=6, flush_age=3600)
+        epoch, text = record(0)
+        logger.log(text, epoch)
+        clock.advance(3599)
+        early = logger.poll()
+        clock.advance(1)
+        on_time = logger.poll()
+    finally:
+        corrosion_logger.time = time_module
+    if early or not on_time or logger.pending:
+        return ["lone record not written at the flush age"]
+    return []
+
+
+def check_framing(folder):
+    """Records appended to a file without a final newline start a new line."""
+    path = os.path.join(folder, "framed.csv")
+    with open(path, "w") as log_file:
+        log_file.write(record(0)[1])  # The former writer's unterminated line
+    logger = CorrosionLogger(path, flush_count=2)
+    for i in (1, 2):
+        epoch, text = record(i)
+        logger.log(text, epoch)
+    with open(path) as log_file:
+        lines = log_file.read().splitlines()
+    if lines != [record(i)[1] for i in range(3)]:
+        return ["unterminated log file not framed: %d lines" % len(lines)]
+    return []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the buffered SD log writer.")
+    parser.add_argument("--records", type=int, default=5000, help="cluster records")
+    parser.add_argument("--flush-count", type=int, default=6, help="records per flush")
+    args = parser.parse_args()
+
+    failures = []
+    print(
+        "%-14s %12s %14s %12s %8s"
+        % ("", "records/s", "with sleep/s", "opens/rec", "lines")
+    )
+    for name, run in (
+        ("open/close", lambda folder: run_legacy(folder, args.records)),
+        ("buffered", lambda folder: run_buffered(folder, args.records, args.flush_count, None)),
+        ("buffered/day", lambda folder: run_buffered(folder, args.records, args.flush_count, "day")),
+    ):
+        with tempfile.TemporaryDirectory() as folder:
+            elapsed, blocked, opens, lines = run(folder)
+        print(
+            "%-14s %12.0f %14.2f %12.3f %8d"
+            % (name, args.records / elapsed, args.records / blocked, opens / args.records, lines)
+        )
+        if name != "open/close" and lines != args.records:
+            failures.append("%s wrote %d lines for %d records" % (name, lines, args.records))
+
+    with tempfile.TemporaryDirectory() as folder:
+        failures += check_age(folder)
+        failures += check_framing(folder)
+    print("checks: " + ("; ".join(failures) or "ok"))
+    sys.exit(1 if failures else 0)
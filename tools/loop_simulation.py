@@ -0,0 +1,324 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# loop_simulation.py  2022-07-17 v1.0717
+"""Compares the former busy-wait `while True` loop with the cooperative
+asyncio tasks of corrosion_code on a virtual clock. Blocking calls (sensor
+reads, gesture sample blocks, display refreshes, SD file opens, and AIO
+requests) advance the clock by the assumed device costs given as arguments
+rather than sleeping, so hours of operation run in minutes.
+
+The former loop is modelled pass by pass: a gesture check, the sensor block
+when the pass sees second 0, the SD and AIO block during the first ten
+seconds of a cluster minute, then a busy wait for the next second. The
+asyncio tasks are not modelled: corrosion_code itself is imported under
+the stand-in board modules (tools/standins.py), with the time module on
+the virtual clock and the SD card in a temporary folder, and its
+asyncio.run(main()) runs on an asyncio event loop whose clock is the
+virtual clock. The stand-in devices take the device costs. AIO requests
+fail for --outage hours from --outage-start, so that clusters are queued
+in the outbox and replayed in the minutes between clusters.
+
+Needs the host display libraries listed in tools/standins.py.
+
+Hand gestures arrive at random intervals and shade the light sensor for
+--hold seconds; a gesture is detected by the first check that samples
+during the hold. Reported per model:
+
+  gesture   mean and maximum latency from hand to detection, and gestures
+            missed because no check sampled during the hold
+  minute    mean and maximum lateness of the minute's sensor reading after
+            the minute boundary, minutes with no reading, and extra
+            readings in a minute
+  cluster   cluster minutes without exactly one AIO cluster, counting a
+            queued cluster when it is replayed with its record time
+
+The wall clock counts whole seconds, as time.time() does on the device,
+so a MinuteScheduler.sync() after the AIO time update can place the minute
+tick up to a second late. Exits with status 1 if the asyncio model misses
+or repeats a minute or a cluster, or a minute reading is more than
+--max-late seconds late.
+
+Usage: python tools/loop_simulation.py --hours 24 --hold 0.5
+"""
+
+import argparse
+import asyncio
+import calendar
+import importlib
+import math
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standins
+from standins import VirtualClock, VirtualTime, DeviceFiles
+
+# fmt: off
+AIO_CLUSTER_DELAY   = 10   # minutes
+AIO_CLUSTER_OFFSET  =  5   # minutes
+AIO_SENSOR_DELAY    =  2   # Former sleep after each feed (sec)
+GESTURE_DURATION    = 10   # Backlight "on" duration after gesture (sec)
+# fmt: on
+
+
+class Costs:
+    """Assumed blocking time (sec) of each device call."""
+
+    def __init__(self, args):
+        self.single_shot = args.single_shot  # SHT31D temp_delay + humid_delay
+        self.periodic = args.periodic  # SHT31D periodic fetch
+        self.detect = args.detect  # One gesture sample block
+        self.show = args.show  # Display update (former loop) or refresh
+        self.push = args.push  # One push_to_io (feed lookup and post)
+        self.group = args.group  # One grouped cluster request
+        self.time_sync = args.time_sync  # get_local_time
+        self.sd_write = args.sd_write  # open/write/close on the SD card
+
+
+class Hand:
+    """Gesture onsets at random intervals; each shades the sensor for hold
+    seconds. detect(start, end) reports a gesture seen by a check that
+    samples from start to end."""
+
+    def __init__(self, seconds, hold, seed=0):
+        rng = random.Random(seed)
+        self.hold = hold
+        self.onsets = []
+        t = rng.uniform(5, 60)
+        while t < seconds:
+            self.onsets.append(t)
+            t += rng.uniform(GESTURE_DURATION + 5, 120)
+        self.seen = {}  # Onset: detection time
+
+    def detect(self, start, end):
+        for onset in self.onsets:
+            if onset > end:
+                break
+            if onset not in self.seen and start < onset + self.hold:
+                self.seen[onset] = end
+                return True
+        return False
+
+    def results(self):
+        latencies = [self.seen[t] - t for t in self.onsets if t in self.seen]
+        missed = len(self.onsets) - len(latencies)
+        if not latencies:
+            return 0.0, 0.0, missed
+        return sum(latencies) / len(latencies), max(latencies), missed
+
+
+class Report:
+    def __init__(self, clock, seconds):
+        self.clock = clock
+        self.seconds = seconds
+        self.readings = {}  # Minute: reading start times
+        self.clusters = {}  # Cluster minute: clusters sent
+
+    def reading(self):
+        minute = self.clock.time() // 60
+        self.readings.setdefault(minute, []).append(self.clock.monotonic())
+
+    def cluster(self, minute):
+        self.clusters[minute] = self.clusters.get(minute, 0) + 1
+
+    def results(self):
+        first = self.clock.epoch // 60
+        minutes = range(first + 1, first + int(self.seconds // 60))
+        late = [
+            self.readings[m][0] - (m * 60 - self.clock.epoch)
+            for m in minutes
+            if m in self.readings
+        ]
+        missed = sum(1 for m in minutes if m not in self.readings)
+        extra = sum(len(self.readings[m]) - 1 for m in minutes if m in self.readings)
+        clusters = [
+            m for m in minutes if m % AIO_CLUSTER_DELAY == AIO_CLUSTER_OFFSET
+        ]
+        bad = sum(1 for m in clusters if self.clusters.get(m, 0) != 1)
+        mean = sum(late) / len(late) if late else 0.0
+        return mean, max(late, default=0.0), missed, extra, bad
+
+
+def run_legacy(seconds, costs, hand):
+    """The former loop: every call blocks; the pass waits for the next
+    second by polling time.localtime()."""
+    clock = VirtualClock()
+    report = Report(clock, seconds)
+    backlight_off = 0
+    startup = True
+    while clock.monotonic() < seconds:
+        now = clock.localtime()
+        if clock.monotonic() >= backlight_off:
+            start = clock.monotonic()
+            clock.sleep(costs.detect)
+            if hand.detect(start, clock.monotonic()):
+                backlight_off = clock.monotonic() + GESTURE_DURATION
+
+        if now.tm_sec == 0 or startup:
+            clock.sleep(costs.show)
+            report.reading()
+            clock.sleep(costs.single_shot)
+            clock.sleep(costs.show)
+            startup = False
+
+        if now.tm_min % AIO_CLUSTER_DELAY == AIO_CLUSTER_OFFSET and now.tm_sec < 10:
+            clock.sleep(costs.sd_write + 1)  # Write, close, then sleep(1)
+            clock.sleep(costs.show)
+            report.cluster(calendar.timegm(now) // 60)
+            for _ in range(5):
+                clock.sleep(costs.show + costs.push + AIO_SENSOR_DELAY)
+            clock.sleep(costs.show + costs.time_sync + costs.show)
+
+        # Poll time.localtime() until the second changes; the polls are
+        #   skipped to the end of the second
+        if clock.localtime().tm_sec == now.tm_sec:
+            clock.ns += 1000000000 - clock.ns % 1000000000
+    return hand.results(), report.results()
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Polls without waiting and advances the virtual clock by the time the
+    event loop would have waited."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("every task is waiting on an event")
+        self._clock.ns += math.ceil(timeout * 1000000000)  # Reach the deadline
+        return super().select(0)
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(VirtualSelector(clock))
+        self._virtual_clock = clock
+        self._clock_resolution = 1e-9
+
+    def time(self):
+        return self._virtual_clock.monotonic()
+
+
+def cluster_minutes(posts, utc_offset):
+    """The record minutes (epoch // 60) of the cluster posts. A delayed
+    record carries its UTC created_at time; a current one is posted in its
+    minute."""
+    minutes = []
+    for epoch, payload in posts:
+        if not any(feed["key"] == "int-temperature" for feed in payload["feeds"]):
+            continue  # The hourly statistics
+        if "created_at" in payload:
+            utc = time.strptime(payload["created_at"], "%Y-%m-%dT%H:%M:%SZ")
+            epoch = calendar.timegm(utc) + utc_offset * 3600
+        minutes.append(epoch // 60)
+    return minutes
+
+
+def run_code(seconds, costs, hand, outage):
+    """corrosion_code itself, imported under the stand-in board modules with
+    its SD card in a temporary folder; the stand-in devices take the
+    assumed device costs. asyncio.run(main()) runs on the virtual event
+    loop until the simulated time ends, when the tasks are cancelled and
+    corrosion_code's final log syncs run. AIO requests fail from outage[0]
+    to outage[1] seconds."""
+    clock = VirtualClock()
+    report = Report(clock, seconds)
+    standins.install(clock)
+    standins.StandInSHT31D.read_seconds = costs.periodic
+    standins.StandInSHT31D.on_fetch = report.reading  # The minute reading
+    standins.StandInADT7410.read_seconds = costs.periodic
+    standins.ShadowDetector.detect_seconds = costs.detect
+    standins.ShadowDetector.hand = hand.detect
+    standins.StandInDisplay.refresh_seconds = costs.show
+    standins.StandInPyPortal.sd_default = True
+    standins.StandInPyPortal.time_seconds = costs.time_sync
+    io = standins.StandInPyPortal.io
+    io.post_seconds = costs.group
+
+    async def supervise(main):
+        task = asyncio.ensure_future(main)
+        while clock.monotonic() < seconds and not task.done():
+            io.down = outage[0] <= clock.monotonic() < outage[1]
+            await asyncio.sleep(1)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    loop = VirtualEventLoop(clock)
+    asyncio_run = asyncio.run
+    asyncio.run = lambda main: loop.run_until_complete(supervise(main))
+    stdout = sys.stdout
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            with VirtualTime(clock), DeviceFiles(folder, costs.sd_write):
+                sys.stdout = open(os.devnull, "w")  # The REPL output
+                code = importlib.import_module("corrosion_code")
+                sys.stdout.close()
+                sys.stdout = stdout
+                pending = code.outbox.pending
+    finally:
+        sys.stdout = stdout
+        asyncio.run = asyncio_run
+        loop.close()
+    for minute in cluster_minutes(io.posts, code.LOCAL_UTC_OFFSET):
+        report.cluster(minute)
+    replayed = sum(1 for epoch, payload in io.posts if "created_at" in payload)
+    return hand.results(), report.results(), code.schedule.stats, (replayed, pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the main loop on a virtual clock.")
+    parser.add_argument("--hours", type=float, default=24, help="simulated hours")
+    parser.add_argument("--hold", type=float, default=0.5, help="gesture hold (sec)")
+    parser.add_argument("--single-shot", type=float, default=7.0, help="former sensor read (sec)")
+    parser.add_argument("--periodic", type=float, default=0.005, help="periodic sensor read (sec)")
+    parser.add_argument("--detect", type=float, default=0.05, help="gesture sample block (sec)")
+    parser.add_argument("--show", type=float, default=0.1, help="display update or refresh (sec)")
+    parser.add_argument("--push", type=float, default=1.0, help="push_to_io request pair (sec)")
+    parser.add_argument("--group", type=float, default=0.6, help="grouped AIO request (sec)")
+    parser.add_argument("--time-sync", type=float, default=1.0, help="get_local_time (sec)")
+    parser.add_argument("--sd-write", type=float, default=0.05, help="SD open/write/close (sec)")
+    parser.add_argument("--seed", type=int, default=0, help="gesture timing seed")
+    parser.add_argument("--max-late", type=float, default=2.0, help="asyncio tick limit (sec)")
+    parser.add_argument("--outage-start", type=float, default=2, help="AIO outage start (hours)")
+    parser.add_argument("--outage", type=float, default=1, help="AIO outage length (hours)")
+    args = parser.parse_args()
+
+    seconds = args.hours * 3600
+    outage = (args.outage_start * 3600, (args.outage_start + args.outage) * 3600)
+    costs = Costs(args)
+    hand = Hand(seconds, args.hold, args.seed)
+    legacy = run_legacy(seconds, costs, hand)
+    hand = Hand(seconds, args.hold, args.seed)
+    cooperative = run_code(seconds, costs, hand, outage)
+
+    print("%d gestures, %d minutes" % (len(hand.onsets), int(seconds // 60) - 1))
+    print(
+        "%-9s %22s %30s %9s"
+        % ("", "gesture latency s", "minute lateness s", "clusters")
+    )
+    print(
+        "%-9s %7s %7s %6s %7s %7s %6s %6s %9s"
+        % ("", "mean", "max", "missed", "mean", "max", "missed", "extra", "bad")
+    )
+    for name, (gesture, minute) in (
+        ("busy loop", legacy),
+        ("asyncio", cooperative[:2]),
+    ):
+        print("%-9s %7.2f %7.2f %6d %7.2f %7.2f %6d %6d %9d" % ((name,) + gesture + minute))
+    ticks, caught_up, skipped = cooperative[2]
+    print("scheduler: %d ticks, %d caught up, %d skipped" % (ticks, caught_up, skipped))
+    print("outbox: %d records replayed, %d still queued" % cooperative[3])
+
+    late, late_max, missed, extra, bad = cooperative[1]
+    sys.exit(1 if missed or extra or bad or late_max > args.max_late else 0)
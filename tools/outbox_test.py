@@ -0,0 +1,212 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# outbox_test.py  2022-07-17 v1.0717
+"""Host-side checks of the store-and-forward outbox (corrosion_outbox)
+against a simulated flaky uploader. Each scenario queues cluster records as
+the AIO task does (append, then replay) in a temporary folder and checks
+that every record is delivered once, in order, and that the queue file is
+emptied at the end:
+
+  flaky     the uploader fails for a number of calls, then recovers
+  restart   the outbox is reloaded from its index between clusters
+  torn      a record torn by a power loss is skipped, not raised
+  drift     the index holds a pending count that is too low or too high
+  cadence   the replay straight after a cluster record is queued is not
+            held back, though the replays are slightly less than the batch
+            interval apart (timed on a virtual clock)
+
+Exits with status 1 if a scenario fails.
+
+Usage: python tools/outbox_test.py --records 60 --failures 25
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+import corrosion_outbox
+from corrosion_outbox import CorrosionOutbox
+from standins import VirtualClock
+
+START_EPOCH = 1656633600
+
+
+class FlakyUploader:
+    """A send(record) stand-in that fails for the first failures calls and
+    for any call while down is True, and otherwise records the delivery."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.down = False
+        self.calls = 0
+        self.delivered = []
+
+    def send(self, record):
+        self.calls += 1
+        if self.down or self.failures > 0:
+            self.failures = max(self.failures - 1, 0)
+            return False
+        self.delivered.append(record)
+        return True
+
+
+def record(i):
+    # Every other record has a value that str() writes in exponent form
+    humid = 1e-05 if i % 2 else 48.2
+    return (START_EPOCH + i * 600, 72.5, humid, 51.6, 88.1, 0, 240)
+
+
+def drain(outbox, uploader, limit=1000):
+    # Replay until the queue is empty, as the minutes between clusters do
+    while outbox.pending and limit:
+        outbox.replay(uploader.send)
+        limit -= 1
+
+
+def check(name, folder, outbox, uploader, expected):
+    """Returns a list of failure descriptions for the scenario."""
+    failures = []
+    epochs = [r[0] for r in uploader.delivered]
+    if len(epochs) != len(set(epochs)):
+        failures.append("%d duplicate deliveries" % (len(epochs) - len(set(epochs))))
+    if epochs != sorted(epochs):
+        failures.append("deliveries out of order")
+    missing = sorted(set(expected) - set(epochs))
+    if missing:
+        failures.append("%d records not delivered" % len(missing))
+    if outbox.pending:
+        failures.append("%d records still pending" % outbox.pending)
+    if os.path.getsize(os.path.join(folder, "outbox.csv")):
+        failures.append("queue file not emptied")
+    return failures
+
+
+def scenario_flaky(folder, records, failures):
+    uploader = FlakyUploader(failures)
+    outbox = CorrosionOutbox(path=folder, batch_interval=0)
+    for i in range(records):
+        outbox.append(record(i))
+        outbox.replay(uploader.send)
+    drain(outbox, uploader)
+    return outbox, uploader, [record(i)[0] for i in range(records)]
+
+
+def scenario_restart(folder, records, failures):
+    uploader = FlakyUploader(failures)
+    outbox = CorrosionOutbox(path=folder, batch_interval=0)
+    for i in range(records):
+        outbox.append(record(i))
+        outbox.replay(uploader.send)
+        outbox = CorrosionOutbox(path=folder, batch_interval=0)  # Reload
+    drain(outbox, uploader)
+    return outbox, uploader, [record(i)[0] for i in range(records)]
+
+
+def scenario_torn(folder, records, failures):
+    uploader = FlakyUploader()
+    uploader.down = True
+    outbox = CorrosionOutbox(path=folder, batch_interval=0)
+    torn = records // 2
+    for i in range(records):
+        if i == torn:
+            # A power loss tore the write of this record
+            with open(os.path.join(folder, "outbox.csv"), "a") as data_file:
+                data_file.write("%d,72.5,48." % record(i)[0])
+            outbox = CorrosionOutbox(path=folder, batch_interval=0)  # Reload
+            continue
+        outbox.append(record(i))
+        outbox.replay(uploader.send)
+    uploader.down = False
+    drain(outbox, uploader)
+    expected = [record(i)[0] for i in range(records) if i != torn]
+    if not outbox.skipped:
+        expected.append(0)  # Fails the check: no record was skipped
+    return outbox, uploader, expected
+
+
+def scenario_drift(folder, records, failures):
+    uploader = FlakyUploader()
+    uploader.down = True
+    outbox = CorrosionOutbox(path=folder, batch_interval=0)
+    for i in range(records):
+        outbox.append(record(i))
+        outbox.replay(uploader.send)
+    index = os.path.join(folder, "outbox.idx")
+    for pending in (1, records * 2):
+        with open(index) as index_file:
+            offset = index_file.readline().split(",")[0]
+        with open(index, "w") as index_file:
+            index_file.write("%s,%d\n" % (offset, pending))
+        outbox = CorrosionOutbox(path=folder, batch_interval=0)
+        uploader.down = False
+        for _ in range(3):
+            outbox.replay(uploader.send)
+    uploader.down = False
+    drain(outbox, uploader)
+    return outbox, uploader, [record(i)[0] for i in range(records)]
+
+
+def scenario_cadence(folder, records, failures):
+    # Replays of a backlog a minute apart, each a little early, as the AIO
+    #   task's are; each cluster minute queues a record and replays at once
+    clock = VirtualClock()
+    corrosion_outbox.time = clock.module()
+    uploader = FlakyUploader()
+    uploader.down = True
+    outbox = CorrosionOutbox(path=folder, batch_size=1, batch_interval=60)
+    expected = []
+    for i in range(records):
+        # The replay before a cluster minute is on time, the next one early
+        clock.advance(60.1 if i % 10 == 4 else 59.9)
+        if i == records // 2:
+            uploader.down = False  # The network returns with a backlog
+        if i % 10 == 5:
+            outbox.append(record(i))
+            expected.append(record(i)[0])
+            if not outbox.replay(uploader.send) and not uploader.down:
+                expected.append(0)  # Fails the check: the replay was held back
+        else:
+            outbox.replay(uploader.send)
+    corrosion_outbox.time = time
+    drain(outbox, uploader)
+    return outbox, uploader, expected
+
+
+SCENARIOS = (
+    ("flaky", scenario_flaky),
+    ("restart", scenario_restart),
+    ("torn", scenario_torn),
+    ("drift", scenario_drift),
+    ("cadence", scenario_cadence),
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the outbox with a flaky uploader.")
+    parser.add_argument("--records", type=int, default=60, help="cluster records")
+    parser.add_argument("--failures", type=int, default=25, help="failed sends first")
+    args = parser.parse_args()
+
+    failed = False
+    for name, scenario in SCENARIOS:
+        with tempfile.TemporaryDirectory() as folder:
+            outbox, uploader, expected = scenario(folder, args.records, args.failures)
+            failures = check(name, folder, outbox, uploader, expected)
+        print(
+            "%-8s delivered %4d  sends %4d  skipped %d: %s"
+            % (
+                name,
+                len(uploader.delivered),
+                uploader.calls,
+                outbox.skipped,
+                "; ".join(failures) or "ok",
+            )
+        )
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,110 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# ringlog_reader.py  2022-07-17 v1.0717
+"""Host-side reader for the binary ring log (ringlog.bin) written by
+corrosion_ringlog.CorrosionRingLog. The file is memory-mapped and a time
+range is located with a binary search, so only the records in the range
+are decoded.
+
+Usage: python tools/ringlog_reader.py ringlog.bin [--start EPOCH] [--end EPOCH]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from corrosion_ringlog import (
+    RING_HEADER,
+    RING_HEADER_SIZE,
+    RING_MAGIC,
+    RING_RECORD,
+    unpack_value,
+)
+
+
+class RingLogReader:
+    """A memory-mapped, read-only view of a ring log file."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, _, size, capacity, head, count, first, last) = struct.unpack_from(
+            RING_HEADER, self._map
+        )
+        if magic != RING_MAGIC or size != struct.calcsize(RING_RECORD):
+            raise ValueError("Not a compatible ring log: " + path)
+        self._record = struct.Struct(RING_RECORD)
+        self._capacity = capacity
+        self._head = head
+        self.count = count
+        self.time_range = (first, last)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _offset(self, index):
+        # Byte offset of a logical index; 0 is the oldest record
+        slot = (self._head - self.count + index) % self._capacity
+        return RING_HEADER_SIZE + slot * self._record.size
+
+    def epoch(self, index):
+        """The epoch of the record at a logical index."""
+        return struct.unpack_from("<I", self._map, self._offset(index))[0]
+
+    def record(self, index):
+        """The decoded record at a logical index."""
+        epoch, temp, humid, dew, pcb, corr, heater = self._record.unpack_from(
+            self._map, self._offset(index)
+        )
+        return (
+            epoch,
+            unpack_value(temp),
+            unpack_value(humid),
+            unpack_value(dew),
+            unpack_value(pcb),
+            None if corr < 0 else corr,
+            bool(heater),
+        )
+
+    def bisect(self, epoch):
+        """The logical index of the first record at or after epoch."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.epoch(middle) < epoch:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def query(self, start=0, end=0xFFFFFFFF):
+        """Yield the records with start <= epoch <= end, oldest first."""
+        for index in range(self.bisect(start), self.count):
+            record = self.record(index)
+            if record[0] > end:
+                return
+            yield record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query a Corrosion Monitor ring log.")
+    parser.add_argument("path", help="ring log file (ringlog.bin)")
+    parser.add_argument("--start", type=int, default=0, help="first epoch second")
+    parser.add_argument("--end", type=int, default=0xFFFFFFFF, help="last epoch second")
+    args = parser.parse_args()
+    with RingLogReader(args.path) as reader:
+        print("epoch, temp_c, humid, dew_c, pcb_c, corrosion_index, heater")
+        for row in reader.query(args.start, args.end):
+            print(", ".join("" if v is None else str(v) for v in row))
@@ -0,0 +1,205 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# scheduler_simulation.py  2022-07-17 v1.0717
+"""Host-side simulation of the device's minute tick. Runs the sensor loop's
+scheduling for many hours on a simulated clock with randomized blocking
+delays (sensor reads, AIO pushes, network outages), a drifting wall clock
+that is stepped by the AIO time sync, and sleep overshoot. The deadline
+scheduler (corrosion_scheduler.MinuteScheduler) is compared with the
+former "sleep until the next minute by the wall clock" loop.
+
+The deadline scheduler is also run through single wall clock steps of
+plus and minus one hour and one day at a cluster minute, as from a daylight
+saving change or a time correction by the AIO time sync. After each step
+the ticks must follow the new wall clock minutes without waiting out the
+step.
+
+Exits with status 1 if the deadline scheduler fires a minute twice or
+fires minutes out of order, or if a wall clock step scenario fails.
+
+Usage: python tools/scheduler_simulation.py --hours 72 --seed 1
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from corrosion_scheduler import MinuteScheduler
+
+# fmt: off
+AIO_CLUSTER_DELAY  = 10  # minutes; matches corrosion_code.py
+AIO_CLUSTER_OFFSET =  5  # minutes
+
+WALL_STEPS = (-86400, -3600, 3600, 86400)  # Wall clock step scenarios (sec)
+# fmt: on
+
+
+class SimClock:
+    """A simulated monotonic clock (ns) and integer wall clock (epoch
+    seconds) that drifts from it by drift_ppm."""
+
+    def __init__(self, start=1656633600, drift_ppm=50):
+        self.ns = 0
+        self._start = start
+        self._drift = drift_ppm / 1000000
+        self._offset = 0.0  # Wall clock steps applied by time syncs (sec)
+
+    def monotonic_ns(self):
+        return self.ns
+
+    def time(self):
+        return int(self._start + self.ns / 1e9 * (1 + self._drift) + self._offset)
+
+    def advance(self, seconds):
+        self.ns += int(seconds * 1e9)
+
+    def sync(self, error=0.0):
+        # Step the wall clock back to the true time, within error seconds
+        true = self._start + self.ns / 1e9
+        wall = self._start + self.ns / 1e9 * (1 + self._drift) + self._offset
+        self._offset += true + error - wall
+
+    def step(self, seconds):
+        # Step the wall clock and the true time by seconds, as a daylight
+        #   saving change does to local time
+        self._start += seconds
+
+
+def cluster(minute):
+    return (minute % 60) % AIO_CLUSTER_DELAY == AIO_CLUSTER_OFFSET
+
+
+def blocking_delay(rng, minute):
+    """Seconds the loop blocks after a tick: the sensor read and display,
+    plus the AIO push and time sync at cluster minutes. Occasional network
+    outages block for minutes."""
+    delay = rng.uniform(0.2, 1.5)
+    if cluster(minute):
+        delay += rng.uniform(2, 15)
+        if rng.random() < 0.05:
+            delay += rng.uniform(60, 240)  # Network outage
+    elif rng.random() < 0.02:
+        delay += rng.uniform(5, 70)  # Outbox replay
+    return delay
+
+
+def run_deadline(hours, seed):
+    rng = random.Random(seed)
+    clock = SimClock()
+    schedule = MinuteScheduler(period=60, clock_ns=clock.monotonic_ns, wall=clock.time)
+    fired = []
+    end_ns = int(hours * 3600 * 1e9)
+    while clock.ns < end_ns:
+        clock.advance(schedule.delay() + rng.uniform(0, 0.02))  # Sleep overshoot
+        minute = schedule.fire()
+        if minute is None:
+            continue
+        fired.append(minute)
+        clock.advance(blocking_delay(rng, minute))
+        if cluster(minute):
+            clock.sync(rng.uniform(-0.5, 0.5))
+            schedule.sync()
+    return fired, schedule
+
+
+def run_step(step, hours, seed):
+    """Run the deadline scheduler with one wall clock step of step seconds
+    at the first cluster minute after half of the simulated hours. Returns
+    a list of failure descriptions; empty when the scenario passes."""
+    rng = random.Random(seed)
+    clock = SimClock()
+    schedule = MinuteScheduler(period=60, clock_ns=clock.monotonic_ns, wall=clock.time)
+    failures = []
+    segments = [[]]  # Ticks fired before and after the step
+    end_ns = int(hours * 3600 * 1e9)
+    step_ns = end_ns // 2
+    while clock.ns < end_ns:
+        delay = schedule.delay()
+        if delay > 60:
+            failures.append("delay %.0f s exceeds one period" % delay)
+        clock.advance(delay + rng.uniform(0, 0.02))
+        minute = schedule.fire()
+        if minute is None:
+            continue
+        wall_minute = clock.time() // 60
+        if not wall_minute - 2 <= minute <= wall_minute + 1:
+            failures.append("tick %d fired in wall minute %d" % (minute, wall_minute))
+        segments[-1].append(minute)
+        clock.advance(blocking_delay(rng, minute))
+        if cluster(minute):
+            clock.sync(rng.uniform(-0.5, 0.5))
+            if len(segments) == 1 and clock.ns >= step_ns:
+                clock.step(step)
+                segments.append([])
+            schedule.sync()
+    if len(segments) != 2 or not segments[1]:
+        failures.append("no ticks after the step")
+    for fired in segments:
+        duplicates, disorder = check(fired)[:2] if fired else (0, 0)
+        if duplicates or disorder:
+            failures.append("%d duplicate, %d out-of-order ticks" % (duplicates, disorder))
+    return failures
+
+
+def run_wall_clock(hours, seed):
+    """The former loop: sleep 60 - tm_sec seconds, then take the minute from
+    the wall clock."""
+    rng = random.Random(seed)
+    clock = SimClock()
+    fired = []
+    end_ns = int(hours * 3600 * 1e9)
+    while clock.ns < end_ns:
+        minute = clock.time() // 60
+        fired.append(minute)
+        clock.advance(blocking_delay(rng, minute))
+        if cluster(minute):
+            clock.sync(rng.uniform(-0.5, 0.5))
+        clock.advance(60 - clock.time() % 60 + rng.uniform(0, 0.02))
+    return fired
+
+
+def check(fired):
+    """Count duplicate, out-of-order, and missing minutes and cluster
+    minutes."""
+    duplicates = len(fired) - len(set(fired))
+    disorder = sum(1 for a, b in zip(fired, fired[1:]) if b < a)
+    span = set(range(min(fired), max(fired) + 1))
+    missing = len(span - set(fired))
+    clusters = [m for m in fired if cluster(m)]
+    cluster_duplicates = len(clusters) - len(set(clusters))
+    cluster_missing = len([m for m in span if cluster(m)]) - len(set(clusters))
+    return duplicates, disorder, missing, cluster_duplicates, cluster_missing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the minute tick scheduler.")
+    parser.add_argument("--hours", type=float, default=72, help="simulated hours")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    deadline, schedule = run_deadline(args.hours, args.seed)
+    legacy = run_wall_clock(args.hours, args.seed)
+
+    print("%-10s %8s %6s %6s %8s %8s %8s" % (
+        "", "ticks", "dup", "order", "missed", "clus dup", "clus miss"
+    ))
+    for name, fired in (("deadline", deadline), ("wall clock", legacy)):
+        print("%-10s %8d %6d %6d %8d %8d %8d" % ((name, len(fired)) + check(fired)))
+    ticks, caught_up, skipped = schedule.stats
+    mean_ms, max_ms = schedule.jitter
+    print(
+        "deadline: %d caught up, %d skipped, jitter mean %.0f ms, max %.0f ms"
+        % (caught_up, skipped, mean_ms, max_ms)
+    )
+    duplicates, disorder = check(deadline)[:2]
+    failed = bool(duplicates or disorder)
+
+    for step in WALL_STEPS:
+        failures = run_step(step, min(args.hours, 24), args.seed)
+        print("wall clock step %+7d s: %s" % (step, "; ".join(failures[:3]) or "ok"))
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
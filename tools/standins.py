@@ -0,0 +1,507 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# standins.py  2022-07-17 v1.0717
+"""Host-side stand-ins for the CircuitPython modules used by the Corrosion
+Monitor, so that its board-dependent modules can be imported and timed on
+Linux by the tools/ harnesses:
+
+  VirtualClock  a monotonic and wall clock that only advances when asked;
+                module() returns a stand-in time module that reads it
+  board         LIGHT, D4, and NEOPIXEL pins, I2C(), and a 320 x 240
+                DISPLAY whose refresh() always completes
+  analogio      AnalogIn reads the simulated light level from ADC
+  analogbufio   BufferedIn fills a buffer from ADC at its sample rate
+  digitalio     DigitalInOut and Direction
+  pwmio         PWMOut, with a duty_cycle
+  adafruit_pyportal, secrets
+                PyPortal methods used by the display and AIO, and an AIO
+                account; AIO posts and the time service take set times
+  adafruit_sht31d, adafruit_adt7410
+                the temperature and humidity sensors, at set readings
+  cedargrove_shadow_detector
+                a ShadowDetector whose detect() asks a hand model
+  supervisor    the status and reload calls
+  VirtualTime   puts the virtual clock in the time module while in a with
+                block, for modules that read the time as they import
+  DeviceFiles   maps the device's absolute paths (/sd, /fonts, and the
+                bitmaps) to host folders while in a with block
+  display()     a corrosion_display.CorrosionDisplay on a stand-in PyPortal,
+                secrets, and the virtual clock
+
+The stand-in ADC advances the virtual clock by read_ns for each AnalogIn
+read and by one sample period for each buffered sample, and the other
+stand-in devices by their *_seconds class attributes, so a harness can
+assume device timings. install() places the modules in sys.modules; it is
+called before the code/ modules are imported. display() also needs the
+Blinka displayio and the display libraries on the host:
+  pip install adafruit-blinka-displayio adafruit-circuitpython-display-text
+  pip install adafruit-circuitpython-display-shapes
+  pip install adafruit-circuitpython-imageload adafruit-circuitpython-simpleio
+
+Not a harness itself; imported by the tools/ harnesses.
+"""
+
+import builtins
+import os
+import sys
+import threading
+import time
+import types
+
+CODE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code")
+BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bundle_7.3.1")
+
+START_EPOCH = 1656633600  # 2022-07-01 00:00:00
+
+
+class VirtualClock:
+    """Monotonic time in integer nanoseconds and a wall clock (epoch
+    seconds) that advance only with advance() or sleep()."""
+
+    def __init__(self, epoch=START_EPOCH):
+        self.ns = 0
+        self.epoch = epoch  # Wall clock time at monotonic time 0
+
+    def advance(self, seconds):
+        self.ns += int(seconds * 1000000000)
+
+    def monotonic_ns(self):
+        return self.ns
+
+    def monotonic(self):
+        return self.ns / 1000000000
+
+    def time(self):
+        return self.epoch + self.ns // 1000000000
+
+    def sleep(self, seconds):
+        self.advance(max(seconds, 0))
+
+    def localtime(self, epoch=None):
+        return time.gmtime(self.time() if epoch is None else epoch)
+
+    def module(self):
+        """A stand-in time module; assign it to a module's time attribute."""
+        return types.SimpleNamespace(
+            monotonic=self.monotonic,
+            monotonic_ns=self.monotonic_ns,
+            time=self.time,
+            sleep=self.sleep,
+            localtime=self.localtime,
+            struct_time=time.struct_time,
+        )
+
+
+class VirtualTime:
+    """Replaces the time module's clock and sleep functions with those of a
+    VirtualClock while in a with block. Other threads, such as the Blinka
+    displayio background refresh, keep the host clock."""
+
+    _names = ("monotonic", "monotonic_ns", "time", "sleep", "localtime")
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._saved = None
+
+    def _select(self, name, function):
+        virtual = getattr(self.clock, name)
+        thread = threading.current_thread()
+
+        def select(*args):
+            if threading.current_thread() is thread:
+                return virtual(*args)
+            return function(*args)
+
+        return select
+
+    def __enter__(self):
+        self._saved = [(name, getattr(time, name)) for name in self._names]
+        for name, function in self._saved:
+            setattr(time, name, self._select(name, function))
+        return self.clock
+
+    def __exit__(self, *args):
+        for name, function in self._saved:
+            setattr(time, name, function)
+        return False
+
+
+class StandInADC:
+    """The simulated light sensor. signal(seconds) returns the 16-bit light
+    level at a monotonic time; the read counters are cumulative."""
+
+    def __init__(self):
+        self.clock = VirtualClock()
+        self.signal = lambda seconds: 32768
+        self.read_ns = 0  # Virtual cost of one AnalogIn read
+        self.reads = 0  # AnalogIn reads
+        self.blocks = 0  # BufferedIn readinto calls
+        self.samples = 0  # Samples captured by BufferedIn
+
+    def reset(self):
+        self.reads = 0
+        self.blocks = 0
+        self.samples = 0
+
+    def read(self):
+        self.reads += 1
+        value = int(self.signal(self.clock.monotonic())) & 0xFFFF
+        self.clock.ns += self.read_ns
+        return value
+
+
+ADC = StandInADC()
+
+
+class AnalogIn:
+    def __init__(self, pin):
+        self.pin = pin
+
+    @property
+    def value(self):
+        return ADC.read()
+
+    def deinit(self):
+        pass
+
+
+class BufferedIn:
+    """Captures 12-bit samples, as the SAMD51's buffered ADC does."""
+
+    def __init__(self, pin, *, sample_rate=500000):
+        self.pin = pin
+        self.sample_rate = sample_rate
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
+
+    def deinit(self):
+        pass
+
+    def readinto(self, buffer):
+        clock = ADC.clock
+        period = 1000000000 // self.sample_rate
+        for i in range(len(buffer)):
+            buffer[i] = int(ADC.signal(clock.monotonic())) >> 4
+            clock.ns += period
+        ADC.blocks += 1
+        ADC.samples += len(buffer)
+        return len(buffer)
+
+
+class Direction:
+    INPUT = 0
+    OUTPUT = 1
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.value = False
+
+
+class PWMOut:
+    def __init__(self, pin, *, frequency=500, duty_cycle=0, variable_frequency=False):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = duty_cycle
+
+    def deinit(self):
+        pass
+
+
+class StandInSHT31D:
+    """The SHT31D driver at a set temperature and humidity. In periodic
+    mode the readings are lists, as the driver returns, with the reading
+    followed by backfill entries (130.0C, 100.0%) for the unfilled buffer
+    slots; each temperature fetch takes read_seconds and calls on_fetch."""
+
+    temperature_c = 22.0
+    humidity = 45.0
+    read_seconds = 0
+    on_fetch = None  # Called with no arguments at each temperature fetch
+    fetches = 0
+    backfill = 2  # Empty buffer slots returned after the periodic reading
+
+    def __init__(self, i2c):
+        self.heater = False
+        self.frequency = 1
+        self.mode = SHT31D_MODE_SINGLE
+
+    @property
+    def temperature(self):
+        StandInSHT31D.fetches += 1
+        if StandInSHT31D.on_fetch != None:
+            StandInSHT31D.on_fetch()
+        ADC.clock.advance(self.read_seconds)
+        if self.mode == SHT31D_MODE_PERIODIC:
+            return [self.temperature_c] + [130.0] * self.backfill
+        return self.temperature_c
+
+    @property
+    def relative_humidity(self):
+        if self.mode == SHT31D_MODE_PERIODIC:
+            return [self.humidity] + [100.0] * self.backfill
+        return self.humidity
+
+
+SHT31D_MODE_SINGLE = "Single"
+SHT31D_MODE_PERIODIC = "Periodic"
+
+
+class StandInADT7410:
+    """The PyPortal's ADT7410 at a set temperature; a read takes
+    read_seconds."""
+
+    temperature_c = 30.0
+    read_seconds = 0
+
+    def __init__(self, i2c):
+        self.reset = False
+        self.high_resolution = False
+
+    @property
+    def temperature(self):
+        ADC.clock.advance(self.read_seconds)
+        return self.temperature_c
+
+
+class ShadowDetector:
+    """Gesture detection; detect() samples for detect_seconds and reports
+    hand(start, end), a gesture seen by a sample block from start to end
+    (monotonic seconds)."""
+
+    detect_seconds = 0
+    hand = None
+
+    def __init__(self, pin, threshold=0.9):
+        self.pin = pin
+        self.threshold = threshold
+        self.background = 40000
+
+    def detect(self):
+        start = ADC.clock.monotonic()
+        ADC.clock.advance(self.detect_seconds)
+        if ShadowDetector.hand == None:
+            return False
+        return ShadowDetector.hand(start, ADC.clock.monotonic())
+
+    def refresh_background(self):
+        ADC.clock.advance(self.detect_seconds)
+
+
+class StandInIO:
+    """The IO_HTTP internals used by corrosion_aio for the group request.
+    A post takes post_seconds and fails with RuntimeError while down;
+    delivered payloads are kept in posts with their epoch time."""
+
+    post_seconds = 0
+    down = False
+
+    def __init__(self):
+        self.posts = []
+
+    def _compose_path(self, path):
+        return "/api/v2/user/" + path
+
+    def _post(self, path, payload):
+        ADC.clock.advance(self.post_seconds)
+        if self.down:
+            raise RuntimeError("Failed to send request (stand-in outage)")
+        self.posts.append((ADC.clock.time(), payload))
+        return [{"feed_key": feed["key"]} for feed in payload["feeds"]]
+
+
+class StandInDisplay:
+    """The integral display; an explicit refresh takes refresh_seconds."""
+
+    refresh_seconds = 0
+
+    def __init__(self):
+        self.width = 320
+        self.height = 240
+        self.auto_refresh = True
+        self.brightness = 1.0
+        self.refreshes = 0
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, target_frames_per_second=None, minimum_frames_per_second=0):
+        ADC.clock.advance(self.refresh_seconds)
+        self.refreshes += 1
+        return True
+
+
+def install(clock=None, bulk=False, read_ns=0, signal=None):
+    """Place the stand-in modules in sys.modules and put code/ and the
+    library bundle on sys.path. bulk makes analogbufio importable. Returns
+    the stand-in ADC."""
+    if clock != None:
+        ADC.clock = clock
+    ADC.read_ns = read_ns
+    if signal != None:
+        ADC.signal = signal
+
+    board = types.ModuleType("board")
+    board.LIGHT = "LIGHT"
+    board.D4 = "D4"
+    board.NEOPIXEL = "NEOPIXEL"
+    board.I2C = lambda: "I2C"
+    board.DISPLAY = StandInDisplay()
+    analogio = types.ModuleType("analogio")
+    analogio.AnalogIn = AnalogIn
+    digitalio = types.ModuleType("digitalio")
+    digitalio.DigitalInOut = DigitalInOut
+    digitalio.Direction = Direction
+    pwmio = types.ModuleType("pwmio")
+    pwmio.PWMOut = PWMOut
+    pyportal = types.ModuleType("adafruit_pyportal")
+    pyportal.PyPortal = StandInPyPortal
+    secrets = types.ModuleType("secrets")
+    secrets.secrets = {"aio_username": "user", "aio_key": "key"}
+    sys.modules.setdefault("board", board)
+    sys.modules["analogio"] = analogio
+    sys.modules["digitalio"] = digitalio
+    sys.modules["pwmio"] = pwmio
+    sht31d = types.ModuleType("adafruit_sht31d")
+    sht31d.SHT31D = StandInSHT31D
+    sht31d.MODE_SINGLE = SHT31D_MODE_SINGLE
+    sht31d.MODE_PERIODIC = SHT31D_MODE_PERIODIC
+    sht31d.FREQUENCY_1 = 1
+    adt7410 = types.ModuleType("adafruit_adt7410")
+    adt7410.ADT7410 = StandInADT7410
+    shadow = types.ModuleType("cedargrove_shadow_detector")
+    shadow.ShadowDetector = ShadowDetector
+    supervisor = types.ModuleType("supervisor")
+    supervisor.set_rgb_status_brightness = lambda brightness: None
+    supervisor.set_next_code_file = lambda filename, **kwargs: None
+    for module in (sht31d, adt7410, shadow, supervisor):
+        sys.modules[module.__name__] = module
+    sys.modules["adafruit_pyportal"] = pyportal
+    sys.modules["secrets"] = secrets
+    use_bulk(bulk)
+
+    for path in (BUNDLE, CODE):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return ADC
+
+
+def use_bulk(bulk):
+    """Make analogbufio importable (bulk) or not, for samplers made next."""
+    if bulk:
+        analogbufio = types.ModuleType("analogbufio")
+        analogbufio.BufferedIn = BufferedIn
+        sys.modules["analogbufio"] = analogbufio
+    else:
+        sys.modules["analogbufio"] = None  # Raises ImportError on import
+
+
+class DeviceFiles:
+    """Maps the device's absolute paths to host folders while in a with
+    block: /sd to the sd folder, and /fonts and the other files at the
+    root of CIRCUITPY to code/. Replaces open and the os functions used by
+    the code/ modules; opening a file on the SD card takes open_seconds."""
+
+    _names = ("mkdir", "stat", "rename", "remove", "listdir")
+
+    def __init__(self, sd=None, open_seconds=0):
+        self.sd = sd
+        self.open_seconds = open_seconds
+        self.sd_opens = 0
+        self._saved = None
+
+    def path(self, path):
+        """The host path of a device path."""
+        if not isinstance(path, str) or not path.startswith("/"):
+            return path
+        if path == "/sd" or path.startswith("/sd/"):
+            if self.sd == None:
+                raise OSError(19, "No SD card")  # ENODEV
+            return self.sd + path[3:]
+        code_path = CODE + path
+        if os.path.lexists(code_path):
+            return code_path
+        return path
+
+    def _wrap(self, function):
+        def mapped(*args, **kwargs):
+            return function(*[self.path(arg) for arg in args], **kwargs)
+
+        return mapped
+
+    def _open(self, function):
+        def mapped(path, *args, **kwargs):
+            if isinstance(path, str) and path.startswith("/sd/"):
+                self.sd_opens += 1
+                ADC.clock.advance(self.open_seconds)
+            return function(self.path(path), *args, **kwargs)
+
+        return mapped
+
+    def __enter__(self):
+        self._saved = [(os, name, getattr(os, name)) for name in self._names]
+        for module, name, function in self._saved:
+            setattr(module, name, self._wrap(function))
+        self._saved.append((builtins, "open", builtins.open))
+        builtins.open = self._open(builtins.open)
+        self._saved.append((os, "sync", getattr(os, "sync", None)))
+        os.sync = lambda: None
+        return self
+
+    def __exit__(self, *args):
+        for module, name, function in self._saved:
+            if function == None:
+                delattr(module, name)
+            else:
+                setattr(module, name, function)
+        return False
+
+
+class StandInPyPortal:
+    """The PyPortal methods used by the Corrosion Monitor. sd_check()
+    reports sd_present; get_local_time() fails while time_error is set or
+    the AIO client is down."""
+
+    sd_default = False  # sd_present of the next PyPortal
+    time_seconds = 0  # Duration of get_local_time()
+    io = StandInIO()  # The AIO client of every PyPortal
+
+    def __init__(self, *args, **kwargs):
+        self.sd_present = self.sd_default
+        self.time_error = None
+        self.time_syncs = 0
+        self.network = types.SimpleNamespace(_get_io_client=lambda: self.io)
+
+    def get_local_time(self, location=None):
+        ADC.clock.advance(self.time_seconds)
+        if self.time_error != None or self.io.down:
+            raise RuntimeError(self.time_error or "stand-in outage")
+        self.time_syncs += 1
+
+    def set_backlight(self, value):
+        pass
+
+    def sd_check(self):
+        return self.sd_present
+
+    def play_file(self, file_name, wait_to_finish=True):
+        pass
+
+
+def display(clock, sd_present=False, **kwargs):
+    """A CorrosionDisplay built under the stand-ins, with its time module
+    on the clock; keyword arguments are passed to the display. Call
+    install() first."""
+    import corrosion_display
+
+    corrosion_display.time = clock.module()
+    StandInPyPortal.sd_default = sd_present
+    with DeviceFiles():
+        return corrosion_display.CorrosionDisplay(**kwargs)
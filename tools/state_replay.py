@@ -0,0 +1,108 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# state_replay.py  2022-07-17 v1.0717
+"""Replays recorded Corrosion Monitor logs through the device's corrosion
+index and heater state machine (corrosion_logic.CorrosionState) and
+compares it with the plain threshold index, which switches the heater with
+the index on every read. Reports corrosion index transitions, heater
+switches, and heater-seconds for each.
+
+Usage: python tools/state_replay.py logfile.csv /sd/logs ringlog.bin --dwell 600
+"""
+
+import argparse
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+
+from log_analytics import classify, source_records
+from corrosion_logic import (
+    ALERT,
+    CorrosionState,
+    HEATER_DUTY,
+    HEATER_DUTY_WINDOW,
+    HEATER_MIN_OFF,
+    HEATER_MIN_ON,
+    STATE_DWELL,
+)
+
+
+class ThresholdState:
+    """The plain threshold behavior: the index follows corrosion_index() and
+    the heater is on exactly while the index is ALERT."""
+
+    def __init__(self):
+        self._index = None
+        self._heater = False
+        self._last = None
+        self._transitions = 0
+        self._heater_switches = 0
+        self._heater_seconds = 0
+
+    @property
+    def stats(self):
+        # Corrosion index transitions, heater switches, and heater seconds.
+        return self._transitions, self._heater_switches, self._heater_seconds
+
+    def update(self, now, index):
+        if self._last is not None and self._heater:
+            self._heater_seconds += max(now - self._last, 0)
+        self._last = now
+        if index is None:
+            return
+        if self._index is not None and index != self._index:
+            self._transitions += 1
+        self._index = index
+        if (index == ALERT) != self._heater:
+            self._heater = index == ALERT
+            self._heater_switches += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the corrosion state machine.")
+    parser.add_argument("paths", nargs="+", help="CSV logs, log folders, or ring logs")
+    parser.add_argument("--dwell", type=int, default=STATE_DWELL, help="state dwell (sec)")
+    parser.add_argument("--min-on", type=int, default=HEATER_MIN_ON, help="heater on (sec)")
+    parser.add_argument("--min-off", type=int, default=HEATER_MIN_OFF, help="heater off (sec)")
+    parser.add_argument("--duty", type=float, default=HEATER_DUTY, help="heater duty limit")
+    parser.add_argument(
+        "--duty-window", type=int, default=HEATER_DUTY_WINDOW, help="duty period (sec)"
+    )
+    args = parser.parse_args()
+
+    plain = ThresholdState()
+    state = CorrosionState(
+        dwell=args.dwell,
+        heater_min_on=args.min_on,
+        heater_min_off=args.min_off,
+        heater_duty=args.duty,
+        duty_window=args.duty_window,
+    )
+    first = last = None
+    for epoch, temp_c, humid, dew_c, index in classify(source_records(args.paths)):
+        plain.update(epoch, index)
+        state.update(epoch, temp_c, humid, dew_c)
+        if first is None:
+            first = epoch
+        last = epoch
+
+    hours = (last - first) / 3600 if first is not None else 0
+    print("replayed %.1f h" % hours)
+    print("%-10s %12s %12s %12s %8s" % ("", "transitions", "heater sw", "heater h", "duty"))
+    for name, (transitions, switches, seconds) in (
+        ("threshold", plain.stats),
+        ("state", state.stats),
+    ):
+        print(
+            "%-10s %12d %12d %12.2f %7.1f%%"
+            % (
+                name,
+                transitions,
+                switches,
+                seconds / 3600,
+                100 * seconds / 3600 / hours if hours else 0,
+            )
+        )
@@ -0,0 +1,86 @@
+# Workshop Corrosion Monitor
+# Copyright 2018, 2019, 2020, 2021, 2022 by JG for Cedar Grove Maker Studios
+#
+# temperature_array_benchmark.py  2022-07-17 v1.0717
+"""Compares the scalar `temperature` converters called in a Python loop with
+the NumPy `temperature_array` converters and confirms that the rounded
+results are identical, for arrays and for scalar arguments. Exits with
+status 1 if a converter given scalar arguments fails or differs.
+
+Usage: python tools/temperature_array_benchmark.py [--count 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bundle_7.3.1")
+)
+
+from cedargrove_unit_converter import temperature, temperature_array
+
+
+def compare(name, scalar_function, array_function, *columns):
+    start = time.perf_counter()
+    scalar = [scalar_function(*values) for values in zip(*[c.tolist() for c in columns])]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    array = array_function(*columns)
+    array_time = time.perf_counter() - start
+    mismatches = int(np.sum(np.array(scalar) != array))
+    print(
+        "%-22s scalar %8.0f/s  array %11.0f/s  %6.1fx  mismatches %d"
+        % (
+            name,
+            len(scalar) / scalar_time,
+            len(scalar) / array_time,
+            scalar_time / array_time,
+            mismatches,
+        )
+    )
+
+
+def compare_scalars(name, scalar_function, array_function, *columns):
+    """Call the array converter with scalar arguments, as for a single
+    reading. Returns the number of mismatches or errors."""
+    failures = 0
+    for values in list(zip(*[c.tolist() for c in columns]))[:1000]:
+        try:
+            result = array_function(*values)
+            if float(result) != scalar_function(*values):
+                failures += 1
+        except (TypeError, ValueError):
+            failures += 1
+    print("%-22s scalar arguments: mismatches or errors %d" % (name, failures))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark array temperature converters.")
+    parser.add_argument("--count", type=int, default=1000000, help="readings")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    temp_c = np.round(rng.uniform(-40, 60, args.count), 1)  # Logged resolution
+    humid = np.round(rng.uniform(0, 100, args.count), 1)
+
+    compare(
+        "celsius_to_fahrenheit",
+        temperature.celsius_to_fahrenheit,
+        temperature_array.celsius_to_fahrenheit,
+        temp_c,
+    )
+    compare("dew_point", temperature.dew_point, temperature_array.dew_point, temp_c, humid)
+    compare("heat_index", temperature.heat_index, temperature_array.heat_index, temp_c, humid)
+
+    failures = compare_scalars(
+        "dew_point", temperature.dew_point, temperature_array.dew_point, temp_c, humid
+    )
+    failures += compare_scalars(
+        "heat_index", temperature.heat_index, temperature_array.heat_index, temp_c, humid
+    )
+    sys.exit(1 if failures else 0)